@@ -1,4 +1,5 @@
 import boto3
+from botocore.config import Config
 from .config import settings
 from elevenlabs.client import ElevenLabs
 
@@ -12,6 +13,23 @@ bedrock_runtime = boto3.client(
     region_name=settings.aws_region_name,
 )
 
+# Client used by the Bedrock gateway: its connection pool matches the gateway's
+# worker threads, and botocore retries are off because the gateway backs off itself
+bedrock_gateway_runtime = boto3.client(
+    service_name="bedrock-runtime",
+    aws_access_key_id=settings.aws_access_key_id,
+    aws_secret_access_key=settings.aws_secret_access_key,
+    region_name=settings.aws_region_name,
+    endpoint_url=settings.bedrock_endpoint_url,
+    config=Config(
+        max_pool_connections=settings.bedrock_max_concurrency,
+        tcp_keepalive=True,
+        connect_timeout=5,
+        read_timeout=120,
+        retries={"total_max_attempts": 1, "mode": "standard"},
+    ),
+)
+
 kendra_client = boto3.client(
     "kendra",
     aws_access_key_id=settings.aws_access_key_id,
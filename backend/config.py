@@ -1,3 +1,4 @@
+from typing import Optional
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -18,6 +19,27 @@ class Settings(BaseSettings):
     google_credentials_path: str = "credentials.json"
     google_token_path: str = "token.json"
     dynamodb_tasks_table_name: str
+    # Bedrock gateway tuning; the endpoint URL can point at a local stub server
+    bedrock_endpoint_url: Optional[str] = None
+    bedrock_max_concurrency: int = 16
+    bedrock_requests_per_second: float = 5.0
+    bedrock_burst: int = 10
+    bedrock_max_retries: int = 5
+    # Local cache of analysis and synthesis responses, scoped per tenant and user; semantic mode
+    # also matches near-duplicate prompts. Entries hold transcripts in plaintext, so they are only
+    # written to disk when a path is set, which should be on encrypted, access-controlled storage.
+    response_cache_enabled: bool = True
+    response_cache_path: Optional[str] = None
+    response_cache_max_entries: int = 1000
+    response_cache_ttl_seconds: float = 86400.0
+    response_cache_semantic: bool = False
+    response_cache_similarity_threshold: float = 0.95
+    bedrock_embedding_model_id: str = "amazon.titan-embed-text-v2:0"
+    tenant_id: Optional[str] = None
+    # Kendra documents are sent in batches. Unsent ones are spilled at shutdown only when a path
+    # is set; the spill holds full transcripts in plaintext, so it must be on protected storage.
+    kendra_flush_interval: float = 1.0
+    kendra_spill_path: Optional[str] = None
 
     model_config = SettingsConfigDict(env_file=".env")
 
@@ -19,7 +19,7 @@ import re
 # Add the project root to the Python path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi import FastAPI, UploadFile, File, HTTPException, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
@@ -31,6 +31,10 @@ from medicine_recommendation_system import medicine_engine
 # Import inventory management services
 from services.alerts_service import alerts_service, AlertType, AlertStatus
 from services.purchase_order_service import purchase_order_service, PurchaseOrderStatus
+from services.rfid_registry import rfid_registry, RFIDTag, RFIDAssignment
+from services.rfid_ingest import rfid_read_ingestor
+from services.rfid_reconciliation import rfid_reconciliation_engine
+from services.forecast_service import forecast_service, ForecastNotReadyError
 
 app = FastAPI(title="Infinite Memory API - Improved", version="2.0.0")
 
@@ -48,10 +52,6 @@ memory_data = {}
 tasks_data = {}
 alerts_data = []
 
-# RFID data storage
-rfid_tags = {}
-rfid_assignments = {}
-
 class ProcessTextRequest(BaseModel):
     user_id: str
     text: str
@@ -60,6 +60,12 @@ class QueryRequest(BaseModel):
     user_id: str
     query: str
 
+class IngestMemoryRequest(BaseModel):
+    user_id: str
+    transcript: str
+    s3_url: Optional[str] = None
+    speaker_cluster_id: Optional[str] = None
+
 class ProcessAudioRequest(BaseModel):
     user_id: str
     filepath: str
@@ -115,23 +121,6 @@ class AddMedicalSupplyRequest(BaseModel):
     unit: str = "units"
 
 # RFID Models
-class RFIDTag(BaseModel):
-    tag_id: str
-    tag_type: str = "inventory"
-    description: Optional[str] = None
-    created_at: str
-    last_seen: Optional[str] = None
-    status: str = "active"
-
-class RFIDAssignment(BaseModel):
-    assignment_id: str
-    tag_id: str
-    item_id: str
-    item_type: str  # "medicine", "supply", "equipment"
-    assigned_at: str
-    assigned_by: str
-    notes: Optional[str] = None
-
 class AssignRFIDRequest(BaseModel):
     tag_id: str
     item_id: str
@@ -139,6 +128,10 @@ class AssignRFIDRequest(BaseModel):
     assigned_by: str
     notes: Optional[str] = None
 
+class RFIDCycleCountRequest(BaseModel):
+    tag_ids: Optional[List[str]] = None  # defaults to the tags currently present at the readers
+    apply: bool = False
+
 # Initialize sample RFID data
 def initialize_rfid_data():
     """Initialize sample RFID data"""
@@ -181,7 +174,7 @@ def initialize_rfid_data():
     ]
     
     for tag in sample_tags:
-        rfid_tags[tag.tag_id] = tag
+        rfid_registry.add_tag(tag)
     
     sample_assignments = [
         RFIDAssignment(
@@ -214,7 +207,7 @@ def initialize_rfid_data():
     ]
     
     for assignment in sample_assignments:
-        rfid_assignments[assignment.assignment_id] = assignment
+        rfid_registry.add_assignment(assignment)
 
 # Initialize RFID data on startup
 initialize_rfid_data()
@@ -490,6 +483,39 @@ async def query(request: QueryRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Query error: {str(e)}")
 
+# Plain def: the first request imports the AWS services, which should not block the event loop
+@app.post("/query/speech")
+def query_speech(request: QueryRequest):
+    """Answer a query from Kendra and Neptune memories as streamed speech (MP3), sentence by sentence"""
+    try:
+        # Imported on first use: these services need AWS and ElevenLabs settings the rest of the API does not
+        from services.speech_streaming import speech_streamer
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Speech streaming unavailable: {str(e)}")
+
+    # Retrieval and synthesis run as the response is iterated, so audio starts with the first sentence
+    return StreamingResponse(
+        speech_streamer.stream_query_audio(request.query, request.user_id),
+        media_type="audio/mpeg",
+        headers={"Cache-Control": "no-store"}
+    )
+
+# Plain def: ingestion waits on Bedrock and Neptune, which should not block the event loop
+@app.post("/memories/ingest")
+def ingest_memory(request: IngestMemoryRequest):
+    """Analyze a transcript and store it as a memory in Kendra and Neptune"""
+    try:
+        # Imported on first use: these services need AWS settings the rest of the API does not
+        from services.memory_ingest import memory_ingestor
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Memory ingestion unavailable: {str(e)}")
+
+    result = memory_ingestor.ingest(request.transcript, request.user_id, request.s3_url, request.speaker_cluster_id)
+    if "error" in result:
+        raise HTTPException(status_code=502, detail=f"Memory analysis error: {result['error']}")
+    # The Kendra document is sent by the batching ingest queue; it is not waited for here
+    return {"analysis": result["analysis"], "timings": result["timings"]}
+
 @app.post("/process-audio")
 async def process_audio(request: ProcessAudioRequest):
     """Process audio input"""
@@ -906,6 +932,7 @@ async def get_purchase_orders():
             {
                 "order_id": order.order_id,
                 "item_id": order.item_id,
+                "item_ids": order.item_ids(),
                 "item_name": order.item_name,
                 "quantity": order.quantity,
                 "supplier_id": order.supplier_id,
@@ -918,7 +945,9 @@ async def get_purchase_orders():
                 "received_at": order.received_at.isoformat() if order.received_at else None,
                 "notes": order.notes,
                 "unit_price": order.unit_price,
-                "total_amount": order.total_amount
+                "total_amount": order.total_amount,
+                "line_items": [line.model_dump() for line in order.line_items],
+                "expected_delivery": order.expected_delivery.isoformat() if order.expected_delivery else None
             }
             for order in orders
         ]
@@ -973,6 +1002,60 @@ async def get_purchase_order_email(order_id: str):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Email generation error: {str(e)}")
 
+@app.get("/inventory/purchase-orders/export")
+async def export_purchase_orders(status: Optional[PurchaseOrderStatus] = None,
+                                 supplier_id: Optional[str] = None):
+    """Stream rendered purchase order documents as a zip archive for batch transmission"""
+    try:
+        if status:
+            orders = purchase_order_service.get_purchase_orders_by_status(status)
+        else:
+            orders = purchase_order_service.get_all_purchase_orders()
+        
+        if supplier_id:
+            orders = [order for order in orders if order.supplier_id == supplier_id]
+        
+        filename = f"purchase_orders_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
+        return StreamingResponse(
+            purchase_order_service.export_orders_archive(orders),
+            media_type="application/zip",
+            headers={"Content-Disposition": f"attachment; filename={filename}"}
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Purchase order export error: {str(e)}")
+
+@app.get("/inventory/purchase-orders/as-of")
+async def get_purchase_orders_as_of(timestamp: str, open_only: bool = True):
+    """Get purchase order statuses as they were at a point in time"""
+    try:
+        as_of = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid timestamp, expected ISO 8601")
+    
+    try:
+        statuses = purchase_order_service.event_log.status_as_of(as_of)
+        return [
+            {"order_id": order_id, "status": status}
+            for order_id, status in statuses.items()
+            if not open_only or status in ("pending", "sent", "confirmed")
+        ]
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Purchase order history error: {str(e)}")
+
+@app.get("/inventory/purchase-orders/{order_id}/events")
+async def get_purchase_order_events(order_id: str):
+    """Get the lifecycle event history of a purchase order"""
+    try:
+        events = purchase_order_service.event_log.get_order_events(order_id)
+        if not events:
+            raise HTTPException(status_code=404, detail="Purchase order not found")
+        
+        return [event.model_dump(mode="json") for event in events]
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Purchase order events error: {str(e)}")
+
 @app.get("/inventory/purchase-orders/statistics")
 async def get_purchase_order_statistics():
     """Get purchase order statistics"""
@@ -982,11 +1065,20 @@ async def get_purchase_order_statistics():
         raise HTTPException(status_code=500, detail=f"Purchase order statistics error: {str(e)}")
 
 @app.post("/inventory/purchase-orders/auto-generate")
-async def auto_generate_purchase_orders():
-    """Auto-generate purchase orders for low stock items"""
+async def auto_generate_purchase_orders(consolidate: bool = False, service_level: float = 0.95):
+    """Auto-generate purchase orders for low stock items (one order per supplier when consolidated)"""
     try:
+        if not 0 < service_level < 1:
+            raise HTTPException(status_code=400, detail="service_level must be between 0 and 1")
+        
         supplies = alerts_service.get_medical_supplies()
-        generated_orders = purchase_order_service.auto_generate_orders_for_low_stock(supplies)
+        generated_orders = purchase_order_service.auto_generate_orders_for_low_stock(
+            supplies,
+            consolidate=consolidate,
+            demand_forecasts=forecast_service.get_item_demand_forecasts(supplies),
+            demand_history=alerts_service.get_daily_consumption(),
+            service_level=service_level
+        )
         
         return {
             "message": f"Generated {len(generated_orders)} purchase orders",
@@ -995,14 +1087,93 @@ async def auto_generate_purchase_orders():
                     "order_id": order.order_id,
                     "item_name": order.item_name,
                     "quantity": order.quantity,
-                    "supplier_name": order.supplier_name
+                    "supplier_name": order.supplier_name,
+                    "line_items": len(order.line_items)
                 }
                 for order in generated_orders
             ]
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Auto-generation error: {str(e)}")
 
+@app.get("/inventory/suppliers/lead-times")
+async def get_supplier_lead_times(supplier_id: Optional[str] = None):
+    """Get actual sent-to-received lead time distributions per supplier"""
+    try:
+        return purchase_order_service.get_supplier_lead_times(supplier_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Lead time statistics error: {str(e)}")
+
+@app.get("/inventory/order-sizing")
+async def get_order_sizing(service_level: float = 0.95):
+    """Get demand-driven reorder points and order quantities for all medical supplies (forecasts first, consumption history as fallback)"""
+    try:
+        if not 0 < service_level < 1:
+            raise HTTPException(status_code=400, detail="service_level must be between 0 and 1")
+        
+        supplies = alerts_service.get_medical_supplies()
+        sizing = purchase_order_service.size_orders(
+            supplies,
+            demand_forecasts=forecast_service.get_item_demand_forecasts(supplies),
+            demand_history=alerts_service.get_daily_consumption(),
+            service_level=service_level
+        )
+        return [item_sizing.model_dump() for item_sizing in sizing.values()]
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Order sizing error: {str(e)}")
+
+# Plain def: FastAPI runs these in its threadpool, so even a slow request cannot stall the event loop
+@app.get("/inventory/forecast")
+def get_demand_forecasts(horizon: int = 30, categories: Optional[str] = None):
+    """Get cached demand forecasts for the next horizon days (comma-separated categories, default all)"""
+    try:
+        requested = [category.strip() for category in categories.split(",")] if categories else None
+        return forecast_service.get_forecasts(horizon, requested)
+    except ForecastNotReadyError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Forecast error: {str(e)}")
+
+@app.get("/inventory/forecast/status")
+async def get_forecast_status():
+    """Get forecast model, cache and background job status"""
+    try:
+        return forecast_service.get_status()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Forecast status error: {str(e)}")
+
+@app.post("/inventory/forecast/refresh")
+async def refresh_demand_forecasts(retrain: bool = False):
+    """Recompute cached forecasts, or retrain the models, in the background"""
+    try:
+        scheduled = forecast_service.schedule_training() if retrain else forecast_service.schedule_refresh()
+        return {
+            "scheduled": scheduled,
+            "job": "training" if retrain else "refresh",
+            "message": "Job scheduled" if scheduled else "Job already running"
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Forecast refresh error: {str(e)}")
+
+@app.get("/inventory/forecast/{category}")
+def get_category_demand_forecast(category: str, horizon: int = 30):
+    """Get the cached demand forecast of one medicine category"""
+    try:
+        return forecast_service.get_forecasts(horizon, [category])[0]
+    except ForecastNotReadyError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except ValueError as e:
+        status_code = 404 if "Unknown categories" in str(e) else 400
+        raise HTTPException(status_code=status_code, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Forecast error: {str(e)}")
+
 @app.get("/inventory/suppliers")
 async def get_suppliers():
     """Get all suppliers"""
@@ -1029,7 +1200,7 @@ async def get_suppliers():
 async def get_rfid_tags():
     """Get all RFID tags"""
     try:
-        return list(rfid_tags.values())
+        return rfid_registry.get_tags()
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"RFID tags retrieval error: {str(e)}")
 
@@ -1037,10 +1208,9 @@ async def get_rfid_tags():
 async def create_rfid_tag(tag: RFIDTag):
     """Create a new RFID tag"""
     try:
-        if tag.tag_id in rfid_tags:
+        if not rfid_registry.add_tag(tag):
             raise HTTPException(status_code=400, detail="RFID tag already exists")
         
-        rfid_tags[tag.tag_id] = tag
         return {"message": f"RFID tag {tag.tag_id} created successfully", "tag": tag}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"RFID tag creation error: {str(e)}")
@@ -1049,10 +1219,11 @@ async def create_rfid_tag(tag: RFIDTag):
 async def get_rfid_tag(tag_id: str):
     """Get a specific RFID tag"""
     try:
-        if tag_id not in rfid_tags:
+        tag = rfid_registry.get_tag(tag_id)
+        if not tag:
             raise HTTPException(status_code=404, detail="RFID tag not found")
         
-        return rfid_tags[tag_id]
+        return tag
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"RFID tag retrieval error: {str(e)}")
 
@@ -1060,22 +1231,20 @@ async def get_rfid_tag(tag_id: str):
 async def update_rfid_tag(tag_id: str, tag: RFIDTag):
     """Update an RFID tag"""
     try:
-        if tag_id not in rfid_tags:
+        if not rfid_registry.update_tag(tag_id, tag):
             raise HTTPException(status_code=404, detail="RFID tag not found")
         
-        rfid_tags[tag_id] = tag
         return {"message": f"RFID tag {tag_id} updated successfully", "tag": tag}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"RFID tag update error: {str(e)}")
 
 @app.delete("/rfid/tags/{tag_id}")
 async def delete_rfid_tag(tag_id: str):
-    """Delete an RFID tag"""
+    """Delete an RFID tag and its assignment"""
     try:
-        if tag_id not in rfid_tags:
+        if not rfid_registry.delete_tag(tag_id):
             raise HTTPException(status_code=404, detail="RFID tag not found")
         
-        del rfid_tags[tag_id]
         return {"message": f"RFID tag {tag_id} deleted successfully"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"RFID tag deletion error: {str(e)}")
@@ -1084,7 +1253,7 @@ async def delete_rfid_tag(tag_id: str):
 async def get_rfid_assignments():
     """Get all RFID assignments"""
     try:
-        return list(rfid_assignments.values())
+        return rfid_registry.get_assignments()
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"RFID assignments retrieval error: {str(e)}")
 
@@ -1092,26 +1261,19 @@ async def get_rfid_assignments():
 async def assign_rfid_tag(request: AssignRFIDRequest):
     """Assign an RFID tag to an item"""
     try:
-        if request.tag_id not in rfid_tags:
+        if not rfid_registry.get_tag(request.tag_id):
             raise HTTPException(status_code=404, detail="RFID tag not found")
         
-        # Check if tag is already assigned
-        for assignment in rfid_assignments.values():
-            if assignment.tag_id == request.tag_id:
-                raise HTTPException(status_code=400, detail="RFID tag is already assigned")
+        if rfid_registry.is_assigned(request.tag_id):
+            raise HTTPException(status_code=400, detail="RFID tag is already assigned")
         
-        assignment_id = f"assign_{len(rfid_assignments) + 1:04d}"
-        assignment = RFIDAssignment(
-            assignment_id=assignment_id,
+        assignment = rfid_registry.assign(
             tag_id=request.tag_id,
             item_id=request.item_id,
             item_type=request.item_type,
-            assigned_at=datetime.now().isoformat(),
             assigned_by=request.assigned_by,
             notes=request.notes
         )
-        
-        rfid_assignments[assignment_id] = assignment
         return {"message": f"RFID tag {request.tag_id} assigned successfully", "assignment": assignment}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"RFID assignment error: {str(e)}")
@@ -1120,10 +1282,11 @@ async def assign_rfid_tag(request: AssignRFIDRequest):
 async def get_rfid_assignment(assignment_id: str):
     """Get a specific RFID assignment"""
     try:
-        if assignment_id not in rfid_assignments:
+        assignment = rfid_registry.get_assignment(assignment_id)
+        if not assignment:
             raise HTTPException(status_code=404, detail="RFID assignment not found")
         
-        return rfid_assignments[assignment_id]
+        return assignment
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"RFID assignment retrieval error: {str(e)}")
 
@@ -1131,11 +1294,9 @@ async def get_rfid_assignment(assignment_id: str):
 async def remove_rfid_assignment(assignment_id: str):
     """Remove an RFID assignment"""
     try:
-        if assignment_id not in rfid_assignments:
+        if not rfid_registry.unassign(assignment_id):
             raise HTTPException(status_code=404, detail="RFID assignment not found")
         
-        assignment = rfid_assignments[assignment_id]
-        del rfid_assignments[assignment_id]
         return {"message": f"RFID assignment {assignment_id} removed successfully"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"RFID assignment removal error: {str(e)}")
@@ -1144,10 +1305,7 @@ async def remove_rfid_assignment(assignment_id: str):
 async def get_item_rfid_info(item_id: str):
     """Get RFID information for a specific item"""
     try:
-        item_assignments = []
-        for assignment in rfid_assignments.values():
-            if assignment.item_id == item_id:
-                item_assignments.append(assignment)
+        item_assignments = rfid_registry.get_item_assignments(item_id)
         
         if not item_assignments:
             return {"item_id": item_id, "rfid_assignments": [], "message": "No RFID tags assigned to this item"}
@@ -1164,27 +1322,116 @@ async def get_item_rfid_info(item_id: str):
 async def scan_rfid_tag(tag_id: str):
     """Simulate scanning an RFID tag"""
     try:
-        if tag_id not in rfid_tags:
+        scanned_at = datetime.now()
+        result = rfid_registry.scan(tag_id, scanned_at)
+        if not result:
             raise HTTPException(status_code=404, detail="RFID tag not found")
         
-        # Update last seen timestamp
-        rfid_tags[tag_id].last_seen = datetime.now().isoformat()
-        
-        # Find assignment for this tag
-        assignment = None
-        for assign in rfid_assignments.values():
-            if assign.tag_id == tag_id:
-                assignment = assign
-                break
-        
+        tag, assignment = result
         return {
             "tag_id": tag_id,
-            "tag_info": rfid_tags[tag_id],
+            "tag_info": tag,
             "assignment": assignment,
-            "scanned_at": datetime.now().isoformat()
+            "scanned_at": scanned_at.isoformat()
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"RFID scan error: {str(e)}")
 
+@app.post("/rfid/reads")
+async def ingest_rfid_reads(request: Request, reader_id: Optional[str] = None):
+    """Ingest a (chunked) stream of raw RFID reads, one "tag_id[,epoch_timestamp[,reader_id]]" per line"""
+    try:
+        accepted = 0
+        remainder = ""
+        async for chunk in request.stream():
+            lines = (remainder + chunk.decode("utf-8")).split("\n")
+            # The last line may be cut off mid-read; keep it for the next chunk
+            remainder = lines.pop()
+            accepted += rfid_read_ingestor.ingest_lines(lines, default_reader_id=reader_id)
+        accepted += rfid_read_ingestor.ingest_lines([remainder], default_reader_id=reader_id)
+        
+        rfid_read_ingestor.sweep()
+        events = rfid_read_ingestor.flush()
+        return {
+            "accepted_reads": accepted,
+            "events": [event.model_dump(mode="json") for event in events]
+        }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Malformed RFID read: {str(e)}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"RFID read ingestion error: {str(e)}")
+
+@app.websocket("/rfid/reads/ws")
+async def ingest_rfid_reads_ws(websocket: WebSocket, reader_id: Optional[str] = None):
+    """Ingest raw RFID reads over a WebSocket; each message holds newline-separated reads"""
+    await websocket.accept()
+    try:
+        while True:
+            message = await websocket.receive_text()
+            try:
+                accepted = rfid_read_ingestor.ingest_lines(message.split("\n"), default_reader_id=reader_id)
+            except ValueError as e:
+                await websocket.send_json({"error": f"Malformed RFID read: {str(e)}"})
+                continue
+            
+            rfid_read_ingestor.sweep()
+            events = rfid_read_ingestor.flush()
+            await websocket.send_json({
+                "accepted_reads": accepted,
+                "events": [event.model_dump(mode="json") for event in events]
+            })
+    except WebSocketDisconnect:
+        rfid_read_ingestor.flush()
+
+@app.get("/rfid/reads/statistics")
+async def get_rfid_read_statistics():
+    """Get RFID read ingestion statistics"""
+    try:
+        return rfid_read_ingestor.get_statistics()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"RFID read statistics error: {str(e)}")
+
+@app.post("/rfid/cycle-count")
+async def run_rfid_cycle_count(request: RFIDCycleCountRequest, limit: int = 100):
+    """Reconcile seen tags against assignments and recorded stock
+    
+    Tag ID lists in the response are truncated to limit entries; the totals are exact.
+    """
+    try:
+        report = rfid_reconciliation_engine.cycle_count(request.tag_ids, apply=request.apply)
+        return _summarize_cycle_count(report, limit)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"RFID cycle count error: {str(e)}")
+
+@app.get("/rfid/reconciliation/report")
+async def get_rfid_reconciliation_report(limit: int = 100):
+    """Get the most recent cycle count report"""
+    try:
+        report = rfid_reconciliation_engine.last_report
+        if not report:
+            raise HTTPException(status_code=404, detail="No cycle count has been run yet")
+        return _summarize_cycle_count(report, limit)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"RFID reconciliation report error: {str(e)}")
+
+@app.get("/rfid/reconciliation/statistics")
+async def get_rfid_reconciliation_statistics():
+    """Get RFID-driven stock change and cycle count statistics"""
+    try:
+        return rfid_reconciliation_engine.get_statistics()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"RFID reconciliation statistics error: {str(e)}")
+
+def _summarize_cycle_count(report, limit: int) -> Dict[str, Any]:
+    tag_lists = ("missing_tag_ids", "unassigned_tag_ids", "unknown_tag_ids")
+    summary = report.model_dump(mode="json", exclude=set(tag_lists))
+    for key in tag_lists:
+        tag_ids = getattr(report, key)
+        summary[key.replace("_ids", "s")] = len(tag_ids)
+        summary[key] = tag_ids[:limit]
+    return summary
+
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000) 
\ No newline at end of file
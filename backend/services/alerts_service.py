@@ -9,6 +9,7 @@ import os
 from typing import List, Dict, Any, Optional
 from datetime import datetime, timedelta
 import json
+import threading
 from enum import Enum
 
 # Add the project root to the Python path
@@ -50,6 +51,11 @@ class AlertsService:
     def __init__(self):
         self.alerts: List[Alert] = []
         self.medical_supplies: List[MedicalSupply] = []
+        # item_id -> {ISO date: units consumed that day}, fed by stock decreases
+        self.consumption_history: Dict[str, Dict[str, int]] = {}
+        # Stock and consumption also change from the RFID exit sweeps on the scheduler thread;
+        # reentrant because stock updates record consumption
+        self._stock_lock = threading.RLock()
         self.scheduler = BackgroundScheduler()
         self._setup_scheduled_jobs()
         self._load_sample_data()
@@ -207,12 +213,60 @@ class AlertsService:
     
     def update_stock(self, item_id: str, new_quantity: int) -> bool:
         """Update stock quantity for a medical supply"""
-        for supply in self.medical_supplies:
-            if supply.id == item_id:
-                supply.current_stock = new_quantity
-                return True
+        with self._stock_lock:
+            for supply in self.medical_supplies:
+                if supply.id == item_id:
+                    if new_quantity < supply.current_stock:
+                        self.record_consumption(item_id, supply.current_stock - new_quantity)
+                    supply.current_stock = new_quantity
+                    return True
         return False
     
+    def apply_stock_adjustments(self, adjustments: Dict[str, int],
+                                record_consumption: bool = True) -> Dict[str, int]:
+        """Apply a batch of relative stock changes (item_id -> delta) in one pass
+        
+        Stock never drops below zero; decreases are recorded as consumption
+        unless record_consumption is False.
+        Unknown item IDs are skipped.
+        
+        Returns:
+            The new stock level of every adjusted item.
+        """
+        supplies_by_id = {supply.id: supply for supply in self.medical_supplies}
+        updated = {}
+        with self._stock_lock:
+            for item_id, delta in adjustments.items():
+                supply = supplies_by_id.get(item_id)
+                if supply is None or delta == 0:
+                    continue
+                new_quantity = max(0, supply.current_stock + delta)
+                if record_consumption and new_quantity < supply.current_stock:
+                    self.record_consumption(item_id, supply.current_stock - new_quantity)
+                supply.current_stock = new_quantity
+                updated[item_id] = new_quantity
+        return updated
+    
+    def record_consumption(self, item_id: str, quantity: int, day: Optional[datetime] = None):
+        """Record units consumed for an item on a given day (defaults to today)"""
+        day_key = (day or datetime.now()).date().isoformat()
+        with self._stock_lock:
+            item_history = self.consumption_history.setdefault(item_id, {})
+            item_history[day_key] = item_history.get(day_key, 0) + quantity
+    
+    def get_daily_consumption(self, days: int = 30) -> Dict[str, List[float]]:
+        """Get per-item daily consumption series for the last N days, oldest first"""
+        today = datetime.now().date()
+        day_keys = [(today - timedelta(days=offset)).isoformat() for offset in range(days - 1, -1, -1)]
+        
+        history = {}
+        with self._stock_lock:
+            for item_id, item_history in self.consumption_history.items():
+                # Start each series at the first recorded day so new items are not padded with zeros
+                first_day = min(item_history)
+                history[item_id] = [float(item_history.get(key, 0)) for key in day_keys if key >= first_day]
+        return history
+    
     def add_medical_supply(self, supply: MedicalSupply) -> bool:
         """Add a new medical supply"""
         self.medical_supplies.append(supply)
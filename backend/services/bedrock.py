@@ -1,23 +1,73 @@
 # This file will contain the logic for interacting with AWS Bedrock. 
 
-import json
-from typing import Optional
-from ..config import settings
-from ..clients import bedrock_runtime
-from ..logger import logger
+from typing import Annotated, Any, Iterator, List, Optional, Tuple
+from pydantic import BaseModel, Field, TypeAdapter
+from backend.config import settings
+from backend.logger import logger
+from .bedrock_gateway import bedrock_gateway
+from .json_stream import IncrementalJSONObjectParser
+from .response_cache import response_cache
 import base64
+import time
 
-# The Bedrock client is now initialized in backend/clients.py
+# Calls go through the Bedrock gateway (pooled client, rate limits, retries)
 
-def analyze_text(transcript: str) -> dict:
+
+def _invoke_cached(model_id: str, body: dict, user_id: Optional[str] = None) -> dict:
     """
-    Analyzes the given transcript using AWS Bedrock with Claude 3 Opus.
+    Invokes the model through the response cache, when it is enabled, scoped to user_id.
+    """
+    if not settings.response_cache_enabled:
+        return bedrock_gateway.invoke(model_id, body)
+    return response_cache.get_or_invoke(model_id, body, bedrock_gateway.invoke, user_id)
 
-    Args:
-        transcript: The text transcript of a conversation.
 
-    Returns:
-        A dictionary containing the structured analysis from the model.
+class AnalysisEntity(BaseModel):
+    name: str
+    type: str
+
+
+class AnalysisRelationship(BaseModel):
+    subject: str
+    predicate: str
+    object: str
+
+
+class TranscriptAnalysis(BaseModel):
+    """Schema of the JSON object analyze_text asks the model for"""
+    summary: str
+    importance_score: float = Field(0.5, ge=0.0, le=1.0)
+    entities: List[AnalysisEntity] = []
+    relationships: List[AnalysisRelationship] = []
+
+
+# One validator per field, carrying the field's constraints, so fields can be checked as they stream in
+_ANALYSIS_FIELDS = {
+    name: TypeAdapter(Annotated[(field.annotation, *field.metadata)] if field.metadata else field.annotation)
+    for name, field in TranscriptAnalysis.model_fields.items()
+}
+
+
+def _validate_analysis_field(key: str, value: Any) -> Any:
+    """
+    Validates one field of the analysis as soon as it is parsed; unknown fields pass through.
+    """
+    adapter = _ANALYSIS_FIELDS.get(key)
+    if adapter is None:
+        return value
+    return adapter.dump_python(adapter.validate_python(value))
+
+
+def _finish_analysis(fields: dict) -> dict:
+    """
+    Validates the complete analysis and returns it as a plain dictionary.
+    """
+    return TranscriptAnalysis.model_validate(fields).model_dump()
+
+
+def _analysis_body(transcript: str) -> dict:
+    """
+    Builds the request body for transcript analysis.
     """
     # We will refine this prompt later. This is the core of the AI's "brain".
     prompt = f"""
@@ -52,7 +102,7 @@ def analyze_text(transcript: str) -> dict:
         Assistant:
     """
 
-    body = json.dumps({
+    return {
         "anthropic_version": "bedrock-2023-05-31",
         "max_tokens": 4096,
         "temperature": 0.5,
@@ -62,53 +112,88 @@ def analyze_text(transcript: str) -> dict:
                 "content": [{"type": "text", "text": prompt}],
             }
         ],
-    })
+    }
+
+
+def analyze_text(transcript: str, user_id: Optional[str] = None) -> dict:
+    """
+    Analyzes the given transcript using AWS Bedrock with Claude 3 Opus.
+
+    Args:
+        transcript: The text transcript of a conversation.
+        user_id: The user the transcript belongs to; cached analyses are only reused for them.
+
+    Returns:
+        A dictionary containing the structured analysis from the model.
+    """
+    body = _analysis_body(transcript)
 
     try:
-        response = bedrock_runtime.invoke_model(
-            body=body,
-            modelId=settings.bedrock_model_id,
-            contentType="application/json",
-            accept="application/json",
-        )
-
-        response_body_raw = response.get("body").read()
-        # print("--- RAW BEDROCK RESPONSE ---")
-        # print(response_body_raw.decode('utf-8'))
-        # print("--------------------------")
-
-        response_body = json.loads(response_body_raw)
+        response_body = _invoke_cached(settings.bedrock_model_id, body, user_id)
         
         # The actual response is nested in the 'content' list
         if not response_body.get("content"):
              raise ValueError("Bedrock response is missing 'content' block or it is empty.")
 
         analysis_json_string = response_body["content"][0].get("text", "")
-        print("--- EXTRACTED MODEL OUTPUT ---")
-        print(analysis_json_string)
-        print("----------------------------")
+        logger.debug(f"Analysis model output: {analysis_json_string}")
 
         if not analysis_json_string:
             raise ValueError("Model returned an empty string.")
 
-        # Clean the string: find the first '{' and the last '}'
-        try:
-            start_index = analysis_json_string.index('{')
-            end_index = analysis_json_string.rindex('}') + 1
-            cleaned_json_string = analysis_json_string[start_index:end_index]
-            return json.loads(cleaned_json_string)
-        except ValueError:
-            raise ValueError("Could not find a valid JSON object in the model's response.")
+        parser = IncrementalJSONObjectParser(_validate_analysis_field)
+        parser.feed(analysis_json_string)
+        return _finish_analysis(parser.close())
 
     except Exception as e:
         logger.error(f"Error processing Bedrock response: {e}")
+        # Do not keep serving a response that could not be used
+        response_cache.invalidate(settings.bedrock_model_id, body, user_id)
         # In a real app, you'd want more robust error handling
         return {"error": str(e)}
 
 
-def synthesize_answer(query: str, kendra_results: list[str], neptune_results: list[str]) -> str:
+def stream_analysis(transcript: str, user_id: Optional[str] = None) -> Iterator[Tuple[str, Any]]:
     """
-    Uses a fast LLM to synthesize a final answer from a query and retrieved context.
+    Streams the analysis of a transcript, yielding each validated (field, value)
+    pair as soon as the model closes it, e.g. "entities" before "relationships".
+    Raises ValueError if the output is not a valid analysis.
+    """
+    model_id = settings.bedrock_model_id
+    body = _analysis_body(transcript)
+    parser = IncrementalJSONObjectParser(_validate_analysis_field)
+
+    embedding = None
+    if settings.response_cache_enabled:
+        cached, embedding = response_cache.lookup(model_id, body, user_id)
+        if cached is not None:
+            try:
+                yield from parser.feed(cached["content"][0].get("text", ""))
+                _finish_analysis(parser.close())
+            except Exception:
+                response_cache.invalidate(model_id, body, user_id)
+                raise
+            return
+
+    produced = []
+    usage = {}
+    start = time.perf_counter()
+    for text in bedrock_gateway.stream(model_id, body, usage):
+        produced.append(text)
+        yield from parser.feed(text)
+        if parser.done:
+            break
+    # Checks required fields and ranges before the response is cached
+    _finish_analysis(parser.close())
+    if settings.response_cache_enabled:
+        response_cache.put(model_id, body, {"content": [{"type": "text", "text": "".join(produced)}],
+                                            "usage": usage}, (time.perf_counter() - start) * 1000, embedding,
+                           user_id)
+
+
+def _synthesis_body(query: str, kendra_results: list[str], neptune_results: list[str]) -> dict:
+    """
+    Builds the request body for answer synthesis, shared by the blocking and streaming calls.
     """
     kendra_context = "\\n".join(kendra_results)
     neptune_context = "\\n".join(neptune_results)
@@ -141,7 +226,7 @@ def synthesize_answer(query: str, kendra_results: list[str], neptune_results: li
         Assistant:
     """
 
-    body = json.dumps({
+    return {
         "anthropic_version": "bedrock-2023-05-31",
         "max_tokens": 1024,
         "temperature": 0.5,
@@ -151,23 +236,61 @@ def synthesize_answer(query: str, kendra_results: list[str], neptune_results: li
                 "content": [{"type": "text", "text": prompt}],
             }
         ],
-    })
+    }
+
+
+SYNTHESIS_FALLBACK = "I'm sorry, I'm having trouble formulating an answer right now."
+
+
+def synthesize_answer(query: str, kendra_results: list[str], neptune_results: list[str],
+                      user_id: Optional[str] = None) -> str:
+    """
+    Uses a fast LLM to synthesize a final answer from a query and retrieved context.
+    Cached answers are only reused for the same user_id.
+    """
+    body = _synthesis_body(query, kendra_results, neptune_results)
 
     try:
-        response = bedrock_runtime.invoke_model(
-            body=body,
-            modelId=settings.bedrock_synthesis_model_id,
-            contentType="application/json",
-            accept="application/json",
-        )
-
-        response_body = json.loads(response.get("body").read())
+        response_body = _invoke_cached(settings.bedrock_synthesis_model_id, body, user_id)
         answer = response_body["content"][0].get("text", "")
         return answer
 
     except Exception as e:
         logger.error(f"Error synthesizing answer with Bedrock: {e}")
-        return "I'm sorry, I'm having trouble formulating an answer right now."
+        return SYNTHESIS_FALLBACK
+
+
+def stream_synthesized_answer(query: str, kendra_results: list[str], neptune_results: list[str],
+                              user_id: Optional[str] = None) -> Iterator[str]:
+    """
+    Same answer as synthesize_answer, yielded as text deltas while the model generates it.
+    """
+    model_id = settings.bedrock_synthesis_model_id
+    body = _synthesis_body(query, kendra_results, neptune_results)
+    embedding = None
+    if settings.response_cache_enabled:
+        cached, embedding = response_cache.lookup(model_id, body, user_id)
+        if cached is not None:
+            yield cached["content"][0].get("text", "")
+            return
+
+    produced = []
+    usage = {}
+    start = time.perf_counter()
+    try:
+        for text in bedrock_gateway.stream(model_id, body, usage):
+            produced.append(text)
+            yield text
+        if settings.response_cache_enabled:
+            # Cached in the shape of an InvokeModel response, so synthesize_answer can reuse it
+            response_cache.put(model_id, body, {"content": [{"type": "text", "text": "".join(produced)}],
+                                                "usage": usage}, (time.perf_counter() - start) * 1000, embedding,
+                               user_id)
+    except Exception as e:
+        logger.error(f"Error streaming answer from Bedrock: {e}")
+        # Text already spoken cannot be taken back, so only fall back if nothing was produced
+        if not produced:
+            yield SYNTHESIS_FALLBACK
 
 
 def extract_entity_from_query(query: str) -> Optional[str]:
@@ -185,23 +308,17 @@ def extract_entity_from_query(query: str) -> Optional[str]:
 
         Assistant:
     """
-    body = json.dumps({
+    body = {
         "anthropic_version": "bedrock-2023-05-31",
         "max_tokens": 50,
         "temperature": 0.1,
         "messages": [
             { "role": "user", "content": [{"type": "text", "text": prompt}] }
         ],
-    })
+    }
 
     try:
-        response = bedrock_runtime.invoke_model(
-            body=body,
-            modelId=settings.bedrock_synthesis_model_id,  # Use the fast model
-            contentType="application/json",
-            accept="application/json",
-        )
-        response_body = json.loads(response.get("body").read())
+        response_body = bedrock_gateway.invoke(settings.bedrock_synthesis_model_id, body)  # Use the fast model
         entity = response_body["content"][0].get("text", "").strip()
         logger.info(f"Extracted entity '{entity}' from query '{query}'")
         return entity if entity else None
@@ -247,16 +364,10 @@ def analyze_image(image_data: bytes, user_prompt: str) -> Optional[str]:
         ]
     }
     
-    body = json.dumps(prompt_with_image)
+    body = prompt_with_image
 
     try:
-        response = bedrock_runtime.invoke_model(
-            body=body,
-            modelId=settings.bedrock_model_id, # Use the powerful model for analysis
-            contentType="application/json",
-            accept="application/json",
-        )
-        response_body = json.loads(response.get("body").read())
+        response_body = bedrock_gateway.invoke(settings.bedrock_model_id, body) # Use the powerful model for analysis
         description = response_body["content"][0].get("text", "")
         logger.info("Image analysis successful.")
         return description
@@ -0,0 +1,241 @@
+# Concurrent access to AWS Bedrock: pooled connections, per-model rate limits,
+# retries with backoff on throttling and coalescing of identical in-flight requests.
+
+import asyncio
+import hashlib
+import json
+import random
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from backend.config import settings
+from backend.logger import logger
+
+# Error codes worth retrying: throttling and transient service-side failures
+RETRYABLE_ERROR_CODES = {
+    "ThrottlingException",
+    "TooManyRequestsException",
+    "ServiceUnavailableException",
+    "InternalServerException",
+    "ModelNotReadyException",
+}
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: refills at rate tokens per second up to capacity.
+    """
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """
+        Takes one token, sleeping until one is available. Returns the seconds waited.
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+def _error_code(error: Exception) -> Optional[str]:
+    # botocore ClientError (and look-alikes) carry the service error code in .response
+    response = getattr(error, "response", None)
+    if isinstance(response, dict):
+        return response.get("Error", {}).get("Code")
+    return None
+
+
+class BedrockGateway:
+    """
+    Runs Bedrock InvokeModel calls on a thread pool. Each call waits for a token
+    from its model's bucket, retries throttling errors with exponential backoff
+    and full jitter, and shares its result with identical requests made while
+    it is in flight.
+    """
+
+    def __init__(self, client=None, max_workers: int = 16, requests_per_second: float = 5.0,
+                 burst: int = 10, rate_limits: Optional[Dict[str, float]] = None,
+                 max_retries: int = 5, base_delay: float = 0.25, max_delay: float = 8.0):
+        self._client = client
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="bedrock")
+        self.requests_per_second = requests_per_second
+        self.burst = burst
+        # Per-model overrides of requests_per_second
+        self.rate_limits = rate_limits or {}
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._in_flight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self.stats = {
+            "requests": 0,
+            "calls": 0,
+            "coalesced": 0,
+            "streams": 0,
+            "retries": 0,
+            "failures": 0,
+            "rate_limit_wait_seconds": 0.0,
+            "call_seconds": 0.0,
+        }
+
+    @property
+    def client(self):
+        if self._client is None:
+            # Imported lazily so a gateway with an injected client needs no AWS setup
+            from backend.clients import bedrock_gateway_runtime
+            self._client = bedrock_gateway_runtime
+        return self._client
+
+    def _bucket(self, model_id: str) -> TokenBucket:
+        with self._lock:
+            bucket = self._buckets.get(model_id)
+            if bucket is None:
+                rate = self.rate_limits.get(model_id, self.requests_per_second)
+                bucket = self._buckets[model_id] = TokenBucket(rate, self.burst)
+            return bucket
+
+    def submit(self, model_id: str, body: Dict[str, Any]) -> Future:
+        """
+        Schedules an InvokeModel call and returns a Future of the parsed response body.
+        An identical request (same model and body) already in flight is reused.
+        """
+        payload = json.dumps(body, sort_keys=True)
+        key = hashlib.sha256(f"{model_id}\n{payload}".encode("utf-8")).hexdigest()
+
+        with self._lock:
+            self.stats["requests"] += 1
+            future = self._in_flight.get(key)
+            if future is not None:
+                self.stats["coalesced"] += 1
+                return future
+            future = self.executor.submit(self._invoke, model_id, payload)
+            self._in_flight[key] = future
+
+        future.add_done_callback(lambda _: self._release(key, future))
+        return future
+
+    def _release(self, key: str, future: Future):
+        with self._lock:
+            if self._in_flight.get(key) is future:
+                del self._in_flight[key]
+
+    def invoke(self, model_id: str, body: Dict[str, Any], timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Blocking InvokeModel through the gateway. Raises the last error once retries are exhausted.
+        """
+        return self.submit(model_id, body).result(timeout=timeout)
+
+    async def ainvoke(self, model_id: str, body: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Awaitable InvokeModel through the gateway, for use from asyncio code.
+        """
+        return await asyncio.wrap_future(self.submit(model_id, body))
+
+    def _invoke(self, model_id: str, payload: str) -> Dict[str, Any]:
+        response = self._call_with_retry(model_id, lambda: self.client.invoke_model(
+            body=payload,
+            modelId=model_id,
+            contentType="application/json",
+            accept="application/json",
+        ))
+        return json.loads(response.get("body").read())
+
+    def _call_with_retry(self, model_id: str, call: Callable[[], Any]) -> Any:
+        """
+        Makes one rate-limited API call, retrying retryable errors with backoff.
+        """
+        bucket = self._bucket(model_id)
+        for attempt in range(self.max_retries + 1):
+            waited = bucket.acquire()
+            start = time.perf_counter()
+            try:
+                result = call()
+                self._record(waited, time.perf_counter() - start)
+                return result
+            except Exception as e:
+                self._record(waited, time.perf_counter() - start)
+                code = _error_code(e)
+                if code not in RETRYABLE_ERROR_CODES or attempt == self.max_retries:
+                    with self._lock:
+                        self.stats["failures"] += 1
+                    raise
+                delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+                logger.warning(f"Bedrock {code} for {model_id}, retrying in {delay:.2f}s "
+                               f"(attempt {attempt + 1}/{self.max_retries})")
+                with self._lock:
+                    self.stats["retries"] += 1
+                time.sleep(delay)
+
+    def stream(self, model_id: str, body: Dict[str, Any], usage: Optional[Dict[str, int]] = None) -> Iterator[str]:
+        """
+        Yields the text deltas of an InvokeModelWithResponseStream call as they arrive.
+        Opening the stream is rate limited and retried like invoke(); errors after
+        the first event are raised, since the caller may already have used the text.
+        If usage is given, the input and output token counts are written into it.
+        """
+        with self._lock:
+            self.stats["requests"] += 1
+            self.stats["streams"] += 1
+        payload = json.dumps(body, sort_keys=True)
+        response = self._call_with_retry(model_id, lambda: self.client.invoke_model_with_response_stream(
+            body=payload,
+            modelId=model_id,
+            contentType="application/json",
+            accept="application/json",
+        ))
+
+        for event in response.get("body"):
+            chunk = event.get("chunk")
+            if chunk is None:
+                # Any other event is an error raised inside the stream, e.g. a throttlingException
+                raise RuntimeError(f"Bedrock stream error: {event}")
+            message = json.loads(chunk["bytes"])
+            kind = message.get("type")
+            if kind == "content_block_delta" and message["delta"].get("type") == "text_delta":
+                yield message["delta"]["text"]
+            elif usage is not None and kind == "message_start":
+                usage.update(message["message"].get("usage", {}))
+            elif usage is not None and kind == "message_delta":
+                usage.update(message.get("usage", {}))
+
+    def _record(self, waited: float, seconds: float):
+        with self._lock:
+            self.stats["calls"] += 1
+            self.stats["rate_limit_wait_seconds"] += waited
+            self.stats["call_seconds"] += seconds
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """
+        Returns request, retry and coalescing counters plus the current in-flight count.
+        """
+        with self._lock:
+            return {**self.stats, "in_flight": len(self._in_flight)}
+
+    def shutdown(self, wait: bool = True):
+        self.executor.shutdown(wait=wait)
+
+
+# Global instance
+bedrock_gateway = BedrockGateway(
+    max_workers=settings.bedrock_max_concurrency,
+    requests_per_second=settings.bedrock_requests_per_second,
+    burst=settings.bedrock_burst,
+    max_retries=settings.bedrock_max_retries,
+)
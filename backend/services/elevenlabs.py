@@ -1,7 +1,12 @@
-from ..clients import elevenlabs_client
-from ..logger import logger
+from backend.clients import elevenlabs_client
+from backend.logger import logger
 from io import BytesIO
-from typing import Optional
+from typing import Iterator, Optional
+
+VOICE_ID = "JBFqnCBsd6RMkjVDRZzb"  # A default calm, male voice
+TTS_MODEL_ID = "eleven_multilingual_v2"
+# Lower-latency model for speech generated sentence by sentence while an answer streams in
+STREAMING_TTS_MODEL_ID = "eleven_flash_v2_5"
 
 def speech_to_text(audio_data: bytes) -> Optional[str]:
     """
@@ -30,8 +35,8 @@ def text_to_speech(text: str) -> Optional[bytes]:
         # The result is an iterator of audio chunks (bytes)
         audio_stream = elevenlabs_client.text_to_speech.convert(
             text=text,
-            voice_id="JBFqnCBsd6RMkjVDRZzb",  # A default calm, male voice
-            model_id="eleven_multilingual_v2",
+            voice_id=VOICE_ID,
+            model_id=TTS_MODEL_ID,
         )
         
         # Concatenate the chunks into a single bytes object
@@ -40,4 +45,22 @@ def text_to_speech(text: str) -> Optional[bytes]:
         return audio_bytes
     except Exception as e:
         logger.error(f"Error during ElevenLabs text-to-speech: {e}")
-        return None 
\ No newline at end of file
+        return None 
+
+def text_to_speech_stream(text: str, previous_text: Optional[str] = None) -> Iterator[bytes]:
+    """
+    Converts text to speech, yielding audio chunks as ElevenLabs produces them.
+    previous_text is the text spoken just before, so intonation carries across
+    sentences synthesized separately.
+    """
+    options = {"previous_text": previous_text} if previous_text else {}
+    audio_stream = elevenlabs_client.text_to_speech.stream(
+        voice_id=VOICE_ID,
+        text=text,
+        model_id=STREAMING_TTS_MODEL_ID,
+        output_format="mp3_44100_128",
+        **options,
+    )
+    for chunk in audio_stream:
+        if chunk:
+            yield chunk
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+Forecast Service for Clinic Inventory Management System
+Serves cached medicine demand forecasts from a predictor loaded once per process
+"""
+
+import sys
+import os
+import threading
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import List, Dict, Any, Optional, Tuple
+from datetime import datetime
+
+# The ML models live at the repository root, next to the backend directory
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.insert(0, REPO_ROOT)
+
+from ml_models.medicine_restocking_predictor import MedicineRestockingPredictor, DEMAND_QUANTILES, quantile_label
+
+class ForecastNotReadyError(Exception):
+    """Raised when no forecasts are available yet and loading or training has been scheduled"""
+
+class ForecastService:
+    """Demand forecasts per (category, horizon), cached until sales data or models change
+
+    The full 1..max_horizon curve of every category is computed in one pass
+    and kept together with the version (sales CSV signature, model files
+    signature) it was computed from. When the version moves on, requests
+    get the previous curves flagged as stale while a refresh runs on a
+    single background worker; training also runs there on a separate
+    predictor instance, so requests never wait on it.
+    """
+
+    def __init__(self, base_dir: str = REPO_ROOT, model_mode: str = 'per_category'):
+        self.base_dir = base_dir
+        self.model_mode = model_mode
+        self.predictor: Optional[MedicineRestockingPredictor] = None
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="forecast")
+        self._lock = threading.Lock()
+        self._curves: Dict[str, List[float]] = {}
+        # Running per-tree demand totals (horizon x trees) per category, for quantiles of any horizon
+        self._tree_totals: Dict[str, np.ndarray] = {}
+        self._curves_version: Optional[Tuple] = None
+        self._computed_at: Optional[datetime] = None
+        # (category, horizon) -> forecast entry derived from the cached curves
+        self._entries: Dict[Tuple[str, int], Dict[str, Any]] = {}
+        self._refresh_future: Optional[Future] = None
+        self._training_future: Optional[Future] = None
+        self.last_error: Optional[str] = None
+        self.stats = {"hits": 0, "misses": 0, "stale_hits": 0, "refreshes": 0, "trainings": 0}
+
+    # Versioning
+
+    def _model_signature(self, predictor: MedicineRestockingPredictor) -> Tuple:
+        manifest_file = os.path.join(predictor.compact_path, 'manifest.json')
+        if os.path.exists(manifest_file):
+            return ('compact', os.stat(manifest_file).st_mtime_ns)
+        model_files = [os.path.join(predictor.model_path, name) for name in os.listdir(predictor.model_path)]
+        return ('pickle', max((os.stat(path).st_mtime_ns for path in model_files), default=0))
+
+    def _current_version(self, predictor: MedicineRestockingPredictor) -> Tuple:
+        return (predictor.feature_store.source_signature(), self._model_signature(predictor))
+
+    # Predictor lifecycle
+
+    def _new_predictor(self) -> MedicineRestockingPredictor:
+        return MedicineRestockingPredictor(model_mode=self.model_mode, base_dir=self.base_dir)
+
+    def _get_predictor(self) -> MedicineRestockingPredictor:
+        """Load the predictor on first use; schedules training if no models exist
+
+        Loading reads every model from disk, so this only runs on the background worker.
+        """
+        with self._lock:
+            if self.predictor is not None:
+                return self.predictor
+
+            predictor = self._new_predictor()
+            if predictor.load_models():
+                self.predictor = predictor
+                return predictor
+
+        self.schedule_training()
+        raise ForecastNotReadyError("No trained forecast models yet; training has been scheduled")
+
+    def schedule_training(self) -> bool:
+        """Retrain the models in the background; returns False if training is already running"""
+        with self._lock:
+            if self._training_future is not None and not self._training_future.done():
+                return False
+            self._training_future = self.executor.submit(self._train)
+            return True
+
+    def _train(self):
+        try:
+            print(f"[{datetime.now()}] Training forecast models in the background...")
+            predictor = self._new_predictor()
+            predictor.train_models()
+            with self._lock:
+                self.predictor = predictor
+                self.stats["trainings"] += 1
+                self.last_error = None
+            self._refresh()
+        except Exception as e:
+            self.last_error = f"Training failed: {str(e)}"
+            print(f"Error training forecast models: {e}")
+
+    # Caching
+
+    def schedule_refresh(self) -> bool:
+        """Recompute the cached curves in the background; returns False if a refresh is already queued"""
+        with self._lock:
+            if self._refresh_future is not None and not self._refresh_future.done():
+                return False
+            self._refresh_future = self.executor.submit(self._refresh)
+            return True
+
+    def _refresh(self):
+        try:
+            try:
+                predictor = self._get_predictor()
+            except ForecastNotReadyError:
+                # No models on disk: training has been queued and refreshes when done
+                return
+            version = self._current_version(predictor)
+            if self._curves_version is not None and version[1] != self._curves_version_models():
+                # Models were retrained elsewhere (e.g. run_ml_predictions.py): load them fresh
+                reloaded = self._new_predictor()
+                if reloaded.load_models():
+                    predictor = reloaded
+            self._compute(predictor, version)
+        except Exception as e:
+            self.last_error = f"Refresh failed: {str(e)}"
+            print(f"Error refreshing forecasts: {e}")
+
+    def _curves_version_models(self) -> Optional[Tuple]:
+        return self._curves_version[1] if self._curves_version else None
+
+    def _compute(self, predictor: MedicineRestockingPredictor, version: Tuple):
+        curves = predictor.forecast_demand_curves(predictor.max_horizon)
+        tree_curves = predictor.forecast_tree_curves(predictor.max_horizon)
+        with self._lock:
+            self.predictor = predictor
+            self._curves = {category: curve.tolist() for category, curve in curves.items()}
+            self._tree_totals = {category: np.cumsum(trees, axis=0) for category, trees in tree_curves.items()}
+            self._curves_version = version
+            self._computed_at = datetime.now()
+            self._entries = {}
+            self.stats["refreshes"] += 1
+
+    def _entry(self, category: str, horizon: int) -> Dict[str, Any]:
+        """Build (or reuse) the forecast entry for one category and horizon from the cached curves"""
+        key = (category, horizon)
+        entry = self._entries.get(key)
+        if entry is None:
+            curve = self._curves[category][:horizon]
+            entry = {
+                "category": category,
+                "description": self.predictor.get_medicine_info().get(category, category),
+                "horizon_days": horizon,
+                "demand_curve": curve,
+                "total_demand": sum(curve),
+                "mean_daily_demand": sum(curve) / horizon,
+                "peak_daily_demand": max(curve),
+                "demand_quantiles": dict(zip(
+                    [quantile_label(q) for q in DEMAND_QUANTILES],
+                    np.quantile(self._tree_totals[category][horizon - 1], DEMAND_QUANTILES).tolist()
+                )),
+                "generated_at": self._computed_at.isoformat(),
+            }
+            self._entries[key] = entry
+        return entry
+
+    def get_forecasts(self, horizon: int = 30, categories: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Get demand forecasts for the next horizon days
+
+        Raises:
+            ValueError: for an unknown category or a horizon out of range.
+            ForecastNotReadyError: if models are still being loaded, trained or
+                forecast for the first time; the work is scheduled in the background.
+        """
+        with self._lock:
+            predictor = self.predictor
+        if predictor is None or not self._curves:
+            # Loading the models and the first forecast pass take seconds: never on the request path
+            self.stats["misses"] += 1
+            self.schedule_refresh()
+            raise ForecastNotReadyError("Forecasts are being computed; try again shortly")
+        if not 1 <= horizon <= predictor.max_horizon:
+            raise ValueError(f"horizon must be between 1 and {predictor.max_horizon}")
+
+        version = self._current_version(predictor)
+        stale = False
+        if version != self._curves_version:
+            # Serve the previous curves while the new ones are computed
+            self.stats["stale_hits"] += 1
+            stale = True
+            self.schedule_refresh()
+        else:
+            self.stats["hits"] += 1
+
+        with self._lock:
+            known = list(self._curves)
+            requested = categories or known
+            unknown = [category for category in requested if category not in self._curves]
+            if unknown:
+                raise ValueError(f"Unknown categories: {', '.join(unknown)}")
+            return [{**self._entry(category, horizon), "stale": stale} for category in requested]
+
+    def get_item_demand_forecasts(self, supplies: List[Any], horizon: int = 30) -> Dict[str, float]:
+        """Mean daily demand of each supply over the next horizon days, from its medicine category's curve
+
+        Supplies are mapped to categories through the predictor's SKU table. Supplies
+        without a forecast category are left out, and so is everything until the first
+        curves are cached (a refresh is scheduled), so callers can fall back to history.
+        """
+        with self._lock:
+            predictor = self.predictor
+        if predictor is None or not self._curves:
+            self.schedule_refresh()
+            return {}
+        if self._current_version(predictor) != self._curves_version:
+            self.schedule_refresh()
+
+        with self._lock:
+            table = predictor.sku_category_table
+            categories = {supply.id: table.lookup(supply.id, supply.name) for supply in supplies}
+            table.save()
+            return {
+                item_id: float(np.mean(self._curves[category][:horizon]))
+                for item_id, category in categories.items()
+                if category in self._curves
+            }
+
+    def get_status(self) -> Dict[str, Any]:
+        """Get model, cache and background job status"""
+        return {
+            "models_loaded": self.predictor is not None and self.predictor.has_models(),
+            "model_mode": self.model_mode,
+            "categories": list(self._curves),
+            "computed_at": self._computed_at.isoformat() if self._computed_at else None,
+            "refreshing": self._refresh_future is not None and not self._refresh_future.done(),
+            "training": self._training_future is not None and not self._training_future.done(),
+            "cached_entries": len(self._entries),
+            "last_error": self.last_error,
+            **self.stats,
+        }
+
+# Global instance
+forecast_service = ForecastService()
@@ -0,0 +1,121 @@
+# Incremental extraction of a JSON object from model output.
+# Text is scanned once as it streams in; each top-level member is parsed on its own
+# as soon as its value closes, so callers can act on early fields before the model
+# has finished, and text before or after the object is ignored.
+
+import json
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+class IncrementalJSONObjectParser:
+    """
+    Extracts the first JSON object from streamed text, member by member.
+    feed() returns the (key, value) pairs completed by the new text; an
+    optional validate(key, value) hook can check or convert each value.
+    """
+
+    def __init__(self, validate: Optional[Callable[[str, Any], Any]] = None):
+        self.validate = validate
+        self.result: Dict[str, Any] = {}
+        self.started = False
+        self.done = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._member: List[str] = []
+
+    def feed(self, text: str) -> List[Tuple[str, Any]]:
+        """
+        Scans text and returns the members it completed, in order.
+        """
+        completed: List[Tuple[str, Any]] = []
+        member = self._member
+        for ch in text:
+            if self.done:
+                break
+            if not self.started:
+                # Anything before the object, e.g. a preamble or a code fence, is skipped
+                if ch == "{":
+                    self.started = True
+                    self._depth = 1
+                continue
+
+            if self._in_string:
+                member.append(ch)
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                continue
+
+            if ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._close_member(completed)
+                    self.done = True
+                    break
+                if self._depth == 1:
+                    # A nested value just closed: the member is complete without waiting for the comma
+                    member.append(ch)
+                    self._close_member(completed)
+                    continue
+            elif ch == "," and self._depth == 1:
+                self._close_member(completed)
+                continue
+            member.append(ch)
+        return completed
+
+    def _close_member(self, completed: List[Tuple[str, Any]]):
+        text = "".join(self._member).strip()
+        self._member.clear()
+        if not text:
+            return
+        try:
+            # strict=False accepts raw newlines inside strings, which models often emit
+            parsed = json.loads("{" + text + "}", strict=False)
+        except ValueError as e:
+            raise ValueError(f"Malformed JSON member in model output: {text[:80]!r}") from e
+        for key, value in parsed.items():
+            if self.validate is not None:
+                value = self.validate(key, value)
+            self.result[key] = value
+            completed.append((key, value))
+
+    def close(self) -> Dict[str, Any]:
+        """
+        Returns the parsed object; raises ValueError if the text ended before it was complete.
+        """
+        if not self.started:
+            raise ValueError("Could not find a JSON object in the model's response.")
+        if not self.done:
+            raise ValueError("The model's response ended before the JSON object was complete.")
+        return self.result
+
+
+def iter_json_members(chunks: Iterable[str],
+                      validate: Optional[Callable[[str, Any], Any]] = None) -> Iterator[Tuple[str, Any]]:
+    """
+    Yields the (key, value) members of the JSON object in streamed text as each one closes.
+    Raises ValueError if the object is missing or incomplete.
+    """
+    parser = IncrementalJSONObjectParser(validate)
+    for chunk in chunks:
+        yield from parser.feed(chunk)
+        if parser.done:
+            break
+    parser.close()
+
+
+def extract_json_object(text: str, validate: Optional[Callable[[str, Any], Any]] = None) -> Dict[str, Any]:
+    """
+    Parses the first JSON object in text, ignoring anything around it.
+    """
+    parser = IncrementalJSONObjectParser(validate)
+    parser.feed(text)
+    return parser.close()
@@ -5,13 +5,18 @@ import time
 from backend.config import settings
 from backend.clients import kendra_client
 from backend.logger import logger
+from .kendra_ingest import kendra_ingest_queue
+from concurrent.futures import Future
 from typing import Optional
 
-def add_document(original_transcript: str, analysis_json: dict, user_id: str, s3_url: Optional[str] = None, speaker_cluster_id: Optional[str] = None):
+def add_document(original_transcript: str, analysis_json: dict, user_id: str, s3_url: Optional[str] = None, speaker_cluster_id: Optional[str] = None) -> Optional[Future]:
     """
     Adds a document to the Kendra index. The document contains the original
     transcript and the AI-generated summary. Can optionally include an S3 URL
     and a speaker cluster ID.
+
+    The document is queued and sent with others in the next batch; the returned
+    Future resolves once Kendra has indexed it.
     """
     doc_id = str(uuid.uuid4())
     summary = analysis_json.get("summary", "")
@@ -65,14 +70,9 @@ def add_document(original_transcript: str, analysis_json: dict, user_id: str, s3
         })
 
     try:
-        result = kendra_client.batch_put_document(
-            IndexId=settings.kendra_index_id,
-            Documents=[document]
-        )
-        logger.info(f"Successfully added document {doc_id} to Kendra.")
-        if result.get('FailedDocuments'):
-            logger.error(f"Failed documents: {result['FailedDocuments']}")
-        return result
+        future = kendra_ingest_queue.put(document)
+        logger.info(f"Queued document {doc_id} for Kendra.")
+        return future
     except Exception as e:
         logger.error(f"Error adding document to Kendra: {e}")
         return None 
@@ -0,0 +1,357 @@
+# Buffered Kendra ingestion: documents are queued and sent with BatchPutDocument in
+# batches of up to 10 by a background worker, flushing when a batch is full or the
+# oldest document has waited flush_interval seconds. Documents Kendra reports as
+# failed with a transient error are retried; whatever is still queued at shutdown,
+# or comes back from a batch that was in flight, is spilled to disk (only when a
+# spill path is configured: it holds transcripts in plaintext) and re-queued by the
+# next process to start.
+
+import atexit
+import base64
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import Future
+from typing import Any, Deque, Dict, List, Optional
+
+import numpy as np
+
+from backend.config import settings
+from backend.logger import logger
+
+# BatchPutDocument accepts at most 10 documents per call
+MAX_BATCH_SIZE = 10
+# FailedDocuments error codes worth retrying; InvalidRequest will fail again
+RETRYABLE_DOCUMENT_ERRORS = {"InternalError"}
+
+
+class DocumentIngestError(Exception):
+    """Raised (through a document's Future) when Kendra rejects a document for good"""
+
+
+class _Pending:
+    __slots__ = ("document", "future", "attempts", "queued_at", "not_before")
+
+    def __init__(self, document: Dict[str, Any], future: Future, attempts: int = 0):
+        self.document = document
+        self.future = future
+        self.attempts = attempts
+        self.queued_at = time.monotonic()
+        self.not_before = 0.0
+
+
+class KendraIngestQueue:
+    """
+    Queue of Kendra documents flushed in batches by a background thread.
+    put() returns a Future resolved with {"Id", "status"} once the document is
+    indexed ("indexed") or spilled at shutdown ("spilled"), or failed with
+    DocumentIngestError.
+    """
+
+    def __init__(self, client=None, index_id: Optional[str] = None, max_batch_size: int = MAX_BATCH_SIZE,
+                 flush_interval: float = 1.0, max_retries: int = 3, retry_delay: float = 0.5,
+                 spill_path: Optional[str] = None):
+        self._client = client
+        self.index_id = index_id
+        self.max_batch_size = min(max_batch_size, MAX_BATCH_SIZE)
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.spill_path = spill_path
+        self._queue: Deque[_Pending] = deque()
+        self._in_flight = 0
+        self._condition = threading.Condition()
+        self._worker: Optional[threading.Thread] = None
+        self._stopping = False
+        # Serializes writes to the spill file, which later spills merge into
+        self._spill_lock = threading.Lock()
+        self.stats = {
+            "documents": 0,
+            "indexed": 0,
+            "failed": 0,
+            "retried": 0,
+            "spilled": 0,
+            "restored": 0,
+            "batches": 0,
+            "batch_errors": 0,
+        }
+        self.batch_sizes: Counter = Counter()
+        # Most recent flush latencies in ms, for percentiles
+        self.flush_latencies: Deque[float] = deque(maxlen=1000)
+        self._restore_spilled()
+
+    @property
+    def client(self):
+        if self._client is None:
+            # Imported lazily so a queue with an injected client needs no AWS setup
+            from backend.clients import kendra_client
+            self._client = kendra_client
+        return self._client
+
+    def _start_worker(self):
+        # Called with the condition held
+        if self._worker is None:
+            self._worker = threading.Thread(target=self._run, daemon=True, name="kendra-ingest")
+            self._worker.start()
+            atexit.register(self.shutdown)
+
+    def put(self, document: Dict[str, Any]) -> Future:
+        """
+        Queues a document for the next batch and returns a Future of its outcome.
+        """
+        future: Future = Future()
+        with self._condition:
+            if self._stopping:
+                raise RuntimeError("Kendra ingest queue is shut down")
+            self._queue.append(_Pending(document, future))
+            self.stats["documents"] += 1
+            self._start_worker()
+            self._condition.notify_all()
+        return future
+
+    def _ready_batch(self) -> Optional[List[_Pending]]:
+        """
+        Takes the next batch if one is due; called with the condition held.
+        """
+        now = time.monotonic()
+        ready = [pending for pending in self._queue if pending.not_before <= now]
+        if not ready:
+            return None
+        if len(ready) < self.max_batch_size and not self._stopping \
+                and now - ready[0].queued_at < self.flush_interval:
+            return None
+        batch = ready[:self.max_batch_size]
+        for pending in batch:
+            self._queue.remove(pending)
+        self._in_flight += len(batch)
+        return batch
+
+    def _next_wakeup(self) -> Optional[float]:
+        # Seconds until the oldest document or the next retry is due; called with the condition held
+        if not self._queue:
+            return None
+        now = time.monotonic()
+        due = min(max(pending.not_before, pending.queued_at + self.flush_interval) for pending in self._queue)
+        return max(0.0, due - now)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                batch = self._ready_batch()
+                while batch is None:
+                    # After shutdown nothing new is sent: the queue has been spilled
+                    if self._stopping:
+                        return
+                    self._condition.wait(self._next_wakeup())
+                    batch = self._ready_batch()
+            try:
+                self._send(batch)
+            except Exception as e:
+                # A bug or an unexpected response must not kill the worker or leave callers waiting
+                logger.error(f"Kendra ingest worker failed on a batch of {len(batch)} documents: {e}")
+                self._fail_unresolved(batch, f"Ingest worker error: {e}")
+            finally:
+                with self._condition:
+                    self._in_flight -= len(batch)
+                    self._condition.notify_all()
+
+    def _fail_unresolved(self, batch: List[_Pending], reason: str):
+        with self._condition:
+            # Documents already re-queued for a retry are left to it
+            unresolved = [pending for pending in batch
+                          if not pending.future.done() and pending not in self._queue]
+            self.stats["failed"] += len(unresolved)
+        for pending in unresolved:
+            pending.future.set_exception(DocumentIngestError(reason))
+
+    def _send(self, batch: List[_Pending]):
+        start = time.perf_counter()
+        try:
+            response = self.client.batch_put_document(
+                IndexId=self.index_id or settings.kendra_index_id,
+                Documents=[pending.document for pending in batch],
+            )
+        except Exception as e:
+            # The whole call failed (throttling, network): every document is retried
+            logger.warning(f"Kendra BatchPutDocument failed for {len(batch)} documents: {e}")
+            self._record_batch(batch, start, error=True)
+            # Retries go back to the front of the queue; reversed keeps them in their original order
+            for pending in reversed(batch):
+                self._retry_or_fail(pending, str(e), retryable=True)
+            return
+
+        self._record_batch(batch, start)
+        failed = {entry["Id"]: entry for entry in response.get("FailedDocuments", [])}
+        indexed = 0
+        for pending in reversed(batch):
+            entry = failed.get(pending.document["Id"])
+            if entry is None:
+                indexed += 1
+                pending.future.set_result({"Id": pending.document["Id"], "status": "indexed"})
+            else:
+                self._retry_or_fail(pending, f"{entry.get('ErrorCode')}: {entry.get('ErrorMessage')}",
+                                    retryable=entry.get("ErrorCode") in RETRYABLE_DOCUMENT_ERRORS)
+        with self._condition:
+            self.stats["indexed"] += indexed
+        logger.info(f"Indexed {indexed}/{len(batch)} documents in Kendra.")
+
+    def _retry_or_fail(self, pending: _Pending, reason: str, retryable: bool):
+        pending.attempts += 1
+        if retryable and pending.attempts <= self.max_retries:
+            pending.not_before = time.monotonic() + self.retry_delay * 2 ** (pending.attempts - 1)
+            with self._condition:
+                stopping = self._stopping
+                if not stopping:
+                    self.stats["retried"] += 1
+                    self._queue.appendleft(pending)
+                    self._condition.notify_all()
+            if stopping:
+                # The batch was in flight when the queue was spilled; its retries join the spill
+                self._spill([pending])
+            return
+        logger.error(f"Kendra rejected document {pending.document['Id']}: {reason}")
+        with self._condition:
+            self.stats["failed"] += 1
+        pending.future.set_exception(DocumentIngestError(reason))
+
+    def _record_batch(self, batch: List[_Pending], start: float, error: bool = False):
+        with self._condition:
+            self.stats["batches"] += 1
+            self.stats["batch_errors"] += int(error)
+            self.batch_sizes[len(batch)] += 1
+            self.flush_latencies.append((time.perf_counter() - start) * 1000)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Sends everything queued now, without waiting for the flush interval.
+        Returns False if documents were still pending when the timeout ran out.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            # Documents waiting for a retry become due immediately
+            for pending in self._queue:
+                pending.queued_at = float("-inf")
+                pending.not_before = 0.0
+            self._condition.notify_all()
+            while self._queue or self._in_flight:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+            return True
+
+    def shutdown(self, flush_timeout: float = 5.0):
+        """
+        Flushes what can be sent within flush_timeout, then spills the rest to disk.
+        A batch still in flight gets up to flush_timeout more to finish; documents it
+        hands back for a retry are added to the spill.
+        """
+        with self._condition:
+            if self._stopping:
+                return
+        if self._worker is not None:
+            self.flush(flush_timeout)
+        with self._condition:
+            self._stopping = True
+            left = list(self._queue)
+            self._queue.clear()
+            self._condition.notify_all()
+        if left:
+            self._spill(left)
+        with self._condition:
+            self._condition.wait_for(lambda: not self._in_flight, flush_timeout)
+
+    def _spill(self, left: List[_Pending]):
+        if not self.spill_path:
+            logger.error(f"Dropping {len(left)} unsent Kendra documents: no spill path configured")
+            for pending in left:
+                pending.future.set_exception(DocumentIngestError("Queue shut down before the document was sent"))
+            return
+        stored = []
+        for pending in left:
+            document = dict(pending.document)
+            # Blobs are bytes, which JSON cannot hold
+            if "Blob" in document:
+                document["Blob"] = base64.b64encode(document["Blob"]).decode("ascii")
+            stored.append({"document": document, "attempts": pending.attempts})
+        directory = os.path.dirname(self.spill_path) or "."
+        os.makedirs(directory, exist_ok=True)
+        with self._spill_lock:
+            # Merged with an earlier spill, e.g. from a batch that was still in flight
+            try:
+                with open(self.spill_path) as f:
+                    stored = json.load(f) + stored
+            except (OSError, ValueError):
+                pass
+            fd, tmp_file = tempfile.mkstemp(dir=directory, prefix=os.path.basename(self.spill_path), suffix=".tmp")
+            with os.fdopen(fd, "w") as f:
+                json.dump(stored, f)
+            os.replace(tmp_file, self.spill_path)
+        for pending in left:
+            pending.future.set_result({"Id": pending.document["Id"], "status": "spilled"})
+        with self._condition:
+            self.stats["spilled"] += len(left)
+        logger.warning(f"Spilled {len(left)} unsent Kendra documents to {self.spill_path}")
+
+    def _restore_spilled(self):
+        if not self.spill_path:
+            return
+        # Claimed by renaming it first, so when several workers start only one of them re-queues the spill
+        claimed = f"{self.spill_path}.{os.getpid()}.restoring"
+        try:
+            os.rename(self.spill_path, claimed)
+        except OSError:
+            return
+        try:
+            with open(claimed) as f:
+                stored = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.error(f"Could not read spilled Kendra documents from {claimed}: {e}")
+            return
+        with self._condition:
+            for entry in stored:
+                document = entry["document"]
+                if "Blob" in document:
+                    document["Blob"] = base64.b64decode(document["Blob"])
+                self._queue.append(_Pending(document, Future(), entry.get("attempts", 0)))
+            self.stats["restored"] += len(stored)
+            if stored:
+                self._start_worker()
+        # Removed only once queued; a crash before then leaves the claimed file for inspection
+        try:
+            os.remove(claimed)
+        except OSError:
+            pass
+        logger.info(f"Re-queued {len(stored)} spilled Kendra documents from {self.spill_path}")
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """
+        Returns document counters, the batch size distribution and flush latency percentiles.
+        """
+        with self._condition:
+            latencies = np.array(self.flush_latencies) if self.flush_latencies else np.zeros(1)
+            batches = sum(self.batch_sizes.values())
+            return {
+                **self.stats,
+                "queued": len(self._queue),
+                "in_flight": self._in_flight,
+                "batch_sizes": dict(sorted(self.batch_sizes.items())),
+                "mean_batch_size": sum(size * count for size, count in self.batch_sizes.items()) / batches
+                if batches else 0.0,
+                "flush_latency_ms": {
+                    "mean": float(latencies.mean()),
+                    "p50": float(np.percentile(latencies, 50)),
+                    "p95": float(np.percentile(latencies, 95)),
+                    "max": float(latencies.max()),
+                },
+            }
+
+
+# Global instance
+kendra_ingest_queue = KendraIngestQueue(
+    flush_interval=settings.kendra_flush_interval,
+    spill_path=settings.kendra_spill_path,
+)
@@ -0,0 +1,83 @@
+# Stores a transcript as a memory while it is still being analyzed: the analysis is
+# streamed field by field, the Neptune entity upsert starts as soon as "entities"
+# closes and the Kendra document is queued as soon as the summary and importance are known.
+
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+from backend.logger import logger
+from . import bedrock, kendra, neptune
+
+
+class MemoryIngestor:
+    """
+    Runs the Neptune writes for a transcript on a thread pool and queues its
+    Kendra document, overlapping both with the rest of the model's output.
+    """
+
+    def __init__(self, max_workers: int = 4,
+                 stream_analysis: Optional[Callable[[str, str], Iterable[Tuple[str, Any]]]] = None,
+                 add_document: Optional[Callable[..., Any]] = None,
+                 add_graph_data: Optional[Callable[[dict], Any]] = None):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ingest")
+        # Stage functions can be swapped out, e.g. for fakes in tests
+        self.stream_analysis = stream_analysis or bedrock.stream_analysis
+        self.add_document = add_document or kendra.add_document
+        self.add_graph_data = add_graph_data or neptune.add_graph_data
+
+    def ingest(self, transcript: str, user_id: str, s3_url: Optional[str] = None,
+               speaker_cluster_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Analyzes a transcript and writes it to Kendra and Neptune.
+
+        Returns:
+            The analysis (or an "error" key if it failed), the times, in ms, at
+            which each write started and the analysis finished, and the Future
+            of the queued Kendra document, which is not waited for.
+        """
+        started = time.perf_counter()
+        analysis: Dict[str, Any] = {}
+        timings: Dict[str, float] = {}
+        document_future: Optional[Future] = None
+        entities_future: Optional[Future] = None
+
+        def start_document():
+            timings["kendra_queued_ms"] = (time.perf_counter() - started) * 1000
+            # Returns a Future: Kendra documents are sent in batches by the ingest queue
+            return self.add_document(transcript, dict(analysis), user_id, s3_url, speaker_cluster_id)
+
+        try:
+            for key, value in self.stream_analysis(transcript, user_id):
+                analysis[key] = value
+                if key == "entities" and entities_future is None:
+                    timings["neptune_started_ms"] = (time.perf_counter() - started) * 1000
+                    entities_future = self.executor.submit(self.add_graph_data, {"entities": value})
+                if "kendra_queued_ms" not in timings and "summary" in analysis and "importance_score" in analysis:
+                    document_future = start_document()
+        except Exception as e:
+            # Writes already started are left to finish: the fields they used were valid
+            logger.error(f"Error analyzing transcript for ingestion: {e}")
+            return {"error": str(e), "analysis": analysis, "timings": timings}
+        timings["analysis_ms"] = (time.perf_counter() - started) * 1000
+
+        if "kendra_queued_ms" not in timings:
+            # The model left out the importance score; the default applies
+            analysis.setdefault("importance_score", 0.5)
+            document_future = start_document()
+
+        # Edges are added once their vertices exist
+        if entities_future is not None:
+            entities_future.result()
+        if analysis.get("relationships"):
+            self.add_graph_data({"entities": [], "relationships": analysis["relationships"]})
+
+        timings["total_ms"] = (time.perf_counter() - started) * 1000
+        return {"analysis": analysis, "timings": timings, "kendra_document": document_future}
+
+    def shutdown(self, wait: bool = True):
+        self.executor.shutdown(wait=wait)
+
+
+# Global instance
+memory_ingestor = MemoryIngestor()
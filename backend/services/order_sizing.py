@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Order Sizing Engine for Clinic Inventory Management System
+Computes reorder points and EOQ-style order quantities from demand forecasts
+"""
+
+from statistics import NormalDist
+from typing import List, Dict, Any, Optional, Sequence, Tuple, Union
+
+import numpy as np
+from pydantic import BaseModel
+
+# A forecast is either a mean daily demand or a (mean, standard deviation) pair
+DemandForecast = Union[float, Tuple[float, float]]
+
+class OrderSizing(BaseModel):
+    item_id: str
+    daily_demand: float
+    demand_std: float
+    lead_time_days: int
+    safety_stock: float
+    reorder_point: float
+    economic_order_quantity: float
+    order_quantity: int
+    reorder_needed: bool
+    demand_source: str  # "forecast", "smoothing" or "none"
+
+class OrderSizingEngine:
+    def __init__(self, service_level: float = 0.95, ordering_cost: float = 50.0,
+                 holding_cost_per_unit: float = 2.0, smoothing_alpha: float = 0.3,
+                 default_demand_cv: float = 0.3):
+        """
+        Args:
+            service_level: Target probability of not stocking out during the lead time.
+            ordering_cost: Fixed cost of placing one order (used by EOQ).
+            holding_cost_per_unit: Cost of holding one unit for a year (used by EOQ).
+            smoothing_alpha: Smoothing factor for the exponential-smoothing fallback.
+            default_demand_cv: Coefficient of variation assumed when a forecast has no spread.
+        """
+        if not 0 < service_level < 1:
+            raise ValueError("service_level must be between 0 and 1")
+        self.service_level = service_level
+        self.ordering_cost = ordering_cost
+        self.holding_cost_per_unit = holding_cost_per_unit
+        self.smoothing_alpha = smoothing_alpha
+        self.default_demand_cv = default_demand_cv
+
+    def smooth_demand(self, histories: Sequence[Sequence[float]]) -> Tuple[np.ndarray, np.ndarray]:
+        """Simple exponential smoothing over several daily consumption series at once
+
+        Series of different lengths are right-aligned; the loop runs over time steps
+        while every step updates all items together.
+
+        Returns:
+            (level, residual standard deviation) arrays, one entry per series.
+        """
+        n_items = len(histories)
+        if n_items == 0:
+            return np.zeros(0), np.zeros(0)
+
+        max_len = max((len(history) for history in histories), default=0)
+        matrix = np.full((n_items, max_len), np.nan)
+        for row, history in enumerate(histories):
+            if len(history):
+                matrix[row, max_len - len(history):] = history
+
+        alpha = self.smoothing_alpha
+        level = np.full(n_items, np.nan)
+        sq_error_sum = np.zeros(n_items)
+        error_count = np.zeros(n_items)
+
+        for t in range(max_len):
+            observed = matrix[:, t]
+            has_obs = ~np.isnan(observed)
+
+            # First observation initialises the level
+            starting = has_obs & np.isnan(level)
+            level[starting] = observed[starting]
+
+            updating = has_obs & ~starting
+            error = observed[updating] - level[updating]
+            sq_error_sum[updating] += error ** 2
+            error_count[updating] += 1
+            level[updating] += alpha * error
+
+        level = np.nan_to_num(level, nan=0.0)
+        std = np.sqrt(np.divide(sq_error_sum, error_count,
+                                out=np.zeros(n_items), where=error_count > 0))
+        return level, std
+
+    def size_orders(self, supplies: List[Any], suppliers: Dict[str, Any],
+                    demand_forecasts: Optional[Dict[str, DemandForecast]] = None,
+                    demand_history: Optional[Dict[str, Sequence[float]]] = None) -> Dict[str, OrderSizing]:
+        """Compute reorder points and order quantities for all supplies in one pass
+
+        Demand comes from demand_forecasts when an item has one, otherwise from
+        exponential smoothing over demand_history. Items with neither are returned
+        with demand_source "none" so callers can fall back to threshold rules.
+        """
+        demand_forecasts = demand_forecasts or {}
+        demand_history = demand_history or {}
+        n_items = len(supplies)
+        if n_items == 0:
+            return {}
+
+        mean = np.zeros(n_items)
+        std = np.full(n_items, np.nan)
+        source = np.full(n_items, "none", dtype=object)
+
+        # Forecasted items
+        for i, supply in enumerate(supplies):
+            forecast = demand_forecasts.get(supply.id)
+            if forecast is None:
+                continue
+            if isinstance(forecast, tuple):
+                mean[i], std[i] = forecast
+            else:
+                mean[i] = forecast
+            source[i] = "forecast"
+
+        # Exponential-smoothing fallback for the rest
+        fallback_rows = [i for i, supply in enumerate(supplies)
+                         if source[i] == "none" and len(demand_history.get(supply.id, ()))]
+        if fallback_rows:
+            level, residual_std = self.smooth_demand(
+                [demand_history[supplies[i].id] for i in fallback_rows]
+            )
+            mean[fallback_rows] = level
+            std[fallback_rows] = residual_std
+            source[fallback_rows] = "smoothing"
+
+        mean = np.maximum(mean, 0.0)
+        std = np.where(np.isnan(std), mean * self.default_demand_cv, std)
+
+        stock = np.array([supply.current_stock for supply in supplies], dtype=float)
+        lead_time = np.array([self._supplier_attr(suppliers, supply.supplier_id, "lead_time_days", 7)
+                              for supply in supplies], dtype=float)
+        minimum_qty = np.array([self._supplier_attr(suppliers, supply.supplier_id, "minimum_order_quantity", 10)
+                                for supply in supplies], dtype=float)
+
+        z = NormalDist().inv_cdf(self.service_level)
+        safety_stock = z * std * np.sqrt(lead_time)
+        reorder_point = mean * lead_time + safety_stock
+
+        annual_demand = mean * 365.0
+        eoq = np.sqrt(2.0 * annual_demand * self.ordering_cost / self.holding_cost_per_unit)
+
+        # Order at least enough to climb back above the reorder point
+        order_quantity = np.maximum(eoq, reorder_point - stock)
+        order_quantity = np.ceil(np.maximum(order_quantity, minimum_qty)).astype(int)
+        reorder_needed = (stock <= reorder_point) & (source != "none")
+
+        return {
+            supply.id: OrderSizing(
+                item_id=supply.id,
+                daily_demand=float(mean[i]),
+                demand_std=float(std[i]),
+                lead_time_days=int(lead_time[i]),
+                safety_stock=float(safety_stock[i]),
+                reorder_point=float(reorder_point[i]),
+                economic_order_quantity=float(eoq[i]),
+                order_quantity=int(order_quantity[i]),
+                reorder_needed=bool(reorder_needed[i]),
+                demand_source=str(source[i])
+            )
+            for i, supply in enumerate(supplies)
+        }
+
+    @staticmethod
+    def _supplier_attr(suppliers: Dict[str, Any], supplier_id: str, attr: str, default: int) -> int:
+        supplier = suppliers.get(supplier_id)
+        return getattr(supplier, attr) if supplier else default
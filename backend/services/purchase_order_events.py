@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Purchase Order Event Log for Clinic Inventory Management System
+Append-only lifecycle events with as-of-time queries and supplier lead-time analytics
+"""
+
+from bisect import bisect_right, insort
+from typing import List, Dict, Any, Optional
+from datetime import datetime, timezone
+from enum import Enum
+import math
+
+from pydantic import BaseModel
+
+class PurchaseOrderEventType(str, Enum):
+    CREATED = "created"
+    SENT = "sent"
+    CONFIRMED = "confirmed"
+    RECEIVED = "received"
+    CANCELLED = "cancelled"
+
+# Order status after each event; matches PurchaseOrderStatus values
+EVENT_STATUS = {
+    PurchaseOrderEventType.CREATED: "pending",
+    PurchaseOrderEventType.SENT: "sent",
+    PurchaseOrderEventType.CONFIRMED: "confirmed",
+    PurchaseOrderEventType.RECEIVED: "received",
+    PurchaseOrderEventType.CANCELLED: "cancelled",
+}
+
+OPEN_STATUSES = {"pending", "sent", "confirmed"}
+
+class PurchaseOrderEvent(BaseModel):
+    sequence: int
+    order_id: str
+    supplier_id: str
+    event_type: PurchaseOrderEventType
+    timestamp: datetime
+    notes: Optional[str] = None
+
+class _LeadTimeStats:
+    """Running sent -> received lead time statistics for one supplier"""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.total_sq = 0.0
+        self.sorted_days: List[float] = []
+
+    def add(self, days: float):
+        self.count += 1
+        self.total += days
+        self.total_sq += days * days
+        insort(self.sorted_days, days)
+
+    def quantile(self, q: float) -> float:
+        index = min(self.count - 1, int(round(q * (self.count - 1))))
+        return self.sorted_days[index]
+
+    def summary(self) -> Dict[str, Any]:
+        mean = self.total / self.count
+        variance = max(0.0, self.total_sq / self.count - mean * mean)
+        return {
+            "orders_received": self.count,
+            "mean_days": mean,
+            "std_days": math.sqrt(variance),
+            "min_days": self.sorted_days[0],
+            "p50_days": self.quantile(0.5),
+            "p90_days": self.quantile(0.9),
+            "max_days": self.sorted_days[-1],
+        }
+
+class PurchaseOrderEventLog:
+    def __init__(self, snapshot_interval: int = 500):
+        self.snapshot_interval = snapshot_interval
+        self.events: List[PurchaseOrderEvent] = []
+        # Parallel epoch timestamps so as-of lookups can bisect without touching the models
+        self._timestamps: List[float] = []
+        # order_id -> positions of its events in self.events
+        self._order_index: Dict[str, List[int]] = {}
+        # Snapshot points: (number of events applied, order_id -> status)
+        self._snapshot_positions: List[int] = [0]
+        self._snapshots: List[Dict[str, str]] = [{}]
+        self._current_status: Dict[str, str] = {}
+        self._sent_at: Dict[str, float] = {}
+        self._lead_times: Dict[str, _LeadTimeStats] = {}
+
+    def append(self, order_id: str, supplier_id: str, event_type: PurchaseOrderEventType,
+               timestamp: Optional[datetime] = None, notes: Optional[str] = None) -> PurchaseOrderEvent:
+        """Append a lifecycle event; events must arrive in timestamp order
+
+        Without a timestamp the event is stamped with the current UTC time, held
+        at the last logged time if the wall clock has stepped back. An explicit
+        timestamp older than the last event raises ValueError.
+        """
+        if timestamp is None:
+            timestamp = datetime.now(timezone.utc)
+            if self._timestamps and timestamp.timestamp() < self._timestamps[-1]:
+                timestamp = datetime.fromtimestamp(self._timestamps[-1], timezone.utc)
+        epoch = timestamp.timestamp()
+        if self._timestamps and epoch < self._timestamps[-1]:
+            raise ValueError(f"Event for {order_id} is older than the last logged event")
+
+        event = PurchaseOrderEvent(
+            sequence=len(self.events) + 1,
+            order_id=order_id,
+            supplier_id=supplier_id,
+            event_type=event_type,
+            timestamp=timestamp,
+            notes=notes
+        )
+        self._order_index.setdefault(order_id, []).append(len(self.events))
+        self.events.append(event)
+        self._timestamps.append(epoch)
+        self._current_status[order_id] = EVENT_STATUS[event_type]
+        self._update_lead_times(event, epoch)
+
+        if len(self.events) % self.snapshot_interval == 0:
+            self._snapshot_positions.append(len(self.events))
+            self._snapshots.append(dict(self._current_status))
+
+        return event
+
+    def _update_lead_times(self, event: PurchaseOrderEvent, epoch: float):
+        if event.event_type == PurchaseOrderEventType.SENT:
+            self._sent_at[event.order_id] = epoch
+        elif event.event_type == PurchaseOrderEventType.RECEIVED:
+            sent_epoch = self._sent_at.pop(event.order_id, None)
+            if sent_epoch is not None:
+                stats = self._lead_times.setdefault(event.supplier_id, _LeadTimeStats())
+                stats.add((epoch - sent_epoch) / 86400.0)
+
+    def get_order_events(self, order_id: str) -> List[PurchaseOrderEvent]:
+        """Get the full event history of one order"""
+        return [self.events[position] for position in self._order_index.get(order_id, [])]
+
+    def status_as_of(self, as_of: datetime) -> Dict[str, str]:
+        """Reconstruct every order's status at a point in time
+
+        Starts from the closest snapshot at or before the requested time and
+        replays only the events logged after it.
+        """
+        event_count = bisect_right(self._timestamps, as_of.timestamp())
+        snapshot = bisect_right(self._snapshot_positions, event_count) - 1
+        statuses = dict(self._snapshots[snapshot])
+
+        for position in range(self._snapshot_positions[snapshot], event_count):
+            event = self.events[position]
+            statuses[event.order_id] = EVENT_STATUS[event.event_type]
+
+        return statuses
+
+    def open_orders_as_of(self, as_of: datetime) -> List[str]:
+        """Get the ids of orders that were open (pending, sent or confirmed) at a point in time"""
+        return [order_id for order_id, status in self.status_as_of(as_of).items()
+                if status in OPEN_STATUSES]
+
+    def get_lead_time_statistics(self, supplier_id: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+        """Get sent -> received lead time distributions per supplier"""
+        if supplier_id is not None:
+            stats = self._lead_times.get(supplier_id)
+            return {supplier_id: stats.summary()} if stats else {}
+        return {sid: stats.summary() for sid, stats in self._lead_times.items()}
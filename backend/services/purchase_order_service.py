@@ -6,16 +6,47 @@ Handles auto-generation of purchase orders when stock falls below threshold
 
 import sys
 import os
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple, Iterator
 from datetime import datetime, timedelta
 import json
+import zipfile
 from enum import Enum
+from string import Template
 
 # Add the project root to the Python path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from pydantic import BaseModel
 
+from services.order_sizing import OrderSizingEngine, OrderSizing, DemandForecast
+from services.purchase_order_events import PurchaseOrderEventLog, PurchaseOrderEvent, PurchaseOrderEventType
+
+# Email templates are compiled once at import time and reused for every order
+EMAIL_TEMPLATE = Template("""Dear $supplier_name,
+
+Please find below our purchase order for medical supplies:
+
+PURCHASE ORDER: $order_id
+Date: $order_date
+
+ITEM DETAILS:
+$item_details
+- Order Date: $order_datetime$delivery_details
+
+Please confirm receipt of this order and provide delivery timeline.
+
+Contact Information:
+- Email: clinic@example.com
+- Phone: +1-555-9999
+
+Thank you for your prompt attention to this matter.
+
+Best regards,
+Clinic Inventory Management System""")
+
+LINE_ITEM_TEMPLATE = Template("- Item: $item_name ($item_id) - Quantity: $quantity units")
+SINGLE_ITEM_TEMPLATE = Template("- Item: $item_name\n- Quantity: $quantity units")
+
 class PurchaseOrderStatus(str, Enum):
     PENDING = "pending"
     SENT = "sent"
@@ -23,9 +54,17 @@ class PurchaseOrderStatus(str, Enum):
     RECEIVED = "received"
     CANCELLED = "cancelled"
 
+class PurchaseOrderLineItem(BaseModel):
+    item_id: str
+    item_name: str
+    quantity: int
+    current_stock: Optional[int] = None
+    threshold_quantity: Optional[int] = None
+    unit_price: Optional[float] = None
+
 class PurchaseOrder(BaseModel):
     order_id: str
-    item_id: str
+    item_id: Optional[str] = None  # None on consolidated orders, whose items are in line_items
     item_name: str
     quantity: int
     supplier_id: str
@@ -39,6 +78,19 @@ class PurchaseOrder(BaseModel):
     notes: Optional[str] = None
     unit_price: Optional[float] = None
     total_amount: Optional[float] = None
+    line_items: List[PurchaseOrderLineItem] = []
+    expected_delivery: Optional[datetime] = None
+    version: int = 0  # Incremented on every change, used to invalidate rendered documents
+
+    def item_ids(self) -> List[str]:
+        """IDs of the items this order (single or consolidated) includes"""
+        if self.line_items:
+            return [line.item_id for line in self.line_items]
+        return [self.item_id] if self.item_id is not None else []
+
+    def covers_item(self, item_id: str) -> bool:
+        """Check whether this order (single or consolidated) includes the given item"""
+        return item_id in self.item_ids()
 
 class Supplier(BaseModel):
     id: str
@@ -54,6 +106,10 @@ class PurchaseOrderService:
     def __init__(self):
         self.purchase_orders: List[PurchaseOrder] = []
         self.suppliers: List[Supplier] = []
+        # order_id -> (order version, rendered email content)
+        self._email_cache: Dict[str, Tuple[int, str]] = {}
+        self.order_sizing_engine = OrderSizingEngine()
+        self.event_log = PurchaseOrderEventLog()
         self._load_sample_data()
     
     def _load_sample_data(self):
@@ -110,9 +166,27 @@ class PurchaseOrderService:
         
         return max(needed_quantity, 10)  # Minimum order of 10 units
     
+    def size_orders(self, medical_supplies: List[Any],
+                    demand_forecasts: Optional[Dict[str, DemandForecast]] = None,
+                    demand_history: Optional[Dict[str, List[float]]] = None,
+                    service_level: Optional[float] = None) -> Dict[str, OrderSizing]:
+        """Compute demand-driven reorder points and order quantities for all supplies"""
+        engine = self.order_sizing_engine
+        if service_level is not None and service_level != engine.service_level:
+            engine = OrderSizingEngine(
+                service_level=service_level,
+                ordering_cost=engine.ordering_cost,
+                holding_cost_per_unit=engine.holding_cost_per_unit,
+                smoothing_alpha=engine.smoothing_alpha,
+                default_demand_cv=engine.default_demand_cv
+            )
+        
+        suppliers = {supplier.id: supplier for supplier in self.suppliers}
+        return engine.size_orders(medical_supplies, suppliers, demand_forecasts, demand_history)
+    
     def create_purchase_order(self, item_id: str, item_name: str, 
                             current_stock: int, threshold_quantity: int,
-                            supplier_id: str) -> Optional[PurchaseOrder]:
+                            supplier_id: str, quantity: Optional[int] = None) -> Optional[PurchaseOrder]:
         """Create a new purchase order for low stock items"""
         
         # Check if there's already a pending order for this item
@@ -127,10 +201,13 @@ class PurchaseOrderService:
             print(f"Supplier not found: {supplier_id}")
             return None
         
-        # Calculate order quantity
-        order_quantity = self._calculate_order_quantity(
-            current_stock, threshold_quantity, supplier.default_order_quantity
-        )
+        # Calculate order quantity unless a demand-driven one was supplied
+        if quantity is not None:
+            order_quantity = max(quantity, supplier.minimum_order_quantity)
+        else:
+            order_quantity = self._calculate_order_quantity(
+                current_stock, threshold_quantity, supplier.default_order_quantity
+            )
         
         # Create purchase order
         purchase_order = PurchaseOrder(
@@ -146,6 +223,7 @@ class PurchaseOrderService:
             notes=f"Auto-generated order due to low stock. Current stock: {current_stock}, Threshold: {threshold_quantity}"
         )
         
+        self._log_event(purchase_order, PurchaseOrderEventType.CREATED)
         self.purchase_orders.append(purchase_order)
         print(f"Created purchase order {purchase_order.order_id} for {item_name}")
         
@@ -154,7 +232,7 @@ class PurchaseOrderService:
     def _get_pending_order(self, item_id: str) -> Optional[PurchaseOrder]:
         """Check if there's already a pending order for the given item"""
         for order in self.purchase_orders:
-            if (order.item_id == item_id and 
+            if (order.covers_item(item_id) and 
                 order.status in [PurchaseOrderStatus.PENDING, PurchaseOrderStatus.SENT]):
                 return order
         return None
@@ -181,21 +259,41 @@ class PurchaseOrderService:
         if not order:
             return False
         
+        # Logged before the order changes, so a rejected event leaves the order as it was
+        if new_status != PurchaseOrderStatus.PENDING:
+            self._log_event(order, PurchaseOrderEventType(new_status.value), notes=notes)
+        
         order.status = new_status
+        order.version += 1
+        now = datetime.now()
         
         # Update timestamps based on status
         if new_status == PurchaseOrderStatus.SENT:
-            order.sent_at = datetime.now()
+            order.sent_at = now
         elif new_status == PurchaseOrderStatus.CONFIRMED:
-            order.confirmed_at = datetime.now()
+            order.confirmed_at = now
         elif new_status == PurchaseOrderStatus.RECEIVED:
-            order.received_at = datetime.now()
+            order.received_at = now
         
         if notes:
             order.notes = notes
         
         return True
     
+    def _log_event(self, order: PurchaseOrder, event_type: PurchaseOrderEventType,
+                   timestamp: Optional[datetime] = None, notes: Optional[str] = None) -> PurchaseOrderEvent:
+        """Record an order lifecycle event in the append-only event log, stamped now unless given a time"""
+        return self.event_log.append(order.order_id, order.supplier_id, event_type, timestamp, notes)
+    
+    def get_open_orders_as_of(self, as_of: datetime) -> List[PurchaseOrder]:
+        """Get orders that were open (pending, sent or confirmed) at a point in time"""
+        open_ids = set(self.event_log.open_orders_as_of(as_of))
+        return [order for order in self.purchase_orders if order.order_id in open_ids]
+    
+    def get_supplier_lead_times(self, supplier_id: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+        """Get actual sent -> received lead time statistics per supplier"""
+        return self.event_log.get_lead_time_statistics(supplier_id)
+    
     def send_order_to_supplier(self, order_id: str) -> bool:
         """Mark order as sent to supplier"""
         return self.update_order_status(order_id, PurchaseOrderStatus.SENT)
@@ -214,32 +312,63 @@ class PurchaseOrderService:
         return self.update_order_status(order_id, PurchaseOrderStatus.CANCELLED, notes)
     
     def generate_email_content(self, order: PurchaseOrder) -> str:
-        """Generate email content for purchase order"""
-        email_content = f"""
-Dear {order.supplier_name},
-
-Please find below our purchase order for medical supplies:
-
-PURCHASE ORDER: {order.order_id}
-Date: {order.created_at.strftime('%Y-%m-%d')}
-
-ITEM DETAILS:
-- Item: {order.item_name}
-- Quantity: {order.quantity} units
-- Order Date: {order.created_at.strftime('%Y-%m-%d %H:%M')}
-
-Please confirm receipt of this order and provide delivery timeline.
-
-Contact Information:
-- Email: clinic@example.com
-- Phone: +1-555-9999
-
-Thank you for your prompt attention to this matter.
-
-Best regards,
-Clinic Inventory Management System
+        """Generate email content for purchase order, reusing the cached render if unchanged"""
+        cached = self._email_cache.get(order.order_id)
+        if cached and cached[0] == order.version:
+            return cached[1]
+        
+        email_content = self._render_email_content(order)
+        self._email_cache[order.order_id] = (order.version, email_content)
+        return email_content
+    
+    def _render_email_content(self, order: PurchaseOrder) -> str:
+        """Render the email template for a purchase order"""
+        if order.line_items:
+            item_details = "\n".join(
+                LINE_ITEM_TEMPLATE.substitute(
+                    item_name=line.item_name, item_id=line.item_id, quantity=line.quantity
+                )
+                for line in order.line_items
+            )
+            item_details += f"\n- Total Quantity: {order.quantity} units"
+        else:
+            item_details = SINGLE_ITEM_TEMPLATE.substitute(
+                item_name=order.item_name, quantity=order.quantity
+            )
+        
+        delivery_details = ""
+        if order.expected_delivery:
+            delivery_details = f"\n- Requested Delivery By: {order.expected_delivery.strftime('%Y-%m-%d')}"
+        
+        return EMAIL_TEMPLATE.substitute(
+            supplier_name=order.supplier_name,
+            order_id=order.order_id,
+            order_date=order.created_at.strftime('%Y-%m-%d'),
+            order_datetime=order.created_at.strftime('%Y-%m-%d %H:%M'),
+            item_details=item_details,
+            delivery_details=delivery_details
+        )
+    
+    def export_orders_archive(self, orders: List[PurchaseOrder]) -> Iterator[bytes]:
+        """Render orders into a zip archive, yielding compressed chunks as they are produced
+        
+        Each order becomes one text document grouped in a folder per supplier, so the
+        archive can be split for batch transmission without holding it all in memory.
         """
-        return email_content.strip()
+        sink = _ChunkSink()
+        with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_DEFLATED) as archive:
+            for order in orders:
+                archive.writestr(
+                    f"{order.supplier_id}/{order.order_id}.txt",
+                    self.generate_email_content(order)
+                )
+                chunk = sink.drain()
+                if chunk:
+                    yield chunk
+        
+        chunk = sink.drain()
+        if chunk:
+            yield chunk
     
     def get_order_statistics(self) -> Dict[str, Any]:
         """Get purchase order statistics"""
@@ -268,23 +397,141 @@ Clinic Inventory Management System
         self.suppliers.append(supplier)
         return True
     
-    def auto_generate_orders_for_low_stock(self, medical_supplies: List[Any]) -> List[PurchaseOrder]:
-        """Auto-generate purchase orders for all low stock items"""
-        generated_orders = []
+    def create_consolidated_purchase_order(self, supplier_id: str, supplies: List[Any],
+                                           quantities: Optional[Dict[str, int]] = None) -> Optional[PurchaseOrder]:
+        """Create a single multi-line purchase order covering several items from one supplier"""
+        supplier = self.get_supplier_by_id(supplier_id)
+        if not supplier:
+            print(f"Supplier not found: {supplier_id}")
+            return None
         
-        for supply in medical_supplies:
-            if supply.current_stock <= supply.threshold_quantity:
-                order = self.create_purchase_order(
-                    item_id=supply.id,
-                    item_name=supply.name,
-                    current_stock=supply.current_stock,
-                    threshold_quantity=supply.threshold_quantity,
-                    supplier_id=supply.supplier_id
+        line_items = []
+        for supply in supplies:
+            # Items already on an open order are not ordered twice
+            if self._get_pending_order(supply.id):
+                print(f"Purchase order already pending for {supply.name}")
+                continue
+            
+            if quantities and supply.id in quantities:
+                quantity = quantities[supply.id]
+            else:
+                quantity = self._calculate_order_quantity(
+                    supply.current_stock, supply.threshold_quantity, supplier.default_order_quantity
                 )
-                if order:
-                    generated_orders.append(order)
+            line_items.append(PurchaseOrderLineItem(
+                item_id=supply.id,
+                item_name=supply.name,
+                quantity=max(quantity, supplier.minimum_order_quantity),
+                current_stock=supply.current_stock,
+                threshold_quantity=supply.threshold_quantity
+            ))
+        
+        if not line_items:
+            return None
+        
+        created_at = datetime.now()
+        purchase_order = PurchaseOrder(
+            order_id=f"po_{len(self.purchase_orders) + 1:04d}",
+            item_name=f"Consolidated order ({len(line_items)} items)",
+            quantity=sum(line.quantity for line in line_items),
+            supplier_id=supplier_id,
+            supplier_name=supplier.name,
+            supplier_email=supplier.email,
+            status=PurchaseOrderStatus.PENDING,
+            created_at=created_at,
+            line_items=line_items,
+            expected_delivery=created_at + timedelta(days=supplier.lead_time_days),
+            notes=f"Auto-generated consolidated order for {len(line_items)} low stock items. "
+                  f"Expected lead time: {supplier.lead_time_days} days"
+        )
+        
+        self._log_event(purchase_order, PurchaseOrderEventType.CREATED)
+        self.purchase_orders.append(purchase_order)
+        print(f"Created consolidated purchase order {purchase_order.order_id} for {supplier.name} "
+              f"({len(line_items)} items)")
+        
+        return purchase_order
+    
+    def auto_generate_orders_for_low_stock(self, medical_supplies: List[Any],
+                                           consolidate: bool = False,
+                                           demand_forecasts: Optional[Dict[str, DemandForecast]] = None,
+                                           demand_history: Optional[Dict[str, List[float]]] = None,
+                                           service_level: Optional[float] = None) -> List[PurchaseOrder]:
+        """Auto-generate purchase orders for all low stock items
+        
+        With consolidate=True, low stock items are grouped per supplier and one
+        multi-line order is created for each supplier instead of one order per item.
+        
+        When demand forecasts (e.g. from MedicineRestockingPredictor) or consumption
+        history are given, items are also reordered once they fall to their reorder
+        point and quantities are sized from demand; other items keep the threshold rule.
+        """
+        sizing: Dict[str, OrderSizing] = {}
+        if demand_forecasts or demand_history:
+            sizing = self.size_orders(medical_supplies, demand_forecasts, demand_history, service_level)
+        
+        low_stock = []
+        quantities: Dict[str, int] = {}
+        for supply in medical_supplies:
+            item_sizing = sizing.get(supply.id)
+            if item_sizing and item_sizing.demand_source != "none":
+                if item_sizing.reorder_needed or supply.current_stock <= supply.threshold_quantity:
+                    low_stock.append(supply)
+                    quantities[supply.id] = item_sizing.order_quantity
+            elif supply.current_stock <= supply.threshold_quantity:
+                low_stock.append(supply)
+        
+        if consolidate:
+            return self._auto_generate_consolidated_orders(low_stock, quantities)
+        
+        generated_orders = []
+        
+        for supply in low_stock:
+            order = self.create_purchase_order(
+                item_id=supply.id,
+                item_name=supply.name,
+                current_stock=supply.current_stock,
+                threshold_quantity=supply.threshold_quantity,
+                supplier_id=supply.supplier_id,
+                quantity=quantities.get(supply.id)
+            )
+            if order:
+                generated_orders.append(order)
+        
+        return generated_orders
+    
+    def _auto_generate_consolidated_orders(self, low_stock_supplies: List[Any],
+                                           quantities: Dict[str, int]) -> List[PurchaseOrder]:
+        """Group low stock items by supplier and create one order per supplier"""
+        supplies_by_supplier: Dict[str, List[Any]] = {}
+        for supply in low_stock_supplies:
+            supplies_by_supplier.setdefault(supply.supplier_id, []).append(supply)
+        
+        generated_orders = []
+        for supplier_id, supplies in supplies_by_supplier.items():
+            order = self.create_consolidated_purchase_order(supplier_id, supplies, quantities)
+            if order:
+                generated_orders.append(order)
         
         return generated_orders
 
+class _ChunkSink:
+    """Write-only buffer used to stream a zip archive without a seekable file"""
+    
+    def __init__(self):
+        self._chunks: List[bytes] = []
+    
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+    
+    def flush(self):
+        pass
+    
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
 # Global instance
 purchase_order_service = PurchaseOrderService() 
\ No newline at end of file
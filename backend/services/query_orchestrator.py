@@ -0,0 +1,153 @@
+# Answers a user query by fanning retrieval out in parallel:
+# Kendra retrieval and entity extraction start together, the Neptune lookup starts
+# as soon as the entity is known, and each source has a deadline after which the
+# answer is synthesized from whatever has arrived.
+
+import time
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError
+from typing import Any, Callable, Dict, List, Optional
+
+from backend.logger import logger
+from . import bedrock, kendra, neptune
+
+
+class QueryOrchestrator:
+    """
+    Runs the retrieval stages of a query concurrently and synthesizes the answer.
+    Deadlines are measured from the start of the query, so a slow entity
+    extraction eats into the Neptune lookup's budget rather than extending it.
+    """
+
+    def __init__(self, max_workers: int = 8, kendra_deadline: float = 2.5, entity_deadline: float = 1.5,
+                 neptune_deadline: float = 3.0,
+                 retrieve: Optional[Callable[[str, str], List[dict]]] = None,
+                 extract_entity: Optional[Callable[[str], Optional[str]]] = None,
+                 graph_lookup: Optional[Callable[[str, str], List[str]]] = None,
+                 synthesize: Optional[Callable[[str, List[str], List[str], str], str]] = None):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="query")
+        self.kendra_deadline = kendra_deadline
+        self.entity_deadline = entity_deadline
+        self.neptune_deadline = neptune_deadline
+        # Stage functions can be swapped out, e.g. for fakes in tests
+        self.retrieve = retrieve or kendra.query_index
+        self.extract_entity = extract_entity or bedrock.extract_entity_from_query
+        self.graph_lookup = graph_lookup or neptune.query_graph
+        self.synthesize = synthesize or bedrock.synthesize_answer
+
+    def _run_stage(self, timings: Dict[str, Dict[str, Any]], name: str, started: float, func: Callable, *args) -> Future:
+        """
+        Submits func and records when it started and how long it ran, in ms since the query started.
+        """
+        def timed():
+            stage_start = time.perf_counter()
+            timings[name] = {"status": "running", "started_ms": (stage_start - started) * 1000}
+            try:
+                return func(*args)
+            finally:
+                timings[name]["duration_ms"] = (time.perf_counter() - stage_start) * 1000
+
+        return self.executor.submit(timed)
+
+    def _await(self, timings: Dict[str, Dict[str, Any]], name: str, future: Future, deadline: float,
+               started: float, default: Any) -> Any:
+        """
+        Waits for a stage until its deadline; returns default if it timed out or failed.
+        """
+        remaining = max(0.0, deadline - (time.perf_counter() - started))
+        try:
+            result = future.result(timeout=remaining)
+            timings.setdefault(name, {})["status"] = "ok"
+            return result
+        except TimeoutError:
+            logger.warning(f"Query stage '{name}' missed its {deadline:.1f}s deadline; continuing without it")
+            timings.setdefault(name, {})["status"] = "timeout"
+        except Exception as e:
+            logger.error(f"Query stage '{name}' failed: {e}")
+            timings.setdefault(name, {})["status"] = "error"
+        return default
+
+    def gather(self, query: str, user_id: str, started: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Runs the retrieval stages of a query, without synthesizing an answer.
+
+        Returns:
+            The first image URL among the documents, the retrieved context,
+            per-stage timings and whether any source was left out.
+        """
+        started = time.perf_counter() if started is None else started
+        timings: Dict[str, Dict[str, Any]] = {}
+
+        kendra_future = self._run_stage(timings, "kendra", started, self.retrieve, query, user_id)
+        entity_future = self._run_stage(timings, "entity", started, self.extract_entity, query)
+
+        # Chain the graph lookup onto entity extraction instead of waiting for it here
+        neptune_future: Future = Future()
+        chain_lock = threading.Lock()
+
+        def start_graph_lookup(done: Future):
+            with chain_lock:
+                if neptune_future.done():
+                    return
+                entity = done.result() if done.exception() is None else None
+                if not entity:
+                    neptune_future.set_result(None)
+                    return
+                lookup = self._run_stage(timings, "neptune", started, self.graph_lookup, entity, user_id)
+                lookup.add_done_callback(lambda f: neptune_future.set_exception(f.exception())
+                                         if f.exception() else neptune_future.set_result(f.result()))
+
+        entity_future.add_done_callback(start_graph_lookup)
+
+        entity = self._await(timings, "entity", entity_future, self.entity_deadline, started, None)
+        kendra_results = self._await(timings, "kendra", kendra_future, self.kendra_deadline, started, [])
+        if entity:
+            neptune_results = self._await(timings, "neptune", neptune_future, self.neptune_deadline, started, [])
+        else:
+            # No entity in time: skip the lookup, and make sure a late entity does not start it
+            with chain_lock:
+                if not neptune_future.done():
+                    neptune_future.set_result(None)
+            timings.setdefault("neptune", {})["status"] = "skipped"
+            neptune_results = []
+        neptune_results = neptune_results or []
+
+        image_url = next((result["s3_url"] for result in kendra_results if result.get("s3_url")), None)
+        return {
+            "image_url": image_url,
+            "query": query,
+            "entity": entity,
+            "kendra_results": kendra_results,
+            "neptune_results": neptune_results,
+            "partial": any(stage.get("status") in ("timeout", "error") for stage in timings.values()),
+            # Copied so stages still running past their deadline cannot change the result
+            "timings": {name: dict(stage) for name, stage in timings.items()},
+            "retrieval_ms": (time.perf_counter() - started) * 1000,
+        }
+
+    def answer(self, query: str, user_id: str) -> Dict[str, Any]:
+        """
+        Answers a query from Kendra documents and Neptune facts.
+
+        Returns:
+            The gather() result plus the answer and the total time.
+        """
+        started = time.perf_counter()
+        context = self.gather(query, user_id, started)
+
+        synthesis_start = time.perf_counter()
+        answer = self.synthesize(query, [result["text"] for result in context["kendra_results"]],
+                                 context["neptune_results"], user_id)
+        context["timings"]["synthesis"] = {
+            "status": "ok",
+            "started_ms": context["retrieval_ms"],
+            "duration_ms": (time.perf_counter() - synthesis_start) * 1000,
+        }
+        return {"answer": answer, **context, "total_ms": (time.perf_counter() - started) * 1000}
+
+    def shutdown(self, wait: bool = True):
+        self.executor.shutdown(wait=wait)
+
+
+# Global instance
+query_orchestrator = QueryOrchestrator()
@@ -0,0 +1,304 @@
+# Local cache of Bedrock responses, so repeated questions and re-analyzed transcripts
+# are answered without another model call. Entries are keyed by model ID and a hash
+# of the normalized request, scoped to a tenant and user so one user's transcripts
+# and answers are never served to another. They expire after a TTL, are evicted
+# least-recently-used beyond a size bound and can be persisted to a JSON file. An
+# optional near-duplicate mode also serves a cached response when the prompt
+# embeddings of the same user are similar enough.
+
+import atexit
+import base64
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from backend.config import settings
+from backend.logger import logger
+
+WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_prompt(text: str) -> str:
+    """
+    Collapses whitespace runs, so re-indented or re-wrapped prompts share a cache entry.
+    """
+    return WHITESPACE.sub(" ", text).strip()
+
+
+def prompt_text(body: Dict[str, Any]) -> str:
+    """
+    Returns the normalized text of all text blocks in a Bedrock messages body.
+    """
+    parts = []
+    for message in body.get("messages", []):
+        for block in message.get("content", []):
+            if block.get("type") == "text":
+                parts.append(block.get("text", ""))
+    return normalize_prompt("\n".join(parts))
+
+
+def cache_key(model_id: str, body: Dict[str, Any], user_id: Optional[str] = None,
+              tenant_id: Optional[str] = None) -> str:
+    """
+    Hashes the model ID, tenant and user with the normalized prompt and the other
+    request parameters, so a different max_tokens or temperature does not reuse the
+    response and identical prompts from different users never share an entry.
+    """
+    params = {name: value for name, value in body.items() if name != "messages"}
+    payload = json.dumps({"tenant_id": tenant_id, "user_id": user_id, "prompt": prompt_text(body),
+                          "params": params}, sort_keys=True)
+    return hashlib.sha256(f"{model_id}\n{payload}".encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    TTL + LRU cache of Bedrock response bodies. Each entry keeps the token usage
+    and latency of the call that produced it, which are counted as saved on every hit.
+    Entries belong to the cache's tenant and the user_id they were stored for, and
+    are only served to the same tenant and user.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_entries: int = 1000, ttl_seconds: float = 86400.0,
+                 embed: Optional[Callable[[str], List[float]]] = None, similarity_threshold: float = 0.95,
+                 save_interval: float = 30.0, tenant_id: Optional[str] = None):
+        self.path = path
+        self.tenant_id = tenant_id
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        # Near-duplicate matching is enabled by passing an embedding function
+        self.embed = embed
+        self.similarity_threshold = similarity_threshold
+        self.save_interval = save_interval
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.RLock()
+        # Serializes writers, so an older snapshot never replaces a newer one
+        self._save_lock = threading.Lock()
+        self._dirty = False
+        self._last_save = time.monotonic()
+        self.stats = {
+            "hits": 0,
+            "near_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expired": 0,
+            "saved_input_tokens": 0,
+            "saved_output_tokens": 0,
+            "saved_latency_ms": 0.0,
+        }
+        if path:
+            self._load()
+            atexit.register(self.save)
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                stored = json.load(f)
+        except (OSError, ValueError):
+            return
+        now = time.time()
+        # Stored oldest-used first, so insertion order restores the LRU order
+        for key, entry in stored.get("entries", []):
+            if now - entry["created"] < self.ttl_seconds:
+                if entry.get("embedding") is not None:
+                    entry["embedding"] = np.frombuffer(base64.b64decode(entry["embedding"]), dtype=np.float32)
+                self._entries[key] = entry
+        logger.info(f"Loaded {len(self._entries)} cached Bedrock responses from {self.path}")
+
+    def save(self, force: bool = False) -> bool:
+        """
+        Writes the cache to disk if it changed since the last save.
+        """
+        with self._save_lock:
+            with self._lock:
+                if not self.path or not (self._dirty or force):
+                    return False
+                # Embeddings are stored as base64 float32, a fraction of the size of JSON numbers
+                entries = [(key, {**entry, "embedding": base64.b64encode(entry["embedding"].tobytes()).decode("ascii")
+                                  if entry.get("embedding") is not None else None})
+                           for key, entry in self._entries.items()]
+                self._dirty = False
+                self._last_save = time.monotonic()
+            directory = os.path.dirname(self.path) or "."
+            os.makedirs(directory, exist_ok=True)
+            # A unique temporary file, since other processes may be saving the same cache
+            fd, tmp_file = tempfile.mkstemp(dir=directory, prefix=os.path.basename(self.path), suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w") as f:
+                    json.dump({"entries": entries}, f)
+                os.replace(tmp_file, self.path)
+            except BaseException:
+                os.unlink(tmp_file)
+                raise
+        return True
+
+    def _expired(self, entry: Dict[str, Any]) -> bool:
+        return time.time() - entry["created"] >= self.ttl_seconds
+
+    def _nearest(self, model_id: str, embedding: np.ndarray, user_id: Optional[str]) -> Optional[str]:
+        """
+        Returns the key of the most similar live entry of this user for model_id above the threshold.
+        """
+        keys, vectors = [], []
+        for key, entry in self._entries.items():
+            if entry["model_id"] != model_id or entry.get("user_id") != user_id \
+                    or entry.get("tenant_id") != self.tenant_id:
+                continue
+            if entry.get("embedding") is not None and not self._expired(entry):
+                keys.append(key)
+                vectors.append(entry["embedding"])
+        if not keys:
+            return None
+        similarities = np.vstack(vectors) @ embedding
+        best = int(np.argmax(similarities))
+        return keys[best] if similarities[best] >= self.similarity_threshold else None
+
+    def _embedding(self, text: str) -> Optional[np.ndarray]:
+        try:
+            vector = np.asarray(self.embed(text), dtype=np.float32)
+        except Exception as e:
+            logger.warning(f"Embedding for the response cache failed, exact matching only: {e}")
+            return None
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else None
+
+    def get(self, model_id: str, body: Dict[str, Any], user_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Returns the cached response body for this request by this user, or None.
+        """
+        response, _ = self.lookup(model_id, body, user_id)
+        return response
+
+    def lookup(self, model_id: str, body: Dict[str, Any], user_id: Optional[str] = None):
+        """
+        Returns (cached response or None, prompt embedding if one was computed).
+        The embedding can be passed to put() to avoid embedding the prompt twice.
+        """
+        key = cache_key(model_id, body, user_id, self.tenant_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._expired(entry):
+                del self._entries[key]
+                self.stats["expired"] += 1
+                self._dirty = True
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._count_hit(entry, "hits")
+                return entry["response"], None
+
+        if self.embed is None:
+            with self._lock:
+                self.stats["misses"] += 1
+            return None, None
+
+        # Embedded outside the lock: it is usually a remote call
+        embedding = self._embedding(prompt_text(body))
+        with self._lock:
+            near_key = self._nearest(model_id, embedding, user_id) if embedding is not None else None
+            if near_key is not None:
+                entry = self._entries[near_key]
+                self._entries.move_to_end(near_key)
+                self._count_hit(entry, "near_hits")
+                return entry["response"], embedding
+            self.stats["misses"] += 1
+        return None, embedding
+
+    def _count_hit(self, entry: Dict[str, Any], kind: str):
+        self.stats[kind] += 1
+        self.stats["saved_input_tokens"] += entry.get("input_tokens", 0)
+        self.stats["saved_output_tokens"] += entry.get("output_tokens", 0)
+        self.stats["saved_latency_ms"] += entry.get("latency_ms", 0.0)
+
+    def put(self, model_id: str, body: Dict[str, Any], response: Dict[str, Any], latency_ms: float,
+            embedding: Optional[np.ndarray] = None, user_id: Optional[str] = None):
+        """
+        Stores a response body for this user with the latency of the call that produced it.
+        """
+        usage = response.get("usage", {})
+        entry = {
+            "model_id": model_id,
+            "tenant_id": self.tenant_id,
+            "user_id": user_id,
+            "response": response,
+            "created": time.time(),
+            "input_tokens": usage.get("input_tokens", 0),
+            "output_tokens": usage.get("output_tokens", 0),
+            "latency_ms": latency_ms,
+            "embedding": embedding,
+        }
+        key = cache_key(model_id, body, user_id, self.tenant_id)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+            self._dirty = True
+            save_due = time.monotonic() - self._last_save >= self.save_interval
+        if save_due:
+            self.save()
+
+    def invalidate(self, model_id: str, body: Dict[str, Any], user_id: Optional[str] = None):
+        """
+        Drops the entry for this request, e.g. when its response turned out to be unusable.
+        """
+        with self._lock:
+            if self._entries.pop(cache_key(model_id, body, user_id, self.tenant_id), None) is not None:
+                self._dirty = True
+
+    def get_or_invoke(self, model_id: str, body: Dict[str, Any],
+                      invoke: Callable[[str, Dict[str, Any]], Dict[str, Any]],
+                      user_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Returns the cached response for this request by this user, or calls invoke and caches its result.
+        """
+        response, embedding = self.lookup(model_id, body, user_id)
+        if response is not None:
+            return response
+
+        start = time.perf_counter()
+        response = invoke(model_id, body)
+        self.put(model_id, body, response, (time.perf_counter() - start) * 1000, embedding, user_id)
+        return response
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._dirty = True
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """
+        Returns hit/miss counters, the hit rate and the tokens and latency saved by hits.
+        """
+        with self._lock:
+            lookups = self.stats["hits"] + self.stats["near_hits"] + self.stats["misses"]
+            return {
+                **self.stats,
+                "entries": len(self._entries),
+                "hit_rate": (self.stats["hits"] + self.stats["near_hits"]) / lookups if lookups else 0.0,
+            }
+
+
+def _bedrock_embedding(text: str) -> List[float]:
+    from .bedrock_gateway import bedrock_gateway
+    response = bedrock_gateway.invoke(settings.bedrock_embedding_model_id, {"inputText": text[:8000]})
+    return response["embedding"]
+
+
+# Global instance
+response_cache = ResponseCache(
+    path=settings.response_cache_path,
+    max_entries=settings.response_cache_max_entries,
+    ttl_seconds=settings.response_cache_ttl_seconds,
+    embed=_bedrock_embedding if settings.response_cache_semantic else None,
+    similarity_threshold=settings.response_cache_similarity_threshold,
+    tenant_id=settings.tenant_id,
+)
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+RFID Read Ingestion for Clinic Inventory Management System
+Deduplicates high-rate raw reader output and derives tag enter/exit events
+"""
+
+from collections import deque
+from typing import List, Dict, Any, Optional, Callable, Iterable, Tuple
+from enum import Enum
+import os
+import time
+import threading
+
+from apscheduler.triggers.interval import IntervalTrigger
+from pydantic import BaseModel
+
+from services.rfid_registry import RFIDRegistry, rfid_registry
+
+class RFIDPresenceEventType(str, Enum):
+    ENTER = "enter"
+    EXIT = "exit"
+
+class RFIDPresenceEvent(BaseModel):
+    tag_id: str
+    event_type: RFIDPresenceEventType
+    timestamp: float  # epoch seconds
+    reader_id: Optional[str] = None
+
+class RFIDReadIngestor:
+    """Turns raw reads into deduplicated last-seen updates and presence events
+
+    Portal readers report the same tag many times per second. A read is only
+    accepted when the tag has not been accepted within dedup_window seconds;
+    everything else is counted and dropped. A tag enters on its first accepted
+    read and exits once no read has been accepted for exit_timeout seconds.
+
+    last_seen updates and events are buffered and handed to the registry and
+    listeners in batches by flush().
+    """
+
+    def __init__(self, registry: RFIDRegistry, dedup_window: float = 1.0,
+                 exit_timeout: float = 10.0, clock: Callable[[], float] = time.time):
+        if exit_timeout < dedup_window:
+            raise ValueError("exit_timeout must be at least dedup_window")
+
+        self.registry = registry
+        self.dedup_window = dedup_window
+        self.exit_timeout = exit_timeout
+        # Epoch seconds used when reads or sweeps give no time of their own
+        self.clock = clock
+        self._last_accepted: Dict[str, float] = {}
+        self._reader_by_tag: Dict[str, Optional[str]] = {}
+        # Accepted reads in arrival order, used to find expired tags without scanning all of them
+        self._accepted_reads: deque = deque()
+        self._pending_last_seen: Dict[str, float] = {}
+        self._pending_events: List[RFIDPresenceEvent] = []
+        self._listeners: List[Callable[[List[RFIDPresenceEvent]], None]] = []
+        # Reads arrive on the event loop while sweeps and cycle counts may run on scheduler threads
+        self._lock = threading.RLock()
+        # Serializes flushes so listeners get batches in order
+        self._flush_lock = threading.Lock()
+        self.stats = {
+            "raw_reads": 0,
+            "accepted_reads": 0,
+            "duplicate_reads": 0,
+            "unknown_tag_reads": 0,
+            "enter_events": 0,
+            "exit_events": 0,
+            "flushes": 0,
+        }
+
+    def add_listener(self, listener: Callable[[List[RFIDPresenceEvent]], None]):
+        """Register a callback that receives each flushed batch of presence events"""
+        self._listeners.append(listener)
+
+    def present_tags(self) -> List[str]:
+        """Get the tags currently considered present"""
+        with self._lock:
+            return list(self._last_accepted)
+
+    def ingest(self, tag_ids: List[str], timestamps: List[float],
+               reader_id: Optional[str] = None) -> int:
+        """Ingest a batch of raw reads (parallel lists of tag IDs and epoch timestamps)
+
+        Reads are expected in roughly chronological order per reader.
+
+        Returns:
+            The number of reads accepted after deduplication.
+        """
+        with self._lock:
+            window = self.dedup_window
+            last_accepted = self._last_accepted
+            get_last = last_accepted.get
+            tags = self.registry.tags
+            pending = self._pending_last_seen
+            accepted_reads = self._accepted_reads
+            events = self._pending_events
+            reader_by_tag = self._reader_by_tag
+
+            accepted = 0
+            unknown = 0
+            entered = 0
+            for tag_id, timestamp in zip(tag_ids, timestamps):
+                last = get_last(tag_id)
+                if last is not None and timestamp - last < window:
+                    continue
+
+                if last is None:
+                    if tag_id not in tags:
+                        unknown += 1
+                        continue
+                    events.append(RFIDPresenceEvent(
+                        tag_id=tag_id,
+                        event_type=RFIDPresenceEventType.ENTER,
+                        timestamp=timestamp,
+                        reader_id=reader_id
+                    ))
+                    entered += 1
+
+                last_accepted[tag_id] = timestamp
+                pending[tag_id] = timestamp
+                reader_by_tag[tag_id] = reader_id
+                accepted_reads.append((timestamp, tag_id))
+                accepted += 1
+
+            stats = self.stats
+            stats["raw_reads"] += len(tag_ids)
+            stats["accepted_reads"] += accepted
+            stats["unknown_tag_reads"] += unknown
+            stats["duplicate_reads"] += len(tag_ids) - accepted - unknown
+            stats["enter_events"] += entered
+            return accepted
+
+    def ingest_lines(self, lines: Iterable[str], default_reader_id: Optional[str] = None,
+                     now: Optional[float] = None) -> int:
+        """Parse and ingest raw reads formatted as "tag_id[,epoch_timestamp[,reader_id]]"
+
+        Reads are grouped by reader so each reader's reads keep their order.
+        """
+        now = now if now is not None else self.clock()
+        batches: Dict[Optional[str], Tuple[List[str], List[float]]] = {}
+
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+            parts = line.split(",")
+            timestamp = float(parts[1]) if len(parts) > 1 and parts[1] else now
+            reader_id = parts[2] if len(parts) > 2 and parts[2] else default_reader_id
+            batch = batches.get(reader_id)
+            if batch is None:
+                batch = batches[reader_id] = ([], [])
+            batch[0].append(parts[0])
+            batch[1].append(timestamp)
+
+        return sum(self.ingest(tag_ids, timestamps, reader_id)
+                   for reader_id, (tag_ids, timestamps) in batches.items())
+
+    def sweep(self, now: Optional[float] = None) -> int:
+        """Emit exit events for tags with no accepted read in the last exit_timeout seconds
+
+        Returns:
+            The number of exit events generated.
+        """
+        with self._lock:
+            now = now if now is not None else self.clock()
+            cutoff = now - self.exit_timeout
+            accepted_reads = self._accepted_reads
+            last_accepted = self._last_accepted
+
+            exited = 0
+            while accepted_reads and accepted_reads[0][0] <= cutoff:
+                timestamp, tag_id = accepted_reads.popleft()
+                # Only the tag's latest accepted read decides whether it has left
+                if last_accepted.get(tag_id) != timestamp:
+                    continue
+                del last_accepted[tag_id]
+                self._pending_events.append(RFIDPresenceEvent(
+                    tag_id=tag_id,
+                    event_type=RFIDPresenceEventType.EXIT,
+                    timestamp=timestamp + self.exit_timeout,
+                    reader_id=self._reader_by_tag.pop(tag_id, None)
+                ))
+                exited += 1
+
+            self.stats["exit_events"] += exited
+            return exited
+
+    def flush(self) -> List[RFIDPresenceEvent]:
+        """Write buffered last-seen times to the registry and deliver buffered events"""
+        with self._flush_lock:
+            with self._lock:
+                pending_last_seen = self._pending_last_seen
+                self._pending_last_seen = {}
+                events = self._pending_events
+                self._pending_events = []
+                self.stats["flushes"] += 1
+
+            # Reads can keep arriving while the registry and listeners are updated
+            if pending_last_seen:
+                self.registry.record_last_seen(pending_last_seen)
+            if events:
+                for listener in self._listeners:
+                    listener(events)
+        return events
+
+    def sweep_and_flush(self) -> List[RFIDPresenceEvent]:
+        """Emit exits for tags that have gone quiet and deliver everything buffered"""
+        self.sweep()
+        return self.flush()
+
+    def schedule_sweeps(self, scheduler, interval_seconds: float):
+        """Sweep and flush on the given scheduler every interval_seconds
+
+        Without this, exits are only detected when another read arrives, so a
+        tag leaving a quiet cabinet would never be taken out of stock.
+        """
+        scheduler.add_job(
+            func=self.sweep_and_flush,
+            trigger=IntervalTrigger(seconds=interval_seconds),
+            id='rfid_presence_sweep',
+            name='RFID Presence Sweep',
+            replace_existing=True,
+            coalesce=True
+        )
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Get ingestion counters and current presence"""
+        return {
+            **self.stats,
+            "present_tags": len(self._last_accepted),
+            "dedup_window": self.dedup_window,
+            "exit_timeout": self.exit_timeout,
+        }
+
+def _get_float_env(name: str, default: float) -> float:
+    value = os.getenv(name)
+    return float(value) if value else default
+
+# Global instance
+rfid_read_ingestor = RFIDReadIngestor(
+    rfid_registry,
+    dedup_window=_get_float_env("RFID_DEDUP_WINDOW_SECONDS", 1.0),
+    exit_timeout=_get_float_env("RFID_EXIT_TIMEOUT_SECONDS", 10.0)
+)
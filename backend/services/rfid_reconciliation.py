@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+RFID Reconciliation for Clinic Inventory Management System
+Turns tag movements into stock changes and reconciles tag counts against recorded stock
+"""
+
+from collections import Counter
+from typing import List, Dict, Any, Optional, Iterable, Set
+from datetime import datetime
+import os
+import time
+import threading
+
+from apscheduler.triggers.interval import IntervalTrigger
+from pydantic import BaseModel
+
+from services.alerts_service import AlertsService, alerts_service
+from services.rfid_registry import RFIDRegistry, rfid_registry
+from services.rfid_ingest import RFIDReadIngestor, RFIDPresenceEvent, RFIDPresenceEventType, rfid_read_ingestor
+
+class RFIDItemDiscrepancy(BaseModel):
+    item_id: str
+    item_name: Optional[str] = None
+    recorded_stock: Optional[int] = None  # None when the item is not a known medical supply
+    counted_stock: int
+    difference: int  # counted - recorded
+
+class RFIDCycleCountReport(BaseModel):
+    counted_at: datetime
+    duration_seconds: float
+    tags_seen: int
+    assigned_tags: int
+    matched_tags: int
+    items_counted: int
+    missing_tag_ids: List[str]      # assigned but not seen
+    unassigned_tag_ids: List[str]   # seen, registered, but not assigned to an item
+    unknown_tag_ids: List[str]      # seen but not registered
+    discrepancies: List[RFIDItemDiscrepancy]
+    applied: bool = False
+
+class RFIDReconciliationEngine:
+    """Keeps AlertsService stock in step with RFID-tagged units
+
+    Each tag stands for one unit of its assigned item. A tag leaving the
+    cabinet decrements that item's stock by one; the same tag coming back
+    restores it. Changes from a batch of presence events are netted per item
+    and applied to AlertsService in a single call.
+
+    Cycle counts compare the tags seen in the cabinet against the registry
+    and against current_stock using set arithmetic over whole tag populations.
+    """
+
+    def __init__(self, registry: RFIDRegistry, alerts: AlertsService,
+                 ingestor: Optional[RFIDReadIngestor] = None):
+        self.registry = registry
+        self.alerts = alerts
+        self.ingestor = ingestor
+        # Tags whose exit has already been taken out of stock
+        self._removed_tags: Set[str] = set()
+        self.last_report: Optional[RFIDCycleCountReport] = None
+        # Event batches come from the event loop, scheduled cycle counts from a scheduler thread
+        self._lock = threading.RLock()
+        self.stats = {
+            "event_batches": 0,
+            "units_removed": 0,
+            "units_returned": 0,
+            "ignored_events": 0,
+            "cycle_counts": 0,
+        }
+
+    def handle_events(self, events: List[RFIDPresenceEvent]) -> Dict[str, int]:
+        """Net a batch of presence events into per-item stock changes and apply them
+
+        Returns:
+            The new stock level of every adjusted item.
+        """
+        with self._lock:
+            return self._handle_events(events)
+
+    def _handle_events(self, events: List[RFIDPresenceEvent]) -> Dict[str, int]:
+        get_item_id = self.registry.get_item_id_for_tag
+        removed_tags = self._removed_tags
+        adjustments: Counter = Counter()
+        removed = returned = ignored = 0
+
+        for event in events:
+            item_id = get_item_id(event.tag_id)
+            if item_id is None:
+                ignored += 1
+                continue
+            if event.event_type == RFIDPresenceEventType.EXIT:
+                if event.tag_id in removed_tags:
+                    ignored += 1
+                    continue
+                removed_tags.add(event.tag_id)
+                adjustments[item_id] -= 1
+                removed += 1
+            elif event.tag_id in removed_tags:
+                removed_tags.discard(event.tag_id)
+                adjustments[item_id] += 1
+                returned += 1
+            else:
+                # First sighting of a unit that is already part of recorded stock
+                ignored += 1
+
+        self.stats["event_batches"] += 1
+        self.stats["units_removed"] += removed
+        self.stats["units_returned"] += returned
+        self.stats["ignored_events"] += ignored
+        return self.alerts.apply_stock_adjustments(adjustments) if adjustments else {}
+
+    def cycle_count(self, seen_tag_ids: Optional[Iterable[str]] = None,
+                    apply: bool = False) -> RFIDCycleCountReport:
+        """Reconcile the tags seen in the cabinet against assignments and recorded stock
+
+        Args:
+            seen_tag_ids: Tags found by the count; defaults to the tags the
+                read ingestor currently considers present.
+            apply: Overwrite current_stock with the counted quantities.
+        """
+        with self._lock:
+            return self._cycle_count(seen_tag_ids, apply)
+
+    def _cycle_count(self, seen_tag_ids: Optional[Iterable[str]], apply: bool) -> RFIDCycleCountReport:
+        start = time.perf_counter()
+        if seen_tag_ids is None:
+            if self.ingestor is None:
+                raise ValueError("No seen tags given and no read ingestor attached")
+            seen_tag_ids = self.ingestor.present_tags()
+
+        seen = set(seen_tag_ids)
+        # Copied under the registry lock: the live views change while reads are ingested
+        with self.registry.lock:
+            assigned = set(self.registry.assigned_tag_ids())
+            registered = set(self.registry.tags)
+            tagged_item_ids = list(self.registry.tagged_item_ids())
+            matched = seen & assigned
+            counts = self.registry.count_tags_by_item(matched)
+        missing = assigned - seen
+        unknown = seen - registered
+        unassigned = seen - unknown - matched
+
+        supplies_by_id = {supply.id: supply for supply in self.alerts.medical_supplies}
+        discrepancies = []
+        corrections = {}
+        for item_id in tagged_item_ids:
+            counted = counts.get(item_id, 0)
+            supply = supplies_by_id.get(item_id)
+            if supply is None:
+                discrepancies.append(RFIDItemDiscrepancy(
+                    item_id=item_id, counted_stock=counted, difference=counted
+                ))
+            elif counted != supply.current_stock:
+                difference = counted - supply.current_stock
+                discrepancies.append(RFIDItemDiscrepancy(
+                    item_id=item_id,
+                    item_name=supply.name,
+                    recorded_stock=supply.current_stock,
+                    counted_stock=counted,
+                    difference=difference
+                ))
+                corrections[item_id] = difference
+
+        if apply and corrections:
+            # Count corrections are shrinkage or found stock, not consumption
+            self.alerts.apply_stock_adjustments(corrections, record_consumption=False)
+            # Stock now matches the count: every missing tag is out of the cabinet
+            # and counts as a return if it is seen again
+            self._removed_tags = set(missing)
+
+        report = RFIDCycleCountReport(
+            counted_at=datetime.now(),
+            duration_seconds=time.perf_counter() - start,
+            tags_seen=len(seen),
+            assigned_tags=len(assigned),
+            matched_tags=len(matched),
+            items_counted=len(counts),
+            missing_tag_ids=sorted(missing),
+            unassigned_tag_ids=sorted(unassigned),
+            unknown_tag_ids=sorted(unknown),
+            discrepancies=discrepancies,
+            applied=apply
+        )
+        self.last_report = report
+        self.stats["cycle_counts"] += 1
+        return report
+
+    def schedule_cycle_counts(self, scheduler, interval_minutes: float):
+        """Run a report-only cycle count on the given scheduler every interval_minutes"""
+        scheduler.add_job(
+            func=self.cycle_count,
+            trigger=IntervalTrigger(minutes=interval_minutes),
+            id='rfid_cycle_count',
+            name='RFID Cycle Count',
+            replace_existing=True
+        )
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Get reconciliation counters and a summary of the last cycle count"""
+        last = self.last_report
+        return {
+            **self.stats,
+            "units_out_of_cabinet": len(self._removed_tags),
+            "last_cycle_count": {
+                "counted_at": last.counted_at.isoformat(),
+                "tags_seen": last.tags_seen,
+                "missing_tags": len(last.missing_tag_ids),
+                "discrepancies": len(last.discrepancies),
+            } if last else None,
+        }
+
+# Global instance
+rfid_reconciliation_engine = RFIDReconciliationEngine(rfid_registry, alerts_service, rfid_read_ingestor)
+rfid_read_ingestor.add_listener(rfid_reconciliation_engine.handle_events)
+
+# Exits are swept on a timer, not only when new reads arrive; defaults to once per dedup window
+_sweep_interval = os.getenv("RFID_SWEEP_INTERVAL_SECONDS")
+_sweep_interval = float(_sweep_interval) if _sweep_interval else rfid_read_ingestor.dedup_window
+if _sweep_interval > 0:
+    rfid_read_ingestor.schedule_sweeps(alerts_service.scheduler, _sweep_interval)
+
+# Periodic report-only cycle counts are off unless an interval is configured
+_cycle_count_interval = float(os.getenv("RFID_CYCLE_COUNT_INTERVAL_MINUTES") or 0)
+if _cycle_count_interval > 0:
+    rfid_reconciliation_engine.schedule_cycle_counts(alerts_service.scheduler, _cycle_count_interval)
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+RFID Registry for Clinic Inventory Management System
+Indexed storage of RFID tags and their item assignments
+"""
+
+from collections import Counter
+from typing import List, Dict, Optional, Tuple, Set, Iterable, KeysView
+from datetime import datetime
+import threading
+
+from pydantic import BaseModel
+
+class RFIDTag(BaseModel):
+    tag_id: str
+    tag_type: str = "inventory"
+    description: Optional[str] = None
+    created_at: str
+    last_seen: Optional[str] = None
+    status: str = "active"
+
+class RFIDAssignment(BaseModel):
+    assignment_id: str
+    tag_id: str
+    item_id: str
+    item_type: str  # "medicine", "supply", "equipment"
+    assigned_at: str
+    assigned_by: str
+    notes: Optional[str] = None
+
+class RFIDRegistry:
+    """Tags and assignments with O(1) lookups by tag, assignment and item
+
+    All mutations go through this class so the secondary indexes
+    (tag -> assignment, tag -> item, item -> assignments) never drift from the primary dicts.
+    Mutations hold self.lock, which readers on other threads (e.g. scheduled
+    cycle counts) take while copying the live views below.
+    """
+
+    def __init__(self):
+        self.tags: Dict[str, RFIDTag] = {}
+        self.assignments: Dict[str, RFIDAssignment] = {}
+        self._assignment_by_tag: Dict[str, str] = {}
+        self._item_by_tag: Dict[str, str] = {}
+        # item_id -> assignment ids, kept as dict keys to preserve assignment order
+        self._assignments_by_item: Dict[str, Dict[str, None]] = {}
+        self._assignment_counter = 0
+        # Epoch seconds of the latest read per tag, written in batches by the read ingestor.
+        # Tags listed in _stale_last_seen get their ISO last_seen refreshed when read back.
+        self.last_seen_epoch: Dict[str, float] = {}
+        self._stale_last_seen: Set[str] = set()
+        self.lock = threading.RLock()
+
+    # Tags
+
+    def get_tags(self) -> List[RFIDTag]:
+        """Get all RFID tags"""
+        for tag_id in list(self._stale_last_seen):
+            self._refresh_last_seen(tag_id)
+        return list(self.tags.values())
+
+    def get_tag(self, tag_id: str) -> Optional[RFIDTag]:
+        """Get an RFID tag by ID"""
+        if tag_id in self._stale_last_seen:
+            self._refresh_last_seen(tag_id)
+        return self.tags.get(tag_id)
+
+    def record_last_seen(self, updates: Dict[str, float]):
+        """Apply a batch of last-seen epoch timestamps (tag_id -> seconds)"""
+        with self.lock:
+            self.last_seen_epoch.update(updates)
+            self._stale_last_seen.update(updates)
+
+    def _refresh_last_seen(self, tag_id: str):
+        self._stale_last_seen.discard(tag_id)
+        tag = self.tags.get(tag_id)
+        if tag is not None:
+            tag.last_seen = datetime.fromtimestamp(self.last_seen_epoch[tag_id]).isoformat()
+
+    def add_tag(self, tag: RFIDTag) -> bool:
+        """Register a new tag; returns False if the tag ID is already taken"""
+        with self.lock:
+            if tag.tag_id in self.tags:
+                return False
+            self.tags[tag.tag_id] = tag
+            return True
+
+    def update_tag(self, tag_id: str, tag: RFIDTag) -> bool:
+        """Replace the stored tag for an existing tag ID"""
+        with self.lock:
+            if tag_id not in self.tags:
+                return False
+            self.tags[tag_id] = tag
+            return True
+
+    def delete_tag(self, tag_id: str) -> bool:
+        """Delete a tag together with its assignment, if any"""
+        with self.lock:
+            if tag_id not in self.tags:
+                return False
+            assignment_id = self._assignment_by_tag.get(tag_id)
+            if assignment_id:
+                self.unassign(assignment_id)
+            del self.tags[tag_id]
+            self.last_seen_epoch.pop(tag_id, None)
+            self._stale_last_seen.discard(tag_id)
+            return True
+
+    # Assignments
+
+    def get_assignments(self) -> List[RFIDAssignment]:
+        """Get all RFID assignments"""
+        return list(self.assignments.values())
+
+    def get_assignment(self, assignment_id: str) -> Optional[RFIDAssignment]:
+        """Get an assignment by ID"""
+        return self.assignments.get(assignment_id)
+
+    def get_assignment_for_tag(self, tag_id: str) -> Optional[RFIDAssignment]:
+        """Get the assignment of a tag, if it is assigned"""
+        assignment_id = self._assignment_by_tag.get(tag_id)
+        return self.assignments[assignment_id] if assignment_id else None
+
+    def get_item_assignments(self, item_id: str) -> List[RFIDAssignment]:
+        """Get all assignments for an item"""
+        return [self.assignments[assignment_id]
+                for assignment_id in self._assignments_by_item.get(item_id, ())]
+
+    def get_item_id_for_tag(self, tag_id: str) -> Optional[str]:
+        """Get the item a tag is assigned to"""
+        return self._item_by_tag.get(tag_id)
+
+    def assigned_tag_ids(self) -> KeysView[str]:
+        """Get a live set-like view of all assigned tag IDs"""
+        return self._item_by_tag.keys()
+
+    def tagged_item_ids(self) -> KeysView[str]:
+        """Get a live set-like view of all items with at least one assigned tag"""
+        return self._assignments_by_item.keys()
+
+    def count_tags_by_item(self, tag_ids: Iterable[str]) -> Dict[str, int]:
+        """Count assigned tags per item; unassigned tag IDs are ignored"""
+        item_by_tag = self._item_by_tag
+        return Counter(item_by_tag[tag_id] for tag_id in tag_ids if tag_id in item_by_tag)
+
+    def is_assigned(self, tag_id: str) -> bool:
+        """Check whether a tag is currently assigned"""
+        return tag_id in self._assignment_by_tag
+
+    def next_assignment_id(self) -> str:
+        """Generate an unused assignment ID"""
+        while True:
+            self._assignment_counter += 1
+            assignment_id = f"assign_{self._assignment_counter:04d}"
+            if assignment_id not in self.assignments:
+                return assignment_id
+
+    def add_assignment(self, assignment: RFIDAssignment) -> bool:
+        """Store an assignment; returns False if the tag is unknown or already assigned"""
+        with self.lock:
+            if assignment.tag_id not in self.tags or assignment.tag_id in self._assignment_by_tag:
+                return False
+            if assignment.assignment_id in self.assignments:
+                return False
+
+            self.assignments[assignment.assignment_id] = assignment
+            self._assignment_by_tag[assignment.tag_id] = assignment.assignment_id
+            self._item_by_tag[assignment.tag_id] = assignment.item_id
+            self._assignments_by_item.setdefault(assignment.item_id, {})[assignment.assignment_id] = None
+            return True
+
+    def assign(self, tag_id: str, item_id: str, item_type: str, assigned_by: str,
+               notes: Optional[str] = None) -> Optional[RFIDAssignment]:
+        """Assign a tag to an item; returns None if the tag is unknown or already assigned"""
+        with self.lock:
+            if tag_id not in self.tags or tag_id in self._assignment_by_tag:
+                return None
+
+            assignment = RFIDAssignment(
+                assignment_id=self.next_assignment_id(),
+                tag_id=tag_id,
+                item_id=item_id,
+                item_type=item_type,
+                assigned_at=datetime.now().isoformat(),
+                assigned_by=assigned_by,
+                notes=notes
+            )
+            self.add_assignment(assignment)
+            return assignment
+
+    def unassign(self, assignment_id: str) -> Optional[RFIDAssignment]:
+        """Remove an assignment and its index entries"""
+        with self.lock:
+            assignment = self.assignments.pop(assignment_id, None)
+            if not assignment:
+                return None
+
+            self._assignment_by_tag.pop(assignment.tag_id, None)
+            self._item_by_tag.pop(assignment.tag_id, None)
+            item_assignments = self._assignments_by_item.get(assignment.item_id)
+            if item_assignments is not None:
+                item_assignments.pop(assignment_id, None)
+                if not item_assignments:
+                    del self._assignments_by_item[assignment.item_id]
+            return assignment
+
+    # Scanning
+
+    def scan(self, tag_id: str, scanned_at: Optional[datetime] = None) -> Optional[Tuple[RFIDTag, Optional[RFIDAssignment]]]:
+        """Record a scan of a tag and return it with its assignment"""
+        with self.lock:
+            tag = self.tags.get(tag_id)
+            if tag is None:
+                return None
+
+            scanned_at = scanned_at or datetime.now()
+            tag.last_seen = scanned_at.isoformat()
+            self.last_seen_epoch[tag_id] = scanned_at.timestamp()
+            self._stale_last_seen.discard(tag_id)
+            assignment_id = self._assignment_by_tag.get(tag_id)
+            return tag, (self.assignments[assignment_id] if assignment_id else None)
+
+# Global instance
+rfid_registry = RFIDRegistry()
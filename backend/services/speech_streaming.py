@@ -0,0 +1,176 @@
+# Streams a spoken answer: Bedrock answer tokens are cut into sentences as they
+# arrive, each sentence is sent to ElevenLabs as soon as it is complete, and the
+# audio chunks are yielded to the caller (e.g. a StreamingResponse) as they come back.
+
+import queue
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+from backend.logger import logger
+from . import bedrock, elevenlabs
+from .query_orchestrator import query_orchestrator
+
+# Sentence-ending punctuation, optionally followed by closing quotes or brackets, then whitespace
+SENTENCE_END = re.compile(r"[.!?]+[\"')\]]*\s+")
+# Words whose trailing period does not end a sentence ("Dr. Smith")
+ABBREVIATIONS = {"dr", "mr", "mrs", "ms", "prof", "st", "jr", "sr", "vs", "etc", "e.g", "i.e", "approx", "no"}
+
+
+def _split_point(text: str, min_chars: int, max_chars: int) -> Optional[int]:
+    """
+    Returns where the first complete sentence of text ends, or None if it has not ended yet.
+    """
+    for match in SENTENCE_END.finditer(text, max(0, min_chars - 1)):
+        words = text[:match.start() + 1].split()
+        if words and words[-1].rstrip(".").lower() in ABBREVIATIONS:
+            continue
+        return match.end()
+
+    if len(text) > max_chars:
+        # An overlong sentence is broken at the last clause boundary, or failing that a space
+        cut = max(text.rfind(", ", 0, max_chars), text.rfind("; ", 0, max_chars))
+        if cut <= 0:
+            cut = text.rfind(" ", 0, max_chars)
+        return cut + 1 if cut > 0 else max_chars
+    return None
+
+
+def iter_sentences(deltas: Iterable[str], min_chars: int = 20, max_chars: int = 240) -> Iterator[str]:
+    """
+    Regroups streamed text deltas into sentences. Sentences shorter than
+    min_chars are joined with the next one; the remainder is flushed at the end.
+    """
+    buffer = ""
+    for delta in deltas:
+        buffer += delta
+        while True:
+            cut = _split_point(buffer, min_chars, max_chars)
+            if cut is None:
+                break
+            sentence, buffer = buffer[:cut].strip(), buffer[cut:]
+            if sentence:
+                yield sentence
+
+    if buffer.strip():
+        yield buffer.strip()
+
+
+class SpeechStreamer:
+    """
+    Turns a query into a stream of audio bytes. The answer is generated on a
+    background thread, so the model keeps writing sentence N+1 while sentence N
+    is being converted to speech.
+    """
+
+    _DONE = object()
+
+    def __init__(self, stream_answer: Optional[Callable[[str, List[str], List[str], Optional[str]], Iterable[str]]] = None,
+                 speak: Optional[Callable[[str, Optional[str]], Iterable[bytes]]] = None,
+                 orchestrator=None, min_chars: int = 20, max_chars: int = 240):
+        # Stage functions can be swapped out, e.g. for fakes in tests
+        self.stream_answer = stream_answer or bedrock.stream_synthesized_answer
+        self.speak = speak or elevenlabs.text_to_speech_stream
+        self.orchestrator = orchestrator or query_orchestrator
+        self.min_chars = min_chars
+        self.max_chars = max_chars
+        self._lock = threading.Lock()
+        self.stats = {
+            "streams": 0,
+            "sentences": 0,
+            "audio_bytes": 0,
+            "first_audio_ms_total": 0.0,
+        }
+        self.last_timings: Dict[str, Any] = {}
+
+    def _produce(self, sentences: "queue.Queue", stop: threading.Event, timings: Dict[str, Any],
+                 started: float, query: str, kendra_results: List[str], neptune_results: List[str],
+                 user_id: Optional[str]):
+        def timed_deltas():
+            for delta in self.stream_answer(query, kendra_results, neptune_results, user_id):
+                timings.setdefault("first_token_ms", (time.perf_counter() - started) * 1000)
+                yield delta
+
+        try:
+            for sentence in iter_sentences(timed_deltas(), self.min_chars, self.max_chars):
+                if stop.is_set():
+                    return
+                timings.setdefault("first_sentence_ms", (time.perf_counter() - started) * 1000)
+                sentences.put(sentence)
+        except Exception as e:
+            sentences.put(e)
+        finally:
+            sentences.put(self._DONE)
+
+    def stream_answer_audio(self, query: str, kendra_results: List[str], neptune_results: List[str],
+                            started: Optional[float] = None, user_id: Optional[str] = None) -> Iterator[bytes]:
+        """
+        Yields the audio of the answer to query, sentence by sentence, while it is being generated.
+        """
+        started = time.perf_counter() if started is None else started
+        timings: Dict[str, Any] = {}
+        sentences: "queue.Queue" = queue.Queue()
+        stop = threading.Event()
+        threading.Thread(target=self._produce, daemon=True, name="answer-stream",
+                         args=(sentences, stop, timings, started, query, kendra_results, neptune_results,
+                               user_id)).start()
+
+        spoken: List[str] = []
+        audio_bytes = 0
+        try:
+            while True:
+                sentence = sentences.get()
+                if sentence is self._DONE:
+                    break
+                if isinstance(sentence, Exception):
+                    raise sentence
+                for chunk in self.speak(sentence, spoken[-1] if spoken else None):
+                    timings.setdefault("first_audio_ms", (time.perf_counter() - started) * 1000)
+                    audio_bytes += len(chunk)
+                    yield chunk
+                spoken.append(sentence)
+        finally:
+            # Also reached when the client disconnects and the generator is closed
+            stop.set()
+            timings["total_ms"] = (time.perf_counter() - started) * 1000
+            timings["sentences"] = len(spoken)
+            self._record(timings, audio_bytes)
+
+    def stream_query_audio(self, query: str, user_id: str) -> Iterator[bytes]:
+        """
+        Retrieves context for query through the orchestrator, then streams the spoken answer.
+        """
+        started = time.perf_counter()
+        context = self.orchestrator.gather(query, user_id, started)
+        logger.info(f"Retrieval for spoken answer took {context['retrieval_ms']:.0f}ms"
+                    f"{' (partial)' if context['partial'] else ''}")
+        yield from self.stream_answer_audio(query, [result["text"] for result in context["kendra_results"]],
+                                            context["neptune_results"], started, user_id)
+
+    def _record(self, timings: Dict[str, Any], audio_bytes: int):
+        with self._lock:
+            self.stats["streams"] += 1
+            self.stats["sentences"] += timings["sentences"]
+            self.stats["audio_bytes"] += audio_bytes
+            self.stats["first_audio_ms_total"] += timings.get("first_audio_ms", timings["total_ms"])
+            self.last_timings = dict(timings)
+        logger.info(f"Spoken answer: first token {timings.get('first_token_ms', 0):.0f}ms, "
+                    f"first audio {timings.get('first_audio_ms', 0):.0f}ms, "
+                    f"{timings['sentences']} sentences in {timings['total_ms']:.0f}ms")
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """
+        Returns stream counters, the mean time to first audio and the last stream's timings.
+        """
+        with self._lock:
+            streams = self.stats["streams"]
+            return {
+                **self.stats,
+                "mean_first_audio_ms": self.stats["first_audio_ms_total"] / streams if streams else 0.0,
+                "last_timings": dict(self.last_timings),
+            }
+
+
+# Global instance
+speech_streamer = SpeechStreamer()
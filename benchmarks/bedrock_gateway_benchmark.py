@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Bedrock Gateway Benchmark
+Runs a burst of InvokeModel requests against the local Bedrock stub, sequentially through a plain
+client and concurrently through the gateway, and reports throughput, retries and coalescing
+"""
+
+import sys
+import os
+import json
+import time
+import random
+import argparse
+from concurrent.futures import wait
+
+REPO_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# The backend settings require these; the stub ignores credentials
+for name in ("AWS_ACCESS_KEY_ID", "AWS_SECRET_ACCESS_KEY", "ELEVENLABS_API_KEY", "KENDRA_INDEX_ID",
+             "NEPTUNE_ENDPOINT", "S3_BUCKET_NAME", "DYNAMODB_SPEAKERS_TABLE_NAME", "HUGGING_FACE_TOKEN",
+             "DYNAMODB_ANALYTICS_TABLE_NAME", "DYNAMODB_ALERTS_TABLE_NAME", "DYNAMODB_TASKS_TABLE_NAME"):
+    os.environ.setdefault(name, "stub")
+os.environ.setdefault("AWS_REGION_NAME", "us-east-1")
+os.environ.setdefault("BEDROCK_MODEL_ID", "stub.analysis-model")
+os.environ.setdefault("BEDROCK_SYNTHESIS_MODEL_ID", "stub.synthesis-model")
+
+import boto3
+from botocore.config import Config
+
+from bedrock_stub_server import start_stub_server
+from backend.services.bedrock_gateway import BedrockGateway
+
+MODEL_IDS = ["stub.analysis-model", "stub.synthesis-model"]
+
+def make_client(endpoint_url, pool_size, botocore_retries):
+    return boto3.client(
+        "bedrock-runtime",
+        region_name="us-east-1",
+        aws_access_key_id="stub",
+        aws_secret_access_key="stub",
+        endpoint_url=endpoint_url,
+        config=Config(max_pool_connections=pool_size, tcp_keepalive=True,
+                      retries={"total_max_attempts": botocore_retries, "mode": "standard"}),
+    )
+
+def make_requests(count, duplicate_rate, seed=42):
+    """(model_id, body) pairs; duplicate_rate of them repeat an earlier prompt"""
+    rng = random.Random(seed)
+    requests = []
+    for i in range(count):
+        if requests and rng.random() < duplicate_rate:
+            requests.append(rng.choice(requests))
+            continue
+        body = {
+            "anthropic_version": "bedrock-2023-05-31",
+            "max_tokens": 256,
+            "messages": [{"role": "user", "content": [{"type": "text", "text": f"Question {i}: where are my keys?"}]}],
+        }
+        requests.append((rng.choice(MODEL_IDS), body))
+    return requests
+
+def run_sequential(client, requests):
+    start = time.perf_counter()
+    for model_id, body in requests:
+        response = client.invoke_model(body=json.dumps(body), modelId=model_id,
+                                       contentType="application/json", accept="application/json")
+        json.loads(response["body"].read())
+    return time.perf_counter() - start
+
+def run_gateway(gateway, requests):
+    start = time.perf_counter()
+    futures = [gateway.submit(model_id, body) for model_id, body in requests]
+    wait(futures)
+    failed = sum(1 for future in futures if future.exception() is not None)
+    return time.perf_counter() - start, failed
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Bedrock gateway against a local stub")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--latency", type=float, default=0.2, help="Stub response latency in seconds")
+    parser.add_argument("--throttle-rate", type=float, default=0.1, help="Fraction of stub responses throttled")
+    parser.add_argument("--rate", type=float, default=50.0, help="Gateway requests per second per model")
+    parser.add_argument("--duplicate-rate", type=float, default=0.2, help="Fraction of requests repeating a prompt")
+    parser.add_argument("--skip-sequential", action="store_true")
+    args = parser.parse_args()
+
+    server, state, endpoint_url = start_stub_server(latency=args.latency, throttle_rate=args.throttle_rate)
+    requests = make_requests(args.requests, args.duplicate_rate)
+    print(f"Stub at {endpoint_url}: {args.requests} requests, {args.latency * 1000:.0f}ms latency, "
+          f"{args.throttle_rate:.0%} throttled")
+
+    if not args.skip_sequential:
+        seconds = run_sequential(make_client(endpoint_url, 1, 5), requests)
+        print(f"\nSequential client:  {seconds:7.2f}s  {len(requests) / seconds:7.1f} req/s")
+
+    stub_requests, stub_throttled = state.requests, state.throttled
+    gateway = BedrockGateway(client=make_client(endpoint_url, args.concurrency, 1),
+                             max_workers=args.concurrency, requests_per_second=args.rate,
+                             burst=args.concurrency, base_delay=0.05)
+    seconds, failed = run_gateway(gateway, requests)
+    gateway.shutdown()
+    stats = gateway.get_statistics()
+    print(f"Gateway:            {seconds:7.2f}s  {len(requests) / seconds:7.1f} req/s  ({failed} failed)")
+    print(f"  upstream calls {state.requests - stub_requests} (throttled {state.throttled - stub_throttled}), "
+          f"coalesced {stats['coalesced']}, retries {stats['retries']}, "
+          f"rate-limit wait {stats['rate_limit_wait_seconds']:.2f}s, max concurrent at stub {state.max_concurrent}")
+    server.shutdown()
+
+if __name__ == "__main__":
+    main()
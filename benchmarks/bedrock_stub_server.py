@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Bedrock Stub Server
+Local stand-in for the Bedrock runtime InvokeModel API with configurable latency and throttling,
+for exercising the Bedrock gateway without AWS (point BEDROCK_ENDPOINT_URL at it)
+"""
+
+import re
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+INVOKE_PATH = re.compile(r"^/model/(?P<model_id>[^/]+)/invoke$")
+
+class StubState:
+    """Stub behaviour plus counters shared by all request handlers"""
+
+    def __init__(self, latency=0.2, jitter=0.05, throttle_rate=0.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.throttle_rate = throttle_rate
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.throttled = 0
+        self.concurrent = 0
+        self.max_concurrent = 0
+
+def make_handler(state):
+    class BedrockStubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send_json(self, status, payload, headers=None):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            match = INVOKE_PATH.match(self.path)
+            if not match:
+                self._send_json(404, {"message": f"Unknown path {self.path}"})
+                return
+
+            with state.lock:
+                state.requests += 1
+                throttle = random.random() < state.throttle_rate
+                if throttle:
+                    state.throttled += 1
+                else:
+                    state.concurrent += 1
+                    state.max_concurrent = max(state.max_concurrent, state.concurrent)
+
+            if throttle:
+                # botocore reads the error code from this header for rest-json services
+                self._send_json(429, {"message": "Too many requests"},
+                                {"x-amzn-ErrorType": "ThrottlingException"})
+                return
+
+            try:
+                time.sleep(max(0.0, random.gauss(state.latency, state.jitter)))
+                prompt = request.get("messages", [{}])[-1].get("content", [{}])[-1].get("text", "")
+                self._send_json(200, {
+                    "id": f"msg_stub_{state.requests}",
+                    "type": "message",
+                    "role": "assistant",
+                    "model": match.group("model_id"),
+                    "content": [{"type": "text", "text": f"Stub answer to a {len(prompt)}-character prompt."}],
+                    "stop_reason": "end_turn",
+                    "usage": {"input_tokens": len(prompt) // 4, "output_tokens": 12},
+                })
+            finally:
+                with state.lock:
+                    state.concurrent -= 1
+
+    return BedrockStubHandler
+
+def start_stub_server(host="127.0.0.1", port=0, latency=0.2, jitter=0.05, throttle_rate=0.0):
+    """Start the stub on a background thread; returns (server, state, endpoint_url)"""
+    state = StubState(latency, jitter, throttle_rate)
+    server = ThreadingHTTPServer((host, port), make_handler(state))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, state, f"http://{host}:{server.server_address[1]}"
+
+def main():
+    parser = argparse.ArgumentParser(description="Local Bedrock InvokeModel stub")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", type=float, default=0.2, help="Mean response latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.05, help="Latency standard deviation in seconds")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Fraction of requests answered with ThrottlingException")
+    args = parser.parse_args()
+
+    server, state, endpoint_url = start_stub_server(args.host, args.port, args.latency, args.jitter, args.throttle_rate)
+    print(f"Bedrock stub listening on {endpoint_url} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(5)
+            print(f"  requests={state.requests} throttled={state.throttled} max_concurrent={state.max_concurrent}")
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
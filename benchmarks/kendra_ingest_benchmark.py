@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Kendra Ingest Benchmark
+Sends memory documents to a fake Kendra client one BatchPutDocument call per document,
+then through the batching ingest queue, and reports throughput, batch sizes and flush latency
+"""
+
+import sys
+import os
+import time
+import random
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+REPO_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, REPO_ROOT)
+
+# The backend settings require these; the fake client ignores them
+for name in ("AWS_ACCESS_KEY_ID", "AWS_SECRET_ACCESS_KEY", "AWS_REGION_NAME", "ELEVENLABS_API_KEY",
+             "BEDROCK_MODEL_ID", "BEDROCK_SYNTHESIS_MODEL_ID", "KENDRA_INDEX_ID", "NEPTUNE_ENDPOINT",
+             "S3_BUCKET_NAME", "DYNAMODB_SPEAKERS_TABLE_NAME", "HUGGING_FACE_TOKEN",
+             "DYNAMODB_ANALYTICS_TABLE_NAME", "DYNAMODB_ALERTS_TABLE_NAME", "DYNAMODB_TASKS_TABLE_NAME"):
+    os.environ.setdefault(name, "stub")
+
+from backend.services.kendra_ingest import KendraIngestQueue
+
+class FakeKendraClient:
+    """BatchPutDocument with a fixed round trip plus a per-document cost, failing some documents"""
+
+    def __init__(self, round_trip=0.15, per_document=0.005, failure_rate=0.0, seed=42):
+        self.round_trip = round_trip
+        self.per_document = per_document
+        self.failure_rate = failure_rate
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.documents = 0
+
+    def batch_put_document(self, IndexId, Documents):
+        time.sleep(self.round_trip + self.per_document * len(Documents))
+        with self.lock:
+            self.calls += 1
+            self.documents += len(Documents)
+            failed = [{"Id": document["Id"], "ErrorCode": "InternalError", "ErrorMessage": "Transient failure"}
+                      for document in Documents if self.rng.random() < self.failure_rate]
+        return {"FailedDocuments": failed}
+
+def make_documents(count):
+    return [{
+        "Id": f"memory-{i}",
+        "Title": f"Memory {i}",
+        "Blob": f"Summary: memory {i}\n\nTranscript:\nWe talked about the visit on day {i}.".encode("utf-8"),
+        "ContentType": "PLAIN_TEXT",
+    } for i in range(count)]
+
+def run_direct(client, documents, writers):
+    """One call per document from a pool of writers, as add_document used to do"""
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=writers) as pool:
+        list(pool.map(lambda document: client.batch_put_document(IndexId="stub", Documents=[document]),
+                      documents))
+    return time.perf_counter() - start
+
+def run_queue(queue, documents, arrival_gap):
+    start = time.perf_counter()
+    futures = []
+    for document in documents:
+        futures.append(queue.put(document))
+        if arrival_gap:
+            time.sleep(arrival_gap)
+    wait(futures)
+    failed = sum(1 for future in futures if future.exception() is not None)
+    return time.perf_counter() - start, failed
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark batched Kendra ingestion against a fake client")
+    parser.add_argument("--documents", type=int, default=200)
+    parser.add_argument("--round-trip", type=float, default=0.15, help="Fake BatchPutDocument latency in seconds")
+    parser.add_argument("--failure-rate", type=float, default=0.05, help="Fraction of documents failed with InternalError")
+    parser.add_argument("--arrival-gap", type=float, default=0.002, help="Seconds between queued documents")
+    parser.add_argument("--flush-interval", type=float, default=0.5)
+    parser.add_argument("--writers", type=int, default=1, help="Concurrent callers for the direct run")
+    args = parser.parse_args()
+
+    documents = make_documents(args.documents)
+    print(f"{args.documents} documents, {args.round_trip * 1000:.0f}ms round trip, "
+          f"{args.failure_rate:.0%} transient failures")
+
+    direct_client = FakeKendraClient(args.round_trip)
+    seconds = run_direct(direct_client, documents, args.writers)
+    print(f"\nOne call per document: {seconds:7.2f}s  {len(documents) / seconds:7.1f} docs/s  "
+          f"({direct_client.calls} calls)")
+
+    client = FakeKendraClient(args.round_trip, failure_rate=args.failure_rate)
+    queue = KendraIngestQueue(client=client, index_id="stub", flush_interval=args.flush_interval, retry_delay=0.05)
+    seconds, failed = run_queue(queue, documents, args.arrival_gap)
+    queue.shutdown()
+    stats = queue.get_statistics()
+    latency = stats["flush_latency_ms"]
+    print(f"Ingest queue:          {seconds:7.2f}s  {len(documents) / seconds:7.1f} docs/s  "
+          f"({client.calls} calls, {failed} failed)")
+    print(f"  batch sizes {stats['batch_sizes']} (mean {stats['mean_batch_size']:.1f}), retried {stats['retried']}")
+    print(f"  flush latency mean {latency['mean']:.0f}ms  p50 {latency['p50']:.0f}ms  "
+          f"p95 {latency['p95']:.0f}ms  max {latency['max']:.0f}ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Model Mode Comparison
+Compares per-category forests with a single multi-output forest: accuracy, fit time, size and load time
+
+Accuracy is the MAE that train_models reports on its time-ordered holdout (the latest days),
+so neither mode is scored on days that sit between its training days.
+"""
+
+import sys
+import os
+import json
+import time
+import shutil
+import argparse
+import tempfile
+from datetime import datetime
+
+REPO_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, REPO_ROOT)
+
+from ml_models.medicine_restocking_predictor import MedicineRestockingPredictor, MODEL_MODES, HOLDOUT_FRACTION
+
+def _directory_size(path):
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+def _make_predictor(model_mode, work_dir):
+    predictor = MedicineRestockingPredictor(model_mode=model_mode)
+    predictor.model_path = os.path.join(work_dir, model_mode, 'trained_models/')
+    predictor.scaler_path = os.path.join(work_dir, model_mode, 'scalers/')
+    # Training also exports compact models; keep them out of the production ml_models/compact/
+    predictor.compact_path = os.path.join(work_dir, model_mode, 'compact/')
+    os.makedirs(predictor.model_path, exist_ok=True)
+    os.makedirs(predictor.scaler_path, exist_ok=True)
+    return predictor
+
+def evaluate_mode(model_mode, work_dir, include_horizon):
+    """Train, save and reload one model mode, returning its metrics"""
+    predictor = _make_predictor(model_mode, work_dir)
+    predictor.load_and_preprocess_data()
+
+    start = time.perf_counter()
+    metrics = predictor.train_models(include_horizon=include_horizon)
+    fit_seconds = time.perf_counter() - start
+
+    size_bytes = _directory_size(predictor.model_path) + _directory_size(predictor.scaler_path)
+    file_count = len(os.listdir(predictor.model_path)) + len(os.listdir(predictor.scaler_path))
+
+    # Load the pickled forests of this mode, not the compact export written during training
+    reloaded = _make_predictor(model_mode, work_dir)
+    reloaded.load_and_preprocess_data()
+    start = time.perf_counter()
+    reloaded.load_models(include_horizon=include_horizon, prefer_compact=False)
+    load_seconds = time.perf_counter() - start
+
+    compact = _make_predictor(model_mode, work_dir)
+    start = time.perf_counter()
+    compact.load_models(include_horizon=include_horizon)
+    compact_load_seconds = time.perf_counter() - start
+
+    data = reloaded.load_and_preprocess_data()
+    start = time.perf_counter()
+    reloaded._predict_latest_demand(data)
+    predict_seconds = time.perf_counter() - start
+
+    return {
+        'model_mode': model_mode,
+        'fit_seconds': fit_seconds,
+        'load_seconds': load_seconds,
+        'compact_load_seconds': compact_load_seconds,
+        'predict_seconds': predict_seconds,
+        'size_bytes': size_bytes,
+        'file_count': file_count,
+        'mean_mae': sum(m['mae'] for m in metrics.values()) / len(metrics),
+        'categories': metrics,
+    }
+
+def print_report(results):
+    """Print a side-by-side comparison of the evaluated modes"""
+    print("\n=== MODEL MODE COMPARISON ===\n")
+    print(f"{'Mode':<14}{'Fit (s)':>10}{'Load (s)':>10}{'Compact (s)':>13}{'Predict (ms)':>14}{'Size (MB)':>11}{'Files':>7}{'Mean MAE':>10}")
+    for result in results:
+        print(f"{result['model_mode']:<14}{result['fit_seconds']:>10.2f}{result['load_seconds']:>10.3f}"
+              f"{result['compact_load_seconds']:>13.3f}"
+              f"{result['predict_seconds'] * 1000:>14.1f}{result['size_bytes'] / 1e6:>11.2f}"
+              f"{result['file_count']:>7}{result['mean_mae']:>10.3f}")
+
+    print(f"\nMAE on the latest {HOLDOUT_FRACTION:.0%} of days, after training on the earlier ones")
+    print(f"\n{'Category':<10}" + "".join(f"{r['model_mode'] + ' MAE':>22}" for r in results))
+    for category in results[0]['categories']:
+        print(f"{category:<10}" + "".join(f"{r['categories'][category]['mae']:>22.3f}" for r in results))
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare per-category and multi-output restocking models")
+    parser.add_argument("--include-horizon", action="store_true", help="Also train the 1-90 day horizon models")
+    parser.add_argument("--output", default="ml_models/model_mode_comparison.json", help="Where to write the JSON report")
+    args = parser.parse_args()
+
+    # Predictor paths are relative to the repository root
+    os.chdir(REPO_ROOT)
+    work_dir = tempfile.mkdtemp(prefix="model_modes_")
+    try:
+        results = [evaluate_mode(model_mode, work_dir, args.include_horizon) for model_mode in MODEL_MODES]
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print_report(results)
+    with open(args.output, 'w') as f:
+        json.dump({
+            'timestamp': datetime.now().isoformat(),
+            'include_horizon': args.include_horizon,
+            'holdout_fraction': HOLDOUT_FRACTION,
+            'results': results,
+        }, f, indent=2)
+    print(f"\nReport saved to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,375 @@
+#!/usr/bin/env python3
+"""
+Restocking Backtest
+Replays sales history day by day, places restocking orders from each model variant's forecasts and
+simulates stockouts and holding costs, recording accuracy, wall time and memory per variant
+"""
+
+import sys
+import os
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+REPO_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, REPO_ROOT)
+
+from ml_models.medicine_restocking_predictor import MedicineRestockingPredictor
+
+# model_mode None means no trained model; quantile None means the point forecast
+VARIANTS = {
+    'moving_average': {'model_mode': None, 'quantile': None},
+    'per_category': {'model_mode': 'per_category', 'quantile': None},
+    'per_category_p90': {'model_mode': 'per_category', 'quantile': 0.9},
+    'multi_output': {'model_mode': 'multi_output', 'quantile': None},
+}
+
+# Metrics compared against a baseline results file; all of them are better when lower
+TRACKED_METRICS = ('total_cost', 'cover_mae', 'replay_seconds')
+
+def _git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=REPO_ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+class BacktestData:
+    """Raw sales CSV plus its engineered feature frame, and truncated copies for training"""
+
+    def __init__(self, source_path, work_dir):
+        self.source_path = source_path
+        self.work_dir = work_dir
+        self.raw = pd.read_csv(source_path)
+        self.raw_dates = pd.to_datetime(self.raw['datum'])
+
+        full_dir = self._write_base_dir('full', self.raw)
+        predictor = MedicineRestockingPredictor(base_dir=full_dir)
+        self.frame = predictor.load_and_preprocess_data()
+        self.categories = predictor.medicine_categories
+        self.demand = self.frame[self.categories].to_numpy(dtype=np.float64)
+
+    def _write_base_dir(self, name, rows):
+        base_dir = os.path.join(self.work_dir, name)
+        os.makedirs(os.path.join(base_dir, 'archive'), exist_ok=True)
+        rows.to_csv(os.path.join(base_dir, 'archive', 'salesdaily.csv'), index=False)
+        return base_dir
+
+    def training_dir(self, cutoff_date):
+        """Predictor base directory holding only the sales up to and including cutoff_date"""
+        name = f"train_{pd.Timestamp(cutoff_date):%Y%m%d}"
+        if not os.path.exists(os.path.join(self.work_dir, name)):
+            self._write_base_dir(name, self.raw[self.raw_dates <= cutoff_date])
+        return os.path.join(self.work_dir, name)
+
+class ModelCache:
+    """Trained predictors per (model_mode, cutoff), so variants sharing a model train it once"""
+
+    def __init__(self, data):
+        self.data = data
+        self._predictors = {}
+        self.fit_seconds = {}
+
+    def get(self, model_mode, cutoff_date):
+        key = (model_mode, pd.Timestamp(cutoff_date))
+        if key not in self._predictors:
+            predictor_dir = self.data.training_dir(cutoff_date)
+            predictor = MedicineRestockingPredictor(model_mode=model_mode, base_dir=predictor_dir)
+            start = time.perf_counter()
+            predictor.train_models(include_horizon=True)
+            self.fit_seconds[key] = time.perf_counter() - start
+            # Forecast with the compact export, as the API does after a restart
+            predictor = MedicineRestockingPredictor(model_mode=model_mode, base_dir=predictor_dir)
+            predictor.load_models()
+            self._predictors[key] = predictor
+        return self._predictors[key]
+
+    def mode_fit_seconds(self, model_mode):
+        """Total training time so far for one model mode"""
+        return sum(seconds for (mode, _), seconds in self.fit_seconds.items() if mode == model_mode)
+
+def forecast_cover_demand(variant, predictor, data, origin, cover_days):
+    """Forecast demand per category for the cover_days after origin, using history up to origin
+
+    Returns:
+        (cover_total, next_day): the variant's cover-window order-up-to demand
+        and its point forecast for the day after origin.
+    """
+    if variant['model_mode'] is None:
+        # The repo's restocking rule: recent 30-day average demand rate
+        rate = data.demand[max(0, origin - 29):origin + 1].mean(axis=0)
+        return rate * cover_days, rate
+
+    history = data.frame.iloc[:origin + 1]
+    if variant['quantile'] is None:
+        curves = predictor.forecast_demand_curves(cover_days, history)
+        curves = np.column_stack([curves[category] for category in data.categories])
+        return curves.sum(axis=0), curves[0]
+
+    tree_curves = predictor.forecast_tree_curves(cover_days, history)
+    tree_curves = np.stack([tree_curves[category] for category in data.categories], axis=-1)
+    return np.quantile(tree_curves.sum(axis=0), variant['quantile'], axis=0), tree_curves[0].mean(axis=0)
+
+def replay(variant, data, models, start, end, lead_time, review_period, holding_cost, stockout_cost,
+           retrain_every):
+    """Simulate an order-up-to policy over days start..end-1 of the feature frame
+
+    Each evening the inventory position (on hand plus on order) is raised to
+    the forecast demand over the next lead_time + review_period days; orders
+    arrive lead_time days later, before that day's sales. Unmet demand is lost.
+    """
+    n_categories = len(data.categories)
+    cover_days = lead_time + review_period
+    dates = data.frame['datum']
+
+    def decide(origin):
+        predictor = None
+        if variant['model_mode'] is not None:
+            offset = origin - (start - 1)
+            cutoff = origin - offset % retrain_every if retrain_every else start - 1
+            predictor = models.get(variant['model_mode'], dates.iloc[cutoff])
+        decision_start = time.perf_counter()
+        forecast, next_day = forecast_cover_demand(variant, predictor, data, origin, cover_days)
+        return forecast, next_day, time.perf_counter() - decision_start
+
+    forecast, _, decision_seconds = decide(start - 1)
+    on_hand = forecast.copy()
+    pipeline = np.zeros((lead_time, n_categories))
+
+    lost = np.zeros(n_categories)
+    sold = np.zeros(n_categories)
+    held = np.zeros(n_categories)
+    stockout_days = np.zeros(n_categories)
+    orders = 0
+    cover_errors, cover_actuals, cover_hits, next_day_errors = [], [], [], []
+
+    for day in range(start, end):
+        # Morning: receive today's deliveries, then serve the day's demand
+        on_hand += pipeline[0]
+        pipeline = np.roll(pipeline, -1, axis=0)
+        pipeline[-1] = 0
+
+        demand = data.demand[day]
+        served = np.minimum(on_hand, demand)
+        on_hand -= served
+        sold += served
+        lost += demand - served
+        stockout_days += demand > served
+        held += on_hand
+
+        # Evening: forecast the cover window and top the inventory position up to it
+        forecast, next_day, seconds = decide(day)
+        decision_seconds += seconds
+        order = np.maximum(forecast - (on_hand + pipeline.sum(axis=0)), 0.0)
+        pipeline[lead_time - 1] += order
+        orders += int((order > 0).sum())
+
+        # Accuracy is only scored where the actual demand lies inside the replayed period
+        if day + cover_days < end:
+            actual = data.demand[day + 1:day + 1 + cover_days].sum(axis=0)
+            cover_errors.append(forecast - actual)
+            cover_actuals.append(actual)
+            cover_hits.append(actual <= forecast)
+        if day + 1 < end:
+            next_day_errors.append(next_day - data.demand[day + 1])
+
+    cover_errors = np.array(cover_errors)
+    demand_total = data.demand[start:end].sum(axis=0)
+    return {
+        'decision_seconds': decision_seconds,
+        'orders': orders,
+        'lost': lost,
+        'sold': sold,
+        'held': held,
+        'stockout_days': stockout_days,
+        'demand': demand_total,
+        'cover_errors': cover_errors,
+        'cover_actual_total': float(np.sum(cover_actuals)),
+        'cover_hits': np.array(cover_hits),
+        'next_day_errors': np.array(next_day_errors),
+        'holding_cost': held * holding_cost,
+        'stockout_cost': lost * stockout_cost,
+    }
+
+def summarize(name, variant, outcome, data, fit_seconds, replay_seconds, days, fit_peak, replay_peak):
+    """Aggregate a replay outcome into the per-variant results row"""
+    errors = outcome['cover_errors']
+    categories = {}
+    for i, category in enumerate(data.categories):
+        categories[category] = {
+            'fill_rate': float(outcome['sold'][i] / outcome['demand'][i]) if outcome['demand'][i] else 1.0,
+            'lost_units': float(outcome['lost'][i]),
+            'stockout_days': int(outcome['stockout_days'][i]),
+            'mean_on_hand': float(outcome['held'][i] / days),
+            'cover_mae': float(np.abs(errors[:, i]).mean()) if len(errors) else None,
+            'total_cost': float(outcome['holding_cost'][i] + outcome['stockout_cost'][i]),
+        }
+
+    next_day_errors = outcome['next_day_errors']
+    total_demand = outcome['demand'].sum()
+    return {
+        'variant': name,
+        'model_mode': variant['model_mode'],
+        'quantile': variant['quantile'],
+        'fit_seconds': fit_seconds,
+        'replay_seconds': replay_seconds,
+        'decision_ms_per_day': outcome['decision_seconds'] / days * 1000,
+        'fit_peak_mb': fit_peak / 1e6,
+        'replay_peak_mb': replay_peak / 1e6,
+        'total_cost': float(outcome['holding_cost'].sum() + outcome['stockout_cost'].sum()),
+        'holding_cost': float(outcome['holding_cost'].sum()),
+        'stockout_cost': float(outcome['stockout_cost'].sum()),
+        'fill_rate': float(outcome['sold'].sum() / total_demand) if total_demand else 1.0,
+        'lost_units': float(outcome['lost'].sum()),
+        'stockout_days': int(outcome['stockout_days'].sum()),
+        'orders': outcome['orders'],
+        'cover_mae': float(np.abs(errors).mean()) if len(errors) else None,
+        'cover_bias': float(errors.mean()) if len(errors) else None,
+        'cover_wape': float(np.abs(errors).sum() / outcome['cover_actual_total']) if len(errors) else None,
+        'cover_hit_rate': float(outcome['cover_hits'].mean()) if len(errors) else None,
+        'next_day_mae': float(np.abs(next_day_errors).mean()) if len(next_day_errors) else None,
+        'categories': categories,
+    }
+
+def run_backtest(variants, source_path, days=180, lead_time=2, review_period=1, holding_cost=0.05,
+                 stockout_cost=1.0, retrain_every=0):
+    """Backtest each variant over the last days of the sales history
+
+    Returns:
+        (config, results) with one results row per variant.
+    """
+    work_dir = tempfile.mkdtemp(prefix="restocking_backtest_")
+    try:
+        data = BacktestData(source_path, work_dir)
+        end = len(data.frame)
+        start = end - days
+        if start < 365:
+            raise ValueError(f"{end} feature rows leave fewer than 365 training days before a {days}-day backtest")
+
+        models = ModelCache(data)
+        results = []
+        for name in variants:
+            variant = VARIANTS[name]
+            print(f"\n--- {name} ---")
+
+            # Initial training happens up front; variants sharing a model mode reuse it
+            tracemalloc.start()
+            if variant['model_mode'] is not None:
+                models.get(variant['model_mode'], data.frame['datum'].iloc[start - 1])
+            _, fit_peak = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+
+            fit_before = models.mode_fit_seconds(variant['model_mode'])
+            replay_start = time.perf_counter()
+            outcome = replay(variant, data, models, start, end, lead_time, review_period,
+                             holding_cost, stockout_cost, retrain_every)
+            fit_seconds = models.mode_fit_seconds(variant['model_mode'])
+            # Retraining during the replay counts as fit time
+            replay_seconds = time.perf_counter() - replay_start - (fit_seconds - fit_before)
+            _, replay_peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            results.append(summarize(name, variant, outcome, data, fit_seconds, replay_seconds, days,
+                                     fit_peak, replay_peak))
+
+        config = {
+            'source': os.path.relpath(source_path, REPO_ROOT),
+            'start_date': data.frame['datum'].iloc[start].date().isoformat(),
+            'end_date': data.frame['datum'].iloc[end - 1].date().isoformat(),
+            'days': days,
+            'lead_time': lead_time,
+            'review_period': review_period,
+            'holding_cost': holding_cost,
+            'stockout_cost': stockout_cost,
+            'retrain_every': retrain_every,
+            'categories': data.categories,
+        }
+        return config, results
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+def compare_to_baseline(config, results, baseline_path, max_regression):
+    """Print tracked metric changes against a previous results file; returns the regressed (variant, metric) pairs"""
+    with open(baseline_path) as f:
+        previous_run = json.load(f)
+    baseline = {row['variant']: row for row in previous_run['results']}
+
+    regressions = []
+    print(f"\n=== CHANGES VS {baseline_path} ===\n")
+    differing = [key for key in config if previous_run['config'].get(key) != config[key]]
+    if differing:
+        print(f"Warning: baseline was run with different settings ({', '.join(differing)})\n")
+    for row in results:
+        previous = baseline.get(row['variant'])
+        if previous is None:
+            continue
+        changes = []
+        for metric in TRACKED_METRICS:
+            if row.get(metric) is None or not previous.get(metric):
+                continue
+            change = row[metric] / previous[metric] - 1
+            changes.append(f"{metric} {change:+.1%}")
+            if max_regression is not None and change > max_regression:
+                regressions.append((row['variant'], metric))
+        print(f"{row['variant']:<18}" + ", ".join(changes))
+    return regressions
+
+def print_report(results):
+    print("\n=== RESTOCKING BACKTEST ===\n")
+    print(f"{'Variant':<18}{'Cost':>10}{'Fill':>8}{'Lost':>9}{'Cover MAE':>11}{'Hit rate':>10}"
+          f"{'Fit (s)':>9}{'Replay (s)':>12}{'ms/day':>8}{'Peak MB':>9}")
+    for row in results:
+        cover_mae = f"{row['cover_mae']:.2f}" if row['cover_mae'] is not None else "-"
+        hit_rate = f"{row['cover_hit_rate']:.1%}" if row['cover_hit_rate'] is not None else "-"
+        print(f"{row['variant']:<18}{row['total_cost']:>10.1f}{row['fill_rate']:>8.1%}{row['lost_units']:>9.1f}"
+              f"{cover_mae:>11}{hit_rate:>10}{row['fit_seconds']:>9.1f}{row['replay_seconds']:>12.2f}"
+              f"{row['decision_ms_per_day']:>8.1f}{max(row['fit_peak_mb'], row['replay_peak_mb']):>9.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Day-by-day restocking backtest of the forecast model variants")
+    parser.add_argument("--data", default=os.path.join(REPO_ROOT, 'archive', 'salesdaily.csv'),
+                        help="Daily sales CSV in the salesdaily.csv format")
+    parser.add_argument("--variants", nargs="+", choices=list(VARIANTS), default=list(VARIANTS))
+    parser.add_argument("--days", type=int, default=180, help="Days of history to replay")
+    parser.add_argument("--lead-time", type=int, default=2, help="Days between placing and receiving an order")
+    parser.add_argument("--review-period", type=int, default=1, help="Days between orders")
+    parser.add_argument("--holding-cost", type=float, default=0.05, help="Cost per unit held overnight")
+    parser.add_argument("--stockout-cost", type=float, default=1.0, help="Cost per unit of lost demand")
+    parser.add_argument("--retrain-every", type=int, default=0, help="Retrain models every N days (0: train once)")
+    parser.add_argument("--output", default="ml_models/backtest_results.json", help="Where to write the results")
+    parser.add_argument("--baseline", help="Previous results file to compare against")
+    parser.add_argument("--max-regression", type=float, default=None,
+                        help="Exit with status 1 if a tracked metric is worse than the baseline by more than this fraction")
+    args = parser.parse_args()
+
+    if args.lead_time < 1 or args.review_period < 1:
+        parser.error("--lead-time and --review-period must be at least 1")
+
+    config, results = run_backtest(args.variants, os.path.abspath(args.data), args.days, args.lead_time,
+                                   args.review_period, args.holding_cost, args.stockout_cost, args.retrain_every)
+    print_report(results)
+
+    regressions = compare_to_baseline(config, results, args.baseline, args.max_regression) if args.baseline else []
+
+    with open(args.output, 'w') as f:
+        json.dump({
+            'timestamp': datetime.now().isoformat(),
+            'git_commit': _git_commit(),
+            'config': config,
+            'results': results,
+        }, f, indent=2)
+    print(f"\nResults saved to {args.output}")
+
+    if regressions:
+        print("Regressions: " + ", ".join(f"{variant} {metric}" for variant, metric in regressions))
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+RFID Read Ingestion Benchmark
+Feeds synthetic portal-reader traffic through the read ingestor and measures raw reads/sec
+"""
+
+import sys
+import os
+import time
+import random
+import argparse
+from datetime import datetime
+from typing import Iterator, List, Tuple
+
+# Add the backend directory to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+
+from services.rfid_registry import RFIDRegistry, RFIDTag
+from services.rfid_ingest import RFIDReadIngestor
+
+TARGET_READS_PER_SEC = 100_000
+
+def synthetic_reader(tag_ids: List[str], total_reads: int, reads_per_second: float = 2_000.0,
+                     tags_in_field: int = 50, reads_per_pass: int = 60, unknown_rate: float = 0.001,
+                     batch_size: int = 10_000, seed: int = 42) -> Iterator[Tuple[List[str], List[float]]]:
+    """Simulate a portal reader: a rotating set of tags in the field, each read many times
+
+    Every read picks a random tag currently in the field; a tag leaves the field
+    after reads_per_pass reads and the next tag from the pool walks in. A small
+    fraction of reads are of unregistered tags.
+
+    Yields:
+        (tag_ids, epoch timestamps) batches of batch_size reads.
+    """
+    rng = random.Random(seed)
+    start = time.time()
+    field = [tag_ids[i % len(tag_ids)] for i in range(tags_in_field)]
+    remaining = [reads_per_pass] * tags_in_field
+    next_tag = tags_in_field
+
+    batch_tags: List[str] = []
+    batch_times: List[float] = []
+    for i in range(total_reads):
+        if rng.random() < unknown_rate:
+            batch_tags.append(f"UNKNOWN_{rng.randrange(1_000_000)}")
+        else:
+            slot = rng.randrange(tags_in_field)
+            batch_tags.append(field[slot])
+            remaining[slot] -= 1
+            if remaining[slot] == 0:
+                field[slot] = tag_ids[next_tag % len(tag_ids)]
+                remaining[slot] = reads_per_pass
+                next_tag += 1
+        batch_times.append(start + i / reads_per_second)
+
+        if len(batch_tags) == batch_size:
+            yield batch_tags, batch_times
+            batch_tags, batch_times = [], []
+
+    if batch_tags:
+        yield batch_tags, batch_times
+
+def run_benchmark(num_tags: int, total_reads: int, dedup_window: float, exit_timeout: float):
+    """Run the ingestion benchmark and print throughput"""
+    registry = RFIDRegistry()
+    created_at = datetime.now().isoformat()
+    tag_ids = [f"RFID_{i:07d}" for i in range(num_tags)]
+    for tag_id in tag_ids:
+        registry.add_tag(RFIDTag(tag_id=tag_id, created_at=created_at))
+
+    ingestor = RFIDReadIngestor(registry, dedup_window=dedup_window, exit_timeout=exit_timeout)
+
+    print(f"Generating {total_reads:,} synthetic reads over {num_tags:,} tags...")
+    batches = list(synthetic_reader(tag_ids, total_reads))
+
+    start = time.perf_counter()
+    for batch_tags, batch_times in batches:
+        ingestor.ingest(batch_tags, batch_times)
+        ingestor.sweep(now=batch_times[-1])
+        ingestor.flush()
+    elapsed = time.perf_counter() - start
+
+    reads_per_sec = total_reads / elapsed
+    stats = ingestor.get_statistics()
+    print(f"\nIngested {total_reads:,} reads in {elapsed:.3f}s -> {reads_per_sec:,.0f} reads/sec")
+    print(f"  Accepted:   {stats['accepted_reads']:,}")
+    print(f"  Duplicates: {stats['duplicate_reads']:,}")
+    print(f"  Unknown:    {stats['unknown_tag_reads']:,}")
+    print(f"  Enter/exit: {stats['enter_events']:,} / {stats['exit_events']:,}")
+    print(f"  Present:    {stats['present_tags']:,}")
+
+    status = "PASS" if reads_per_sec >= TARGET_READS_PER_SEC else "FAIL"
+    print(f"\n{status}: target {TARGET_READS_PER_SEC:,} reads/sec")
+    return reads_per_sec
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark RFID raw read ingestion")
+    parser.add_argument("--tags", type=int, default=100_000, help="Number of registered tags")
+    parser.add_argument("--reads", type=int, default=1_000_000, help="Number of raw reads to ingest")
+    parser.add_argument("--dedup-window", type=float, default=1.0, help="Deduplication window in seconds")
+    parser.add_argument("--exit-timeout", type=float, default=5.0, help="Seconds without reads before a tag exits")
+    args = parser.parse_args()
+
+    run_benchmark(args.tags, args.reads, args.dedup_window, args.exit_timeout)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+RFID Reconciliation Benchmark
+Times a full cycle count and batched exit-driven stock decrements at hospital scale
+"""
+
+import sys
+import os
+import time
+import random
+import argparse
+from datetime import datetime
+
+# Add the backend directory to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+
+from services.alerts_service import AlertsService, MedicalSupply
+from services.rfid_registry import RFIDRegistry, RFIDTag
+from services.rfid_ingest import RFIDPresenceEvent, RFIDPresenceEventType
+from services.rfid_reconciliation import RFIDReconciliationEngine
+
+TARGET_CYCLE_COUNT_SECONDS = 5.0
+
+def build_inventory(num_tags: int, num_items: int):
+    """Create a registry of num_tags tagged units spread over num_items supplies with matching stock"""
+    registry = RFIDRegistry()
+    alerts = AlertsService()
+    alerts.scheduler.shutdown()
+    alerts.medical_supplies = []
+    created_at = datetime.now().isoformat()
+
+    stock = [0] * num_items
+    for i in range(num_tags):
+        tag_id = f"RFID_{i:07d}"
+        registry.add_tag(RFIDTag(tag_id=tag_id, created_at=created_at))
+        registry.assign(tag_id, f"ms_{i % num_items:05d}", "supply", "benchmark")
+        stock[i % num_items] += 1
+
+    for i in range(num_items):
+        alerts.add_medical_supply(MedicalSupply(
+            id=f"ms_{i:05d}",
+            name=f"Supply {i}",
+            current_stock=stock[i],
+            threshold_quantity=10,
+            expiry_date=None,
+            supplier_id="sup_001",
+            supplier_name="Benchmark Supplier"
+        ))
+
+    return registry, alerts
+
+def run_benchmark(num_tags: int, num_items: int, missing_rate: float, num_exits: int, seed: int = 42):
+    """Run the cycle count and exit decrement benchmarks and print timings"""
+    rng = random.Random(seed)
+
+    print(f"Building {num_tags:,} tagged units across {num_items:,} supplies...")
+    start = time.perf_counter()
+    registry, alerts = build_inventory(num_tags, num_items)
+    print(f"  Built in {time.perf_counter() - start:.2f}s")
+    engine = RFIDReconciliationEngine(registry, alerts)
+
+    tag_ids = list(registry.tags)
+    seen = [tag_id for tag_id in tag_ids if rng.random() >= missing_rate]
+    seen.extend(f"UNKNOWN_{i}" for i in range(1000))
+
+    start = time.perf_counter()
+    report = engine.cycle_count(seen)
+    count_elapsed = time.perf_counter() - start
+
+    exits = [RFIDPresenceEvent(tag_id=tag_id, event_type=RFIDPresenceEventType.EXIT, timestamp=time.time())
+             for tag_id in rng.sample(seen[:-1000], num_exits)]
+    start = time.perf_counter()
+    for i in range(0, len(exits), 1000):
+        engine.handle_events(exits[i:i + 1000])
+    exit_elapsed = time.perf_counter() - start
+
+    print(f"\nCycle count:    {report.tags_seen:,} tags seen in {count_elapsed:.3f}s")
+    print(f"  Missing:      {len(report.missing_tag_ids):,}")
+    print(f"  Unknown:      {len(report.unknown_tag_ids):,}")
+    print(f"  Discrepancies: {len(report.discrepancies):,} items")
+    print(f"Exit events:    {num_exits:,} in {exit_elapsed:.3f}s -> {num_exits / exit_elapsed:,.0f} events/sec")
+
+    status = "PASS" if count_elapsed <= TARGET_CYCLE_COUNT_SECONDS else "FAIL"
+    print(f"\n{status}: target full cycle count under {TARGET_CYCLE_COUNT_SECONDS:.0f}s")
+    return count_elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark RFID cycle counts and stock reconciliation")
+    parser.add_argument("--tags", type=int, default=500_000, help="Number of tagged units")
+    parser.add_argument("--items", type=int, default=5_000, help="Number of distinct supplies")
+    parser.add_argument("--missing-rate", type=float, default=0.01, help="Fraction of tags not seen by the count")
+    parser.add_argument("--exits", type=int, default=100_000, help="Number of exit events to apply")
+    args = parser.parse_args()
+
+    run_benchmark(args.tags, args.items, args.missing_rate, args.exits)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+RFID Scan Path Benchmark
+Measures in-process scan and lookup throughput of the RFID registry at hospital scale
+"""
+
+import sys
+import os
+import time
+import random
+import argparse
+from datetime import datetime
+
+# Add the backend directory to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+
+from services.rfid_registry import RFIDRegistry, RFIDTag
+
+TARGET_SCANS_PER_SEC = 50_000
+
+def build_registry(num_tags: int, num_items: int) -> RFIDRegistry:
+    """Create a registry with num_tags tags, all assigned across num_items items"""
+    registry = RFIDRegistry()
+    created_at = datetime.now().isoformat()
+
+    for i in range(num_tags):
+        tag_id = f"RFID_{i:07d}"
+        registry.add_tag(RFIDTag(tag_id=tag_id, created_at=created_at))
+        registry.assign(tag_id, f"ms_{i % num_items:05d}", "medicine", "benchmark")
+
+    return registry
+
+def run_benchmark(num_tags: int, num_items: int, num_scans: int, seed: int = 42):
+    """Run the scan and lookup benchmarks and print throughput"""
+    rng = random.Random(seed)
+
+    print(f"Building registry with {num_tags:,} tags across {num_items:,} items...")
+    start = time.perf_counter()
+    registry = build_registry(num_tags, num_items)
+    print(f"  Built in {time.perf_counter() - start:.2f}s")
+
+    tag_ids = [f"RFID_{rng.randrange(num_tags):07d}" for _ in range(num_scans)]
+    item_ids = [f"ms_{rng.randrange(num_items):05d}" for _ in range(num_scans // 10)]
+
+    # Scan path: tag lookup, last_seen update and assignment lookup
+    start = time.perf_counter()
+    for tag_id in tag_ids:
+        registry.scan(tag_id)
+    scan_elapsed = time.perf_counter() - start
+    scans_per_sec = num_scans / scan_elapsed
+
+    # Reverse item lookups
+    start = time.perf_counter()
+    for item_id in item_ids:
+        registry.get_item_assignments(item_id)
+    lookup_elapsed = time.perf_counter() - start
+
+    # Deleting tags must also clean up their assignments
+    start = time.perf_counter()
+    for tag_id in tag_ids[:1000]:
+        registry.delete_tag(tag_id)
+    delete_elapsed = time.perf_counter() - start
+
+    print(f"\nScans:          {num_scans:,} in {scan_elapsed:.3f}s -> {scans_per_sec:,.0f} scans/sec")
+    print(f"Item lookups:   {len(item_ids):,} in {lookup_elapsed:.3f}s -> {len(item_ids) / lookup_elapsed:,.0f} lookups/sec")
+    print(f"Tag deletions:  1,000 in {delete_elapsed * 1000:.1f}ms")
+
+    status = "PASS" if scans_per_sec >= TARGET_SCANS_PER_SEC else "FAIL"
+    print(f"\n{status}: target {TARGET_SCANS_PER_SEC:,} scans/sec")
+    return scans_per_sec
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the RFID registry scan path")
+    parser.add_argument("--tags", type=int, default=500_000, help="Number of registered tags")
+    parser.add_argument("--items", type=int, default=5_000, help="Number of distinct items")
+    parser.add_argument("--scans", type=int, default=500_000, help="Number of scans to time")
+    args = parser.parse_args()
+
+    run_benchmark(args.tags, args.items, args.scans)
+
+if __name__ == "__main__":
+    main()
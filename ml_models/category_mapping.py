@@ -0,0 +1,117 @@
+import hashlib
+import json
+import os
+import re
+
+# Medicine category descriptions used to match inventory items to ATC categories
+CATEGORY_DESCRIPTIONS = {
+    'M01AB': 'anti-inflammatory antirheumatic non-steroids',
+    'M01AE': 'anti-inflammatory antirheumatic acetic acid',
+    'N02BA': 'analgesics anilides paracetamol',
+    'N02BE': 'analgesics pyrazolones salicylic acid',
+    'N05B': 'anxiolytics benzodiazepine',
+    'N05C': 'hypnotics sedatives',
+    'R03': 'obstructive airway diseases',
+    'R06': 'antihistamines systemic'
+}
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:-[a-z0-9]+)*")
+
+def tokenize(text):
+    """Lower-cased word tokens; hyphenated words such as 'anti-inflammatory' stay whole"""
+    return set(_TOKEN_PATTERN.findall(text.lower())) if text else set()
+
+class CategoryTokenIndex:
+    """Inverted index from description tokens to categories, built once
+
+    An item's name scores one point per description token it contains and
+    the highest-scoring category wins (earlier categories win ties). A
+    category field that shares any token with a description overrides the
+    name match, taking the first such category.
+    """
+
+    def __init__(self, descriptions=None):
+        self.descriptions = descriptions or CATEGORY_DESCRIPTIONS
+        self.categories = list(self.descriptions)
+        self._token_categories = {}
+        for position, description in enumerate(self.descriptions.values()):
+            for token in tokenize(description):
+                self._token_categories.setdefault(token, []).append(position)
+        # Identifies the descriptions, so persisted mappings can be invalidated when they change
+        self.fingerprint = hashlib.sha256(json.dumps(self.descriptions, sort_keys=True).encode()).hexdigest()[:16]
+
+    def match(self, name, category=None):
+        """Best matching category for an item name and optional item category, or None"""
+        if category:
+            positions = [position for token in tokenize(category)
+                         for position in self._token_categories.get(token, ())]
+            if positions:
+                return self.categories[min(positions)]
+
+        scores = {}
+        for token in tokenize(name):
+            for position in self._token_categories.get(token, ()):
+                scores[position] = scores.get(position, 0) + 1
+        if not scores:
+            return None
+        best = max(scores.values())
+        return self.categories[min(position for position, score in scores.items() if score == best)]
+
+class SkuCategoryTable:
+    """Persisted SKU -> category mapping; only new or renamed SKUs go through the token index"""
+
+    def __init__(self, path, index=None):
+        self.path = path
+        self.index = index or CategoryTokenIndex()
+        self._entries = {}
+        self._dirty = False
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                stored = json.load(f)
+        except (OSError, ValueError):
+            return
+        # Mappings made from other descriptions are recomputed rather than trusted
+        if stored.get('fingerprint') == self.index.fingerprint:
+            self._entries = stored.get('entries', {})
+
+    def save(self):
+        """Write the table if any mapping changed since it was loaded"""
+        if not self._dirty:
+            return False
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_file = self.path + '.tmp'
+        with open(tmp_file, 'w') as f:
+            json.dump({'fingerprint': self.index.fingerprint, 'entries': self._entries}, f)
+        os.replace(tmp_file, self.path)
+        self._dirty = False
+        return True
+
+    def lookup(self, sku, name, category=None):
+        """Category for one SKU, recomputed only if the SKU is new or its name/category changed"""
+        entry = self._entries.get(sku)
+        if entry is not None and entry[0] == name and entry[1] == category:
+            return entry[2]
+
+        match = self.index.match(name, category)
+        self._entries[sku] = [name, category, match]
+        self._dirty = True
+        return match
+
+    def map_items(self, inventory_items):
+        """Map inventory items (with .name, .category and optionally .id) to categories by name"""
+        mapping = {}
+        entries = self._entries
+        for item in inventory_items:
+            name, category = item.name, item.category
+            sku = getattr(item, 'id', None) or name
+            entry = entries.get(sku)
+            # Known SKUs are resolved inline; lookup() handles new and renamed ones
+            if entry is not None and entry[0] == name and entry[1] == category:
+                mapping[name] = entry[2]
+            else:
+                mapping[name] = self.lookup(sku, name, category)
+        self.save()
+        return mapping
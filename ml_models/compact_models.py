@@ -0,0 +1,200 @@
+import numpy as np
+import json
+import os
+import zipfile
+from datetime import datetime
+
+MANIFEST_FILE = 'manifest.json'
+ARRAYS_FILE = 'models.npz'
+FORMAT_VERSION = 1
+
+class CompactScaler:
+    """StandardScaler reduced to its mean and scale vectors"""
+
+    def __init__(self, mean, scale):
+        self.mean_ = mean
+        self.scale_ = scale
+
+    @classmethod
+    def from_sklearn(cls, scaler):
+        return cls(np.asarray(scaler.mean_, dtype=np.float64), np.asarray(scaler.scale_, dtype=np.float64))
+
+    def transform(self, X):
+        # Same operation order as StandardScaler.transform, so results are bit-identical
+        X = np.array(X, dtype=np.float64)
+        X -= self.mean_
+        X /= self.scale_
+        return X
+
+class CompactForest:
+    """A fitted tree ensemble flattened into node arrays and evaluated with NumPy
+
+    All trees share one set of arrays; child indices are global and leaves
+    point to themselves, so every sample walks every tree in lockstep for
+    max_depth steps with pure array indexing.
+    """
+
+    def __init__(self, children_left, children_right, feature, threshold, value, roots, max_depth):
+        self.children_left = children_left
+        self.children_right = children_right
+        self.feature = feature
+        self.threshold = threshold
+        self.value = value          # (n_nodes, n_outputs)
+        self.roots = roots          # (n_trees,) global index of each tree's root
+        self.max_depth = int(max_depth)
+
+    @classmethod
+    def from_sklearn(cls, forest):
+        """Flatten a fitted RandomForestRegressor (single or multi-output)"""
+        lefts, rights, features, thresholds, values, roots = [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+        for estimator in forest.estimators_:
+            tree = estimator.tree_
+            nodes = np.arange(tree.node_count)
+            leaf = tree.children_left == -1
+            lefts.append(np.where(leaf, nodes, tree.children_left) + offset)
+            rights.append(np.where(leaf, nodes, tree.children_right) + offset)
+            features.append(np.where(leaf, 0, tree.feature))
+            thresholds.append(tree.threshold)
+            values.append(tree.value.reshape(tree.node_count, -1))
+            roots.append(offset)
+            offset += tree.node_count
+            max_depth = max(max_depth, tree.max_depth)
+
+        return cls(
+            np.concatenate(lefts).astype(np.int32),
+            np.concatenate(rights).astype(np.int32),
+            np.concatenate(features).astype(np.int32),
+            np.concatenate(thresholds).astype(np.float64),
+            np.concatenate(values).astype(np.float64),
+            np.asarray(roots, dtype=np.int32),
+            max_depth
+        )
+
+    @property
+    def n_outputs(self):
+        return self.value.shape[1]
+
+    def _leaves(self, X):
+        """Global leaf index reached in every tree: (n_rows, n_trees)"""
+        # Trees compare float32 features, like scikit-learn does
+        X = np.asarray(X, dtype=np.float32)
+        rows = np.arange(len(X))[:, None]
+        nodes = np.broadcast_to(self.roots, (len(X), len(self.roots)))
+
+        for _ in range(self.max_depth):
+            go_left = X[rows, self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(go_left, self.children_left[nodes], self.children_right[nodes])
+        return nodes
+
+    def predict(self, X):
+        """Average leaf values over all trees for each row of X"""
+        prediction = self.value[self._leaves(X)].mean(axis=1)
+        return prediction[:, 0] if self.n_outputs == 1 else prediction
+
+    def predict_per_tree(self, X):
+        """Leaf value of every tree for each row of X: (n_rows, n_trees, n_outputs)"""
+        return self.value[self._leaves(X)]
+
+def per_tree_predictions(forest, X):
+    """Every tree's prediction for each row of X as (n_rows, n_trees, n_outputs)
+
+    Works for CompactForest and fitted scikit-learn forests alike.
+    """
+    if isinstance(forest, CompactForest):
+        return forest.predict_per_tree(X)
+    X = np.asarray(X, dtype=np.float32)
+    per_tree = np.stack([estimator.predict(X) for estimator in forest.estimators_], axis=1)
+    return per_tree.reshape(len(X), len(forest.estimators_), -1)
+
+FOREST_ARRAYS = ('children_left', 'children_right', 'feature', 'threshold', 'value', 'roots')
+
+def save_compact_models(directory, forests, scalers, metadata):
+    """Write forests and scalers into one uncompressed .npz plus a JSON manifest
+
+    Args:
+        forests: Dict of name -> fitted forest (scikit-learn or CompactForest).
+        scalers: Dict of name -> fitted scaler (scikit-learn or CompactScaler).
+        metadata: Extra manifest fields, e.g. categories and feature columns.
+    """
+    os.makedirs(directory, exist_ok=True)
+    arrays = {}
+    forest_info = {}
+    for name, forest in forests.items():
+        compact = forest if isinstance(forest, CompactForest) else CompactForest.from_sklearn(forest)
+        for array_name in FOREST_ARRAYS:
+            arrays[f'{name}__{array_name}'] = getattr(compact, array_name)
+        forest_info[name] = {'max_depth': compact.max_depth, 'n_trees': len(compact.roots),
+                             'n_nodes': len(compact.threshold), 'n_outputs': compact.n_outputs}
+    for name, scaler in scalers.items():
+        compact = scaler if isinstance(scaler, CompactScaler) else CompactScaler.from_sklearn(scaler)
+        arrays[f'{name}__mean'] = compact.mean_
+        arrays[f'{name}__scale'] = compact.scale_
+
+    # Uncompressed so every member can be memory-mapped in place
+    tmp_file = os.path.join(directory, ARRAYS_FILE + '.tmp')
+    with open(tmp_file, 'wb') as f:
+        np.savez(f, **arrays)
+    os.replace(tmp_file, os.path.join(directory, ARRAYS_FILE))
+
+    manifest = {
+        'format_version': FORMAT_VERSION,
+        'created_at': datetime.now().isoformat(),
+        'forests': forest_info,
+        'scalers': sorted(scalers),
+        **metadata,
+    }
+    with open(os.path.join(directory, MANIFEST_FILE), 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+def read_manifest(directory):
+    """Read the compact model manifest, or None if there is no usable one"""
+    try:
+        with open(os.path.join(directory, MANIFEST_FILE)) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return manifest if manifest.get('format_version') == FORMAT_VERSION else None
+
+def load_npz_mmap(path):
+    """Memory-map every array stored in an uncompressed .npz"""
+    arrays = {}
+    with zipfile.ZipFile(path) as archive, open(path, 'rb') as f:
+        for info in archive.infolist():
+            if info.compress_type != zipfile.ZIP_STORED:
+                raise ValueError(f"{info.filename} is compressed and cannot be memory-mapped")
+            # Local file header: 30 fixed bytes, then the file name and extra field
+            f.seek(info.header_offset + 26)
+            name_length, extra_length = (int(n) for n in np.frombuffer(f.read(4), dtype='<u2'))
+            f.seek(info.header_offset + 30 + name_length + extra_length)
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+            arrays[info.filename[:-len('.npy')]] = np.memmap(
+                path, dtype=dtype, mode='r', shape=shape,
+                order='F' if fortran_order else 'C', offset=f.tell()
+            )
+    return arrays
+
+def load_compact_models(directory):
+    """Load forests and scalers written by save_compact_models
+
+    Returns:
+        (manifest, forests, scalers) or None if no compact models exist.
+    """
+    manifest = read_manifest(directory)
+    if manifest is None:
+        return None
+
+    arrays = load_npz_mmap(os.path.join(directory, ARRAYS_FILE))
+    forests = {
+        name: CompactForest(*(arrays[f'{name}__{array_name}'] for array_name in FOREST_ARRAYS),
+                            max_depth=info['max_depth'])
+        for name, info in manifest['forests'].items()
+    }
+    scalers = {name: CompactScaler(arrays[f'{name}__mean'], arrays[f'{name}__scale'])
+               for name in manifest['scalers']}
+    return manifest, forests, scalers
@@ -0,0 +1,137 @@
+import pandas as pd
+import numpy as np
+import hashlib
+import json
+import os
+import pickle
+
+try:
+    import pyarrow.feather as feather
+except ImportError:  # pragma: no cover - depends on the environment
+    feather = None
+
+class FeatureStore:
+    """On-disk cache of an engineered feature frame, keyed by its source CSV
+
+    The cache is valid while the source file's mtime and size match the
+    manifest; if only the mtime changed, the file's SHA-256 decides. The
+    frame is stored as Feather when pyarrow is available and read back
+    memory-mapped. Without pyarrow, numeric columns go into a single .npy
+    block opened with mmap_mode='r' and the remaining columns are pickled.
+    """
+
+    def __init__(self, source_path, cache_dir='ml_models/feature_cache/', version=1):
+        self.source_path = source_path
+        self.cache_dir = cache_dir
+        # Bump when the feature engineering changes so old caches are rebuilt
+        self.version = version
+        name = os.path.splitext(os.path.basename(source_path))[0]
+        self.manifest_file = os.path.join(cache_dir, f'{name}_manifest.json')
+        self.feather_file = os.path.join(cache_dir, f'{name}_features.feather')
+        self.numeric_file = os.path.join(cache_dir, f'{name}_numeric.npy')
+        self.other_file = os.path.join(cache_dir, f'{name}_other.pkl')
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def source_signature(self):
+        """Cheap signature of the source file: (mtime_ns, size)"""
+        stat = os.stat(self.source_path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def _source_hash(self):
+        sha = hashlib.sha256()
+        with open(self.source_path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                sha.update(block)
+        return sha.hexdigest()
+
+    def _read_manifest(self):
+        try:
+            with open(self.manifest_file) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_manifest(self, manifest):
+        tmp_file = self.manifest_file + '.tmp'
+        with open(tmp_file, 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_file, self.manifest_file)
+
+    def is_valid(self):
+        """Check whether the cached frame was built from the current source"""
+        manifest = self._read_manifest()
+        if not manifest or manifest.get('version') != self.version:
+            return False
+        if manifest['format'] == 'feather' and feather is None:
+            return False
+
+        mtime_ns, size = self.source_signature()
+        if manifest['mtime_ns'] == mtime_ns and manifest['size'] == size:
+            return True
+        if manifest['size'] != size or manifest['sha256'] != self._source_hash():
+            return False
+
+        # Touched but unchanged: remember the new mtime so the hash is skipped next time
+        manifest['mtime_ns'] = mtime_ns
+        self._write_manifest(manifest)
+        return True
+
+    def load(self, build_fn):
+        """Get the feature frame, rebuilding it with build_fn(source_path) when the source changed
+
+        Returns:
+            (frame, rebuilt) where rebuilt is True if build_fn was called.
+        """
+        if self.is_valid():
+            return self._read(self._read_manifest()), False
+
+        frame = build_fn(self.source_path)
+        self.save(frame)
+        return self._read(self._read_manifest()), True
+
+    def save(self, frame):
+        """Write a feature frame and its manifest for the current source"""
+        mtime_ns, size = self.source_signature()
+        manifest = {
+            'version': self.version,
+            'source': self.source_path,
+            'mtime_ns': mtime_ns,
+            'size': size,
+            'sha256': self._source_hash(),
+            'columns': list(frame.columns),
+        }
+
+        if feather is not None:
+            manifest['format'] = 'feather'
+            feather.write_feather(frame.reset_index(drop=True), self.feather_file)
+        else:
+            numeric_cols = [col for col in frame.columns
+                            if pd.api.types.is_numeric_dtype(frame[col]) and not pd.api.types.is_bool_dtype(frame[col])]
+            other_cols = [col for col in frame.columns if col not in numeric_cols]
+            manifest['format'] = 'npy'
+            manifest['numeric_columns'] = numeric_cols
+            manifest['dtypes'] = {col: str(frame[col].dtype) for col in numeric_cols}
+            np.save(self.numeric_file, frame[numeric_cols].to_numpy(dtype=np.float64))
+            with open(self.other_file, 'wb') as f:
+                pickle.dump(frame[other_cols].reset_index(drop=True), f)
+
+        # The manifest goes last so a crash mid-write leaves the cache invalid, never stale
+        self._write_manifest(manifest)
+
+    def _read(self, manifest):
+        if manifest['format'] == 'feather':
+            return feather.read_table(self.feather_file, memory_map=True).to_pandas()
+
+        numeric = np.load(self.numeric_file, mmap_mode='r')
+        with open(self.other_file, 'rb') as f:
+            other = pickle.load(f)
+
+        columns = {}
+        for i, col in enumerate(manifest['numeric_columns']):
+            dtype = manifest['dtypes'][col]
+            # float64 columns stay views into the memory map; other dtypes are cast back
+            columns[col] = numeric[:, i] if dtype == 'float64' else pd.array(numeric[:, i]).astype(dtype)
+        for col in other.columns:
+            columns[col] = other[col]
+
+        return pd.DataFrame(columns, copy=False)[manifest['columns']]
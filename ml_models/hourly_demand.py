@@ -0,0 +1,120 @@
+import pandas as pd
+import numpy as np
+
+HOURLY_CHUNK_SIZE = 10_000
+HOURS_PER_WEEK = 7 * 24
+WEEKDAY_NAMES = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+# Pharmacy shifts as [start_hour, end_hour); a shift may wrap past midnight
+PHARMACY_SHIFTS = {
+    'morning': (7, 15),
+    'evening': (15, 23),
+    'night': (23, 7),
+}
+
+def iter_hourly_chunks(source_path, chunksize=HOURLY_CHUNK_SIZE):
+    """Stream the hourly sales CSV in chunks of chunksize rows"""
+    yield from pd.read_csv(source_path, chunksize=chunksize)
+
+def seasonal_index(timestamps):
+    """Hour-of-week index (weekday * 24 + hour, Monday 00:00 = 0) for an array of timestamps"""
+    timestamps = pd.DatetimeIndex(timestamps)
+    return np.asarray(timestamps.dayofweek * 24 + timestamps.hour, dtype=np.int64)
+
+def build_intraday_profile(source_path, chunksize=HOURLY_CHUNK_SIZE):
+    """Aggregate hourly sales into a 168-row hour-of-week demand profile per category
+
+    The CSV is streamed in chunks and folded into fixed-size NumPy
+    accumulators, so peak memory depends on chunksize, not on the file size.
+
+    Returns:
+        DataFrame with one row per (weekday, hour) holding, per category, the
+        mean demand in that hour ({category}_mean) and that hour's share of
+        the weekday's total demand ({category}_share).
+    """
+    categories = None
+    sums = counts = None
+
+    for chunk in iter_hourly_chunks(source_path, chunksize):
+        if categories is None:
+            categories = [col for col in chunk.columns
+                          if col not in ('datum', 'Year', 'Month', 'Hour', 'Weekday Name')]
+            sums = np.zeros((HOURS_PER_WEEK, len(categories)))
+            counts = np.zeros(HOURS_PER_WEEK)
+
+        index = seasonal_index(pd.to_datetime(chunk['datum'], format='%m/%d/%Y %H:%M'))
+        np.add.at(sums, index, chunk[categories].to_numpy(dtype=np.float64))
+        counts += np.bincount(index, minlength=HOURS_PER_WEEK)
+
+    if categories is None:
+        raise ValueError(f"No hourly sales found in {source_path}")
+
+    means = sums / np.maximum(counts, 1)[:, None]
+    # Share of a weekday's demand that falls into each of its hours
+    weekday_means = means.reshape(7, 24, -1)
+    weekday_totals = weekday_means.sum(axis=1, keepdims=True)
+    shares = np.divide(weekday_means, weekday_totals,
+                       out=np.full_like(weekday_means, 1 / 24), where=weekday_totals > 0).reshape(HOURS_PER_WEEK, -1)
+
+    profile = pd.DataFrame({
+        'weekday': np.repeat(np.arange(7), 24),
+        'hour': np.tile(np.arange(24), 7),
+        'hours_observed': counts,
+    })
+    for i, category in enumerate(categories):
+        profile[f'{category}_mean'] = means[:, i]
+        profile[f'{category}_share'] = shares[:, i]
+    return profile
+
+def profile_categories(profile):
+    """Categories present in an intraday profile frame"""
+    return [col[:-len('_share')] for col in profile.columns if col.endswith('_share')]
+
+def disaggregate_daily_forecast(profile, start_date, daily_demand):
+    """Spread daily demand forecasts over hours using the intraday profile
+
+    Args:
+        start_date: Date of the first forecast day.
+        daily_demand: Dict mapping category to an array of daily demands.
+
+    Returns:
+        DataFrame indexed by hourly timestamp with one column per category.
+    """
+    categories = [category for category in profile_categories(profile) if category in daily_demand]
+    days = len(next(iter(daily_demand.values())))
+    timestamps = pd.date_range(pd.Timestamp(start_date).normalize(), periods=days * 24, freq='h')
+    index = seasonal_index(timestamps)
+
+    shares = profile[[f'{category}_share' for category in categories]].to_numpy()[index]
+    daily = np.column_stack([np.asarray(daily_demand[category], dtype=np.float64) for category in categories])
+    hourly = shares * np.repeat(daily, 24, axis=0)
+    return pd.DataFrame(hourly, index=timestamps, columns=categories)
+
+def aggregate_shifts(hourly_demand, shifts=None):
+    """Sum hourly demand into pharmacy shifts per day
+
+    Night shifts that wrap past midnight are attributed to the day they start.
+
+    Returns:
+        DataFrame indexed by (date, shift) with one column per category.
+    """
+    shifts = shifts or PHARMACY_SHIFTS
+    hours = hourly_demand.index.hour.to_numpy()
+    dates = hourly_demand.index.normalize()
+
+    frames = []
+    for shift, (start, end) in shifts.items():
+        if start < end:
+            in_shift = (hours >= start) & (hours < end)
+            shift_dates = dates
+        else:
+            in_shift = (hours >= start) | (hours < end)
+            # Early-morning hours belong to the previous day's night shift
+            shift_dates = dates - pd.to_timedelta((hours < end).astype(int), unit='D')
+        totals = hourly_demand[in_shift].groupby(shift_dates[in_shift]).sum()
+        totals['shift'] = shift
+        frames.append(totals)
+
+    result = pd.concat(frames)
+    result.index.name = 'date'
+    return result.set_index('shift', append=True).sort_index()
@@ -0,0 +1,119 @@
+import pandas as pd
+import numpy as np
+
+LAGS = (1, 7, 30)
+ROLLING_WINDOWS = (7, 30)
+# pd.Categorical codes of the weekday names, as used by the batch pipeline (alphabetical)
+WEEKDAY_CODES = {name: code for code, name in enumerate(sorted(
+    ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']))}
+
+class IncrementalFeatureEngine:
+    """Lag and rolling-mean features for appended daily sales rows without recomputing history
+
+    Keeps the last 31 days of sales for all categories in one ring buffer
+    and a running sum per rolling window, so each new day costs O(categories)
+    regardless of how much history exists. Output rows match the batch
+    pandas pipeline in MedicineRestockingPredictor: rolling means cover the
+    days before the row's own day, and a day gets a feature row only once 30
+    earlier days are known, mirroring its dropna().
+    """
+
+    # Running sums are recomputed exactly this often to stop floating-point drift
+    RESYNC_INTERVAL = 1000
+
+    def __init__(self, categories):
+        self.categories = list(categories)
+        self.history_size = max(max(LAGS), max(ROLLING_WINDOWS)) + 1
+        self._buffer = np.zeros((self.history_size, len(self.categories)))
+        self._sums = {window: np.zeros(len(self.categories)) for window in ROLLING_WINDOWS}
+        # Number of days appended so far; the next day is written at _count % history_size
+        self._count = 0
+
+    def feature_columns(self):
+        """Names of the lag and rolling columns, in batch pipeline order"""
+        columns = []
+        for category in self.categories:
+            columns.extend([f'{category}_lag_{lag}' for lag in LAGS])
+            columns.extend([f'{category}_rolling_{window}' for window in ROLLING_WINDOWS])
+        return columns
+
+    def seed(self, sales):
+        """Prime the state from the most recent days of history (rows x categories, oldest first)"""
+        sales = np.asarray(sales, dtype=np.float64)[-self.history_size:]
+        self._count = 0
+        self._buffer[:] = 0.0
+        for window in ROLLING_WINDOWS:
+            self._sums[window][:] = 0.0
+        for values in sales:
+            self._push(values)
+
+    def _push(self, values):
+        """Add one day of sales; returns the lag and rolling arrays once enough history exists"""
+        size = self.history_size
+        count = self._count
+        buffer = self._buffer
+        # Rolling means over the previous days, taken before today's sales join the sums
+        rolling = [self._sums[window] / window for window in ROLLING_WINDOWS]
+        buffer[count % size] = values
+
+        for window, window_sum in self._sums.items():
+            window_sum += values
+            if count >= window:
+                window_sum -= buffer[(count - window) % size]
+
+        self._count = count + 1
+        if self._count % self.RESYNC_INTERVAL == 0:
+            self._resync()
+
+        if count < max(LAGS):
+            return None
+        lags = [buffer[(count - lag) % size] for lag in LAGS]
+        return lags, rolling
+
+    def _resync(self):
+        size = self.history_size
+        for window, window_sum in self._sums.items():
+            positions = [(self._count - offset) % size for offset in range(1, window + 1)]
+            window_sum[:] = self._buffer[positions].sum(axis=0)
+
+    def append(self, row):
+        """Append one raw sales row (CSV columns) and return its feature row, or None while warming up"""
+        values = np.array([row[category] for category in self.categories], dtype=np.float64)
+        result = self._push(values)
+        if result is None:
+            return None
+        lags, rolling = result
+
+        datum = pd.Timestamp(row['datum'])
+        features = dict(row)
+        features['datum'] = datum
+        features['Weekday_encoded'] = WEEKDAY_CODES[row['Weekday Name']]
+        features['Day_of_month'] = datum.day
+        features['Week_of_year'] = datum.isocalendar()[1]
+        features['Quarter'] = datum.quarter
+        for i, category in enumerate(self.categories):
+            for lag, lag_values in zip(LAGS, lags):
+                features[f'{category}_lag_{lag}'] = lag_values[i]
+            for window, window_means in zip(ROLLING_WINDOWS, rolling):
+                features[f'{category}_rolling_{window}'] = window_means[i]
+        return features
+
+    def append_frame(self, raw_rows):
+        """Append raw sales rows in order and return the new feature rows as a DataFrame"""
+        feature_rows = []
+        for row in raw_rows.to_dict('records'):
+            features = self.append(row)
+            if features is not None:
+                feature_rows.append(features)
+
+        frame = pd.DataFrame(feature_rows, columns=list(raw_rows.columns) + [
+            'Weekday_encoded', 'Day_of_month', 'Week_of_year', 'Quarter'
+        ] + self.feature_columns())
+        frame['datum'] = pd.to_datetime(frame['datum'])
+        # Same dtypes the pandas datetime accessors produce in the batch pipeline
+        return frame.astype({
+            'Weekday_encoded': 'int8',
+            'Day_of_month': 'int32',
+            'Week_of_year': 'UInt32',
+            'Quarter': 'int32',
+        })
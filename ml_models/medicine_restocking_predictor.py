@@ -1,33 +1,161 @@
 import pandas as pd
 import numpy as np
-from sklearn.model_selection import train_test_split
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.preprocessing import StandardScaler
 from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
 import joblib
+import json
 import os
 from datetime import datetime, timedelta
 import warnings
 warnings.filterwarnings('ignore')
 
+try:
+    from ml_models.feature_store import FeatureStore
+    from ml_models.incremental_features import IncrementalFeatureEngine
+    from ml_models import hourly_demand
+    from ml_models import compact_models
+    from ml_models.category_mapping import SkuCategoryTable
+except ImportError:
+    # Running this file directly puts ml_models/ itself on the path
+    from feature_store import FeatureStore
+    from incremental_features import IncrementalFeatureEngine
+    import hourly_demand
+    import compact_models
+    from category_mapping import SkuCategoryTable
+
+MODEL_MODES = ('per_category', 'multi_output')
+MULTI_OUTPUT_NAME = 'multi_output'
+# Demand quantiles reported alongside point forecasts
+DEMAND_QUANTILES = (0.5, 0.9, 0.99)
+
+# Version of the engineered daily features; 2 moved rolling means off the day being predicted
+FEATURE_VERSION = 2
+# Most recent share of the history held out to report model accuracy
+HOLDOUT_FRACTION = 0.2
+# Day-ahead forest settings when no walk-forward CV leaderboard applies
+DEFAULT_FOREST_PARAMS = {'n_estimators': 100, 'max_depth': 10}
+
+NON_CATEGORY_COLUMNS = ['datum', 'Year', 'Month', 'Hour', 'Weekday Name', 'Weekday_encoded',
+                        'Day_of_month', 'Week_of_year', 'Quarter']
+
+def quantile_label(q):
+    """Report key for a quantile, e.g. 0.9 -> 'p90'"""
+    return f"p{q * 100:g}"
+
+def time_holdout_split(X, y, test_fraction=HOLDOUT_FRACTION):
+    """Split chronologically ordered rows into the earlier (train) and latest (test) part
+
+    Unlike a shuffled split, no test day is surrounded by training days, so the
+    held-out error measures forecasting days the model has not seen.
+    """
+    split = int(round(len(X) * (1 - test_fraction)))
+    return X[:split], X[split:], y[:split], y[split:]
+
 class MedicineRestockingPredictor:
-    def __init__(self):
+    def __init__(self, model_mode='per_category', base_dir=''):
+        if model_mode not in MODEL_MODES:
+            raise ValueError(f"model_mode must be one of {MODEL_MODES}")
+        # per_category: one forest and scaler per category
+        # multi_output: one forest predicting all categories from a shared feature matrix
+        self.model_mode = model_mode
         self.models = {}
         self.scalers = {}
+        # Direct multi-horizon models: one per category, with the horizon as an input feature
+        self.horizon_models = {}
+        self.horizon_scalers = {}
+        self.multi_output_model = None
+        self.multi_output_scaler = None
+        self.multi_output_horizon_model = None
+        self.multi_output_horizon_scaler = None
+        self.max_horizon = 90
+        self.horizons_per_origin = 8
         self.feature_columns = ['Year', 'Month', 'Hour', 'Weekday_encoded']
-        self.model_path = 'ml_models/trained_models/'
-        self.scaler_path = 'ml_models/scalers/'
+        # All paths are relative to base_dir (the repository root); '' means the working directory
+        self.model_path = os.path.join(base_dir, 'ml_models/trained_models/')
+        self.scaler_path = os.path.join(base_dir, 'ml_models/scalers/')
+        # Flattened inference copies of the trained models, loaded without scikit-learn objects
+        self.compact_path = os.path.join(base_dir, 'ml_models/compact/')
+        feature_cache_dir = os.path.join(base_dir, 'ml_models/feature_cache/')
+        self.data_path = os.path.join(base_dir, 'archive/salesdaily.csv')
+        self.feature_store = FeatureStore(self.data_path, feature_cache_dir, version=FEATURE_VERSION)
+        # Engineered frame kept in memory together with the source signature it was built from
+        self._data = None
+        self._data_signature = None
+        self._feature_engine = None
+        # Hourly sales are only used for intraday profiles, cached the same way
+        self.hourly_data_path = os.path.join(base_dir, 'archive/saleshourly.csv')
+        self.hourly_feature_store = FeatureStore(self.hourly_data_path, feature_cache_dir)
+        self._intraday_profile = None
+        self._intraday_signature = None
+        # Written by walk_forward_cv; its best random forest configures the day-ahead models
+        self.leaderboard_path = os.path.join(base_dir, 'ml_models/cv_leaderboard.json')
+        # Inventory SKU -> ATC category table, persisted so known SKUs skip matching
+        self.sku_category_table = SkuCategoryTable(os.path.join(base_dir, 'ml_models/sku_category_map.json'))
         
         # Create directories if they don't exist
         os.makedirs(self.model_path, exist_ok=True)
         os.makedirs(self.scaler_path, exist_ok=True)
     
     def load_and_preprocess_data(self):
-        """Load and preprocess sales data from archive folder"""
+        """Load and preprocess sales data from archive folder
+        
+        The engineered frame comes from the feature store and is kept in memory,
+        so repeated calls only stat the source CSV unless it has changed.
+        """
+        signature = self.feature_store.source_signature()
+        if self._data is not None and signature == self._data_signature:
+            return self._data
+        
         print("Loading sales data...")
+        data, rebuilt = self.feature_store.load(self._build_features)
+        if rebuilt:
+            print("  Rebuilt cached feature frame")
+        
+        # Get medicine categories from the data
+        self.medicine_categories = self._categories_from_columns(data.columns)
+        self._data = data
+        self._data_signature = signature
+        self._feature_engine = None
+        return data
+    
+    def append_sales(self, new_rows, persist=False):
+        """Append new days of sales (salesdaily.csv columns) without recomputing the full history
+        
+        Feature rows for the new days come from an IncrementalFeatureEngine seeded
+        with the tail of the current frame. With persist=True the rows are also
+        appended to the CSV and the feature cache is rewritten for the new file.
         
+        Returns:
+            The feature rows added for the new days.
+        """
+        data = self.load_and_preprocess_data()
+        if self._feature_engine is None:
+            self._feature_engine = IncrementalFeatureEngine(self.medicine_categories)
+            self._feature_engine.seed(data[self.medicine_categories].values)
+        
+        new_features = self._feature_engine.append_frame(new_rows)
+        data = pd.concat([data, new_features], ignore_index=True)
+        
+        if persist:
+            csv_rows = new_rows.copy()
+            if pd.api.types.is_datetime64_any_dtype(csv_rows['datum']):
+                csv_rows['datum'] = csv_rows['datum'].map(lambda d: f"{d.month}/{d.day}/{d.year}")
+            csv_rows.to_csv(self.data_path, mode='a', header=False, index=False)
+            self.feature_store.save(data)
+        
+        self._data = data
+        self._data_signature = self.feature_store.source_signature()
+        return new_features
+    
+    def _categories_from_columns(self, columns):
+        return [col for col in columns if col not in NON_CATEGORY_COLUMNS
+                and '_lag_' not in col and '_rolling_' not in col]
+    
+    def _build_features(self, source_path):
+        """Compute the engineered feature frame from the raw daily sales CSV"""
         # Load daily sales data
-        daily_data = pd.read_csv('archive/salesdaily.csv')
+        daily_data = pd.read_csv(source_path)
         
         # Convert date column
         daily_data['datum'] = pd.to_datetime(daily_data['datum'])
@@ -38,25 +166,21 @@ class MedicineRestockingPredictor:
         daily_data['Week_of_year'] = daily_data['datum'].dt.isocalendar().week
         daily_data['Quarter'] = daily_data['datum'].dt.quarter
         
-        # Get medicine categories from the data
-        self.medicine_categories = [col for col in daily_data.columns if col not in 
-                                  ['datum', 'Year', 'Month', 'Hour', 'Weekday Name', 'Weekday_encoded', 
-                                   'Day_of_month', 'Week_of_year', 'Quarter']]
+        categories = self._categories_from_columns(daily_data.columns)
         
         # Add lag features for time series analysis
-        for category in self.medicine_categories:
+        for category in categories:
             daily_data[f'{category}_lag_1'] = daily_data[category].shift(1)
             daily_data[f'{category}_lag_7'] = daily_data[category].shift(7)
             daily_data[f'{category}_lag_30'] = daily_data[category].shift(30)
             
-            # Rolling averages
-            daily_data[f'{category}_rolling_7'] = daily_data[category].rolling(window=7).mean()
-            daily_data[f'{category}_rolling_30'] = daily_data[category].rolling(window=30).mean()
+            # Rolling averages of the days before, never including the day being predicted
+            previous_days = daily_data[category].shift(1)
+            daily_data[f'{category}_rolling_7'] = previous_days.rolling(window=7).mean()
+            daily_data[f'{category}_rolling_30'] = previous_days.rolling(window=30).mean()
         
         # Drop rows with NaN values (from lag features)
-        daily_data = daily_data.dropna()
-        
-        return daily_data
+        return daily_data.dropna().reset_index(drop=True)
     
     def prepare_features(self, data, target_category):
         """Prepare features for a specific medicine category"""
@@ -76,13 +200,54 @@ class MedicineRestockingPredictor:
         
         return feature_cols
     
-    def train_models(self):
-        """Train separate models for each medicine category"""
+    def shared_feature_columns(self):
+        """Feature columns of the multi-output model: calendar features plus every category's lags"""
+        feature_cols = self.feature_columns + ['Day_of_month', 'Week_of_year', 'Quarter']
+        for category in self.medicine_categories:
+            feature_cols.extend([
+                f'{category}_lag_1', f'{category}_lag_7', f'{category}_lag_30',
+                f'{category}_rolling_7', f'{category}_rolling_30'
+            ])
+        return feature_cols
+    
+    def forest_params(self):
+        """Day-ahead forest settings: the best random forest of the walk-forward CV leaderboard
+        
+        The leaderboard only applies if it was computed on the current feature
+        version; otherwise (or without one) DEFAULT_FOREST_PARAMS are used.
+        """
+        try:
+            with open(self.leaderboard_path) as f:
+                results = json.load(f)
+        except (OSError, ValueError):
+            return dict(DEFAULT_FOREST_PARAMS)
+        if results.get('feature_version') != FEATURE_VERSION:
+            return dict(DEFAULT_FOREST_PARAMS)
+        for row in results.get('leaderboard', []):
+            # Only forests can be exported to the compact inference format
+            if row.get('estimator') == 'random_forest':
+                return dict(row['params'])
+        return dict(DEFAULT_FOREST_PARAMS)
+    
+    def has_models(self):
+        """Check whether models for the current mode are loaded"""
+        return self.multi_output_model is not None if self.model_mode == 'multi_output' else bool(self.models)
+    
+    def train_models(self, include_horizon=True):
+        """Train separate models for each medicine category (or one multi-output model)
+        
+        Returns:
+            Dict mapping each category to its MAE, RMSE and R² on the latest 20% of days.
+        """
         print("Training ML models for medicine restocking prediction...")
         
         # Load and preprocess data
         data = self.load_and_preprocess_data()
         
+        if self.model_mode == 'multi_output':
+            return self._train_multi_output_models(data, include_horizon)
+        
+        metrics = {}
         for category in self.medicine_categories:
             print(f"\nTraining model for {category}...")
             
@@ -91,10 +256,8 @@ class MedicineRestockingPredictor:
             X = data[feature_cols]
             y = data[category]
             
-            # Split data
-            X_train, X_test, y_train, y_test = train_test_split(
-                X, y, test_size=0.2, random_state=42
-            )
+            # Hold out the latest days
+            X_train, X_test, y_train, y_test = time_holdout_split(X, y)
             
             # Scale features
             scaler = StandardScaler()
@@ -102,12 +265,7 @@ class MedicineRestockingPredictor:
             X_test_scaled = scaler.transform(X_test)
             
             # Train model
-            model = RandomForestRegressor(
-                n_estimators=100,
-                max_depth=10,
-                random_state=42,
-                n_jobs=-1
-            )
+            model = RandomForestRegressor(random_state=42, n_jobs=-1, **self.forest_params())
             
             model.fit(X_train_scaled, y_train)
             
@@ -120,6 +278,7 @@ class MedicineRestockingPredictor:
             print(f"  MAE: {mae:.2f}")
             print(f"  RMSE: {rmse:.2f}")
             print(f"  R²: {r2:.3f}")
+            metrics[category] = {'mae': mae, 'rmse': rmse, 'r2': r2}
             
             # Save model and scaler
             self.models[category] = model
@@ -128,183 +287,455 @@ class MedicineRestockingPredictor:
             # Save to disk
             joblib.dump(model, f'{self.model_path}{category}_model.pkl')
             joblib.dump(scaler, f'{self.scaler_path}{category}_scaler.pkl')
+            
+            if include_horizon:
+                self.horizon_models[category], self.horizon_scalers[category] = \
+                    self._train_horizon_model(data, category, feature_cols, category)
         
+        self.export_compact_models()
+        print("\nAll models trained and saved successfully!")
+        return metrics
+    
+    def _train_multi_output_models(self, data, include_horizon=True):
+        """Train one forest predicting every category from the shared feature matrix"""
+        print(f"\nTraining multi-output model for {len(self.medicine_categories)} categories...")
+        
+        feature_cols = self.shared_feature_columns()
+        X = data[feature_cols]
+        y = data[self.medicine_categories]
+        
+        X_train, X_test, y_train, y_test = time_holdout_split(X, y)
+        
+        scaler = StandardScaler()
+        X_train_scaled = scaler.fit_transform(X_train)
+        X_test_scaled = scaler.transform(X_test)
+        
+        model = RandomForestRegressor(random_state=42, n_jobs=-1, **self.forest_params())
+        model.fit(X_train_scaled, y_train)
+        
+        y_pred = model.predict(X_test_scaled)
+        metrics = {}
+        for i, category in enumerate(self.medicine_categories):
+            mae = mean_absolute_error(y_test[category], y_pred[:, i])
+            rmse = np.sqrt(mean_squared_error(y_test[category], y_pred[:, i]))
+            r2 = r2_score(y_test[category], y_pred[:, i])
+            print(f"  {category}: MAE {mae:.2f}, RMSE {rmse:.2f}, R² {r2:.3f}")
+            metrics[category] = {'mae': mae, 'rmse': rmse, 'r2': r2}
+        
+        self.multi_output_model = model
+        self.multi_output_scaler = scaler
+        joblib.dump(model, f'{self.model_path}{MULTI_OUTPUT_NAME}_model.pkl')
+        joblib.dump(scaler, f'{self.scaler_path}{MULTI_OUTPUT_NAME}_scaler.pkl')
+        
+        if include_horizon:
+            self.multi_output_horizon_model, self.multi_output_horizon_scaler = \
+                self._train_horizon_model(data, self.medicine_categories, feature_cols, MULTI_OUTPUT_NAME)
+        
+        self.export_compact_models()
         print("\nAll models trained and saved successfully!")
+        return metrics
     
-    def load_models(self):
-        """Load trained models from disk"""
+    def _horizon_features(self, origin_X, origin_dates, horizons):
+        """Append horizon and target-date calendar columns to origin-day feature rows"""
+        target_dates = pd.DatetimeIndex(origin_dates) + pd.to_timedelta(horizons, unit='D')
+        return np.column_stack([
+            origin_X,
+            horizons,
+            target_dates.month,
+            target_dates.dayofweek,
+            target_dates.day
+        ])
+    
+    def _train_horizon_model(self, data, targets, feature_cols, name):
+        """Train a direct model predicting demand h days after each origin day, for h in 1..max_horizon
+        
+        Each origin day is paired with horizons_per_origin randomly drawn horizons,
+        so one model covers the whole curve without a training row per day per horizon.
+        targets is a single category or, for the multi-output model, a list of them.
+        Accuracy is reported on origins in the latest days, with training rows
+        limited to targets before the first of them.
+        
+        Returns:
+            (model, scaler), also saved to disk under name.
+        """
+        print(f"  Training 1-{self.max_horizon} day horizon model for {name}...")
+        rng = np.random.default_rng(42)
+        
+        origin_positions = np.repeat(np.arange(len(data)), self.horizons_per_origin)
+        horizons = rng.integers(1, self.max_horizon + 1, size=len(origin_positions))
+        origin_dates = data['datum'].values[origin_positions]
+        
+        # Look targets up by date so gaps in the series never pair a row with the wrong day
+        demand_by_date = data.set_index('datum')[targets]
+        target_dates = pd.DatetimeIndex(origin_dates) + pd.to_timedelta(horizons, unit='D')
+        y = demand_by_date.reindex(target_dates).values
+        valid = ~np.isnan(y).reshape(len(y), -1).any(axis=1)
+        
+        X = self._horizon_features(
+            data[feature_cols].values[origin_positions][valid],
+            origin_dates[valid],
+            horizons[valid]
+        )
+        y = y[valid]
+        
+        # Origins are in date order; test rows start at the holdout cutoff and training
+        # rows must also have their target day before it, so no test day is learned
+        origin_dates = pd.DatetimeIndex(origin_dates[valid])
+        cutoff = origin_dates[int(round(len(origin_dates) * (1 - HOLDOUT_FRACTION)))]
+        train_rows = np.asarray(origin_dates + pd.to_timedelta(horizons[valid], unit='D') < cutoff)
+        test_rows = np.asarray(origin_dates >= cutoff)
+        X_train, X_test, y_train, y_test = X[train_rows], X[test_rows], y[train_rows], y[test_rows]
+        
+        scaler = StandardScaler()
+        X_train_scaled = scaler.fit_transform(X_train)
+        X_test_scaled = scaler.transform(X_test)
+        
+        model = RandomForestRegressor(
+            n_estimators=100,
+            max_depth=10,
+            random_state=42,
+            n_jobs=-1
+        )
+        model.fit(X_train_scaled, y_train)
+        
+        y_pred = model.predict(X_test_scaled)
+        print(f"  Horizon MAE: {mean_absolute_error(y_test, y_pred):.2f} over {len(y)} samples")
+        
+        joblib.dump(model, f'{self.model_path}{name}_horizon_model.pkl')
+        joblib.dump(scaler, f'{self.scaler_path}{name}_horizon_scaler.pkl')
+        return model, scaler
+    
+    def _model_components(self):
+        """Currently loaded forests and scalers by storage name, with each forest's feature columns"""
+        forests, scalers, feature_columns = {}, {}, {}
+        if self.model_mode == 'multi_output':
+            shared = self.shared_feature_columns()
+            pairs = [(MULTI_OUTPUT_NAME, self.multi_output_model, self.multi_output_scaler),
+                     (f'{MULTI_OUTPUT_NAME}_horizon', self.multi_output_horizon_model, self.multi_output_horizon_scaler)]
+            for name, model, scaler in pairs:
+                if model is not None:
+                    forests[name], scalers[name], feature_columns[name] = model, scaler, shared
+            return forests, scalers, feature_columns
+        
+        for category in self.medicine_categories:
+            category_cols = self.prepare_features(None, category)
+            if category in self.models:
+                forests[category], scalers[category] = self.models[category], self.scalers[category]
+                feature_columns[category] = category_cols
+            if category in self.horizon_models:
+                name = f'{category}_horizon'
+                forests[name], scalers[name] = self.horizon_models[category], self.horizon_scalers[category]
+                feature_columns[name] = category_cols
+        return forests, scalers, feature_columns
+    
+    def export_compact_models(self):
+        """Write the loaded models as flattened tree arrays (one .npz) plus a manifest"""
+        forests, scalers, feature_columns = self._model_components()
+        if not forests:
+            return False
+        compact_models.save_compact_models(self.compact_path, forests, scalers, {
+            'model_mode': self.model_mode,
+            'categories': self.medicine_categories,
+            'feature_columns': feature_columns,
+            'max_horizon': self.max_horizon,
+        })
+        print(f"  Exported compact models to {self.compact_path}")
+        return True
+    
+    def _load_compact_models(self, include_horizon=True):
+        """Load the compact inference models; needs neither the CSV nor the pickled forests"""
+        loaded = compact_models.load_compact_models(self.compact_path)
+        if loaded is None:
+            return False
+        manifest, forests, scalers = loaded
+        if manifest['model_mode'] != self.model_mode or manifest['max_horizon'] != self.max_horizon:
+            return False
+        
+        categories = manifest['categories']
+        if self.model_mode == 'multi_output':
+            horizon_name = f'{MULTI_OUTPUT_NAME}_horizon'
+            if MULTI_OUTPUT_NAME not in forests or (include_horizon and horizon_name not in forests):
+                return False
+            self.multi_output_model = forests[MULTI_OUTPUT_NAME]
+            self.multi_output_scaler = scalers[MULTI_OUTPUT_NAME]
+            if horizon_name in forests:
+                self.multi_output_horizon_model = forests[horizon_name]
+                self.multi_output_horizon_scaler = scalers[horizon_name]
+        else:
+            if any(category not in forests or (include_horizon and f'{category}_horizon' not in forests)
+                   for category in categories):
+                return False
+            for category in categories:
+                self.models[category] = forests[category]
+                self.scalers[category] = scalers[category]
+                if f'{category}_horizon' in forests:
+                    self.horizon_models[category] = forests[f'{category}_horizon']
+                    self.horizon_scalers[category] = scalers[f'{category}_horizon']
+        
+        self.medicine_categories = categories
+        print(f"  Loaded compact models for {len(categories)} categories")
+        return True
+    
+    def load_models(self, include_horizon=True, prefer_compact=True):
+        """Load trained models from disk
+        
+        Compact models are used when available; otherwise the pickled forests are
+        loaded and converted to the compact format for the next cold start.
+        """
         print("Loading trained models...")
         
+        if prefer_compact and self._load_compact_models(include_horizon):
+            return True
+        
         # First, get the medicine categories from data
         try:
-            data = self.load_and_preprocess_data()
-            self.medicine_categories = [col for col in data.columns if col not in 
-                                      ['datum', 'Year', 'Month', 'Hour', 'Weekday Name', 'Weekday_encoded', 
-                                       'Day_of_month', 'Week_of_year', 'Quarter']]
+            self.load_and_preprocess_data()
         except:
             # Fallback to default categories if data loading fails
             self.medicine_categories = ['M01AB', 'M01AE', 'N02BA', 'N02BE', 'N05B', 'N05C', 'R03', 'R06']
         
+        if self.model_mode == 'multi_output':
+            loaded = self._load_multi_output_models(include_horizon)
+            if loaded and prefer_compact:
+                self.export_compact_models()
+            return loaded
+        
         for category in self.medicine_categories:
             model_file = f'{self.model_path}{category}_model.pkl'
             scaler_file = f'{self.scaler_path}{category}_scaler.pkl'
             
-            if os.path.exists(model_file) and os.path.exists(scaler_file):
+            horizon_model_file = f'{self.model_path}{category}_horizon_model.pkl'
+            horizon_scaler_file = f'{self.scaler_path}{category}_horizon_scaler.pkl'
+            required = [model_file, scaler_file] + ([horizon_model_file, horizon_scaler_file] if include_horizon else [])
+            
+            if all(os.path.exists(f) for f in required):
                 self.models[category] = joblib.load(model_file)
                 self.scalers[category] = joblib.load(scaler_file)
+                if include_horizon:
+                    self.horizon_models[category] = joblib.load(horizon_model_file)
+                    self.horizon_scalers[category] = joblib.load(horizon_scaler_file)
                 print(f"  Loaded model for {category}")
             else:
                 print(f"  Model for {category} not found. Please train models first.")
                 return False
         
+        if prefer_compact:
+            self.export_compact_models()
+        return True
+    
+    def _load_multi_output_models(self, include_horizon=True):
+        model_file = f'{self.model_path}{MULTI_OUTPUT_NAME}_model.pkl'
+        scaler_file = f'{self.scaler_path}{MULTI_OUTPUT_NAME}_scaler.pkl'
+        horizon_model_file = f'{self.model_path}{MULTI_OUTPUT_NAME}_horizon_model.pkl'
+        horizon_scaler_file = f'{self.scaler_path}{MULTI_OUTPUT_NAME}_horizon_scaler.pkl'
+        required = [model_file, scaler_file] + ([horizon_model_file, horizon_scaler_file] if include_horizon else [])
+        
+        if not all(os.path.exists(f) for f in required):
+            print("  Multi-output model not found. Please train models first.")
+            return False
+        
+        self.multi_output_model = joblib.load(model_file)
+        self.multi_output_scaler = joblib.load(scaler_file)
+        if include_horizon:
+            self.multi_output_horizon_model = joblib.load(horizon_model_file)
+            self.multi_output_horizon_scaler = joblib.load(horizon_scaler_file)
+        print(f"  Loaded multi-output model for {len(self.medicine_categories)} categories")
         return True
     
+    def _predict_latest_demand(self, data):
+        """Predict demand on the latest data point for every category with a model"""
+        latest_data = data.iloc[-1:]
+        
+        if self.model_mode == 'multi_output':
+            X_pred = self.multi_output_scaler.transform(latest_data[self.shared_feature_columns()])
+            return dict(zip(self.medicine_categories, self.multi_output_model.predict(X_pred)[0]))
+        
+        latest_demand = {}
+        for category in self.medicine_categories:
+            if category not in self.models:
+                continue
+            feature_cols = self.prepare_features(data, category)
+            X_pred_scaled = self.scalers[category].transform(latest_data[feature_cols])
+            latest_demand[category] = self.models[category].predict(X_pred_scaled)[0]
+        return latest_demand
+    
     def predict_for_inventory_items(self, inventory_items):
         """Predict restocking needs for actual inventory items"""
-        if not self.models:
+        if not self.has_models():
             print("No models loaded. Please train or load models first.")
             return None
         
         # Load recent data for prediction
         data = self.load_and_preprocess_data()
         
-        # Get the latest data point
-        latest_data = data.iloc[-1:].copy()
-        
-        predictions = {}
+        # Predict the latest data point once for all categories
+        latest_demand = self._predict_latest_demand(data)
         
         # Map inventory items to medicine categories
         inventory_mapping = self._map_inventory_to_categories(inventory_items)
         
-        for item in inventory_items:
-            # Find the best matching category for this inventory item
-            category = self._find_best_category_match(item, inventory_mapping)
-            
-            if category and category in self.models:
-                model = self.models[category]
-                scaler = self.scalers[category]
-                
-                # Prepare features for prediction
-                feature_cols = self.prepare_features(data, category)
-                X_pred = latest_data[feature_cols]
-                X_pred_scaled = scaler.transform(X_pred)
-                
-                # Make prediction
-                predicted_demand = model.predict(X_pred_scaled)[0]
-                
-                # Calculate restocking threshold (e.g., 7 days of average demand)
-                avg_demand = data[category].tail(30).mean()
-                restocking_threshold = avg_demand * 7
-                
-                # Use actual inventory stock
-                current_stock = item.stock
-                restocking_needed = current_stock < restocking_threshold
-                
-                predictions[item.name] = {
-                    'category': category,
-                    'predicted_demand': predicted_demand,
-                    'current_stock': current_stock,
-                    'restocking_threshold': restocking_threshold,
-                    'restocking_needed': restocking_needed,
-                    'days_until_stockout': max(0, int((current_stock - restocking_threshold) / avg_demand)) if avg_demand > 0 else 0,
-                    'threshold': item.threshold,
-                    'status': item.status
-                }
-            else:
-                # Fallback prediction for items without matching categories
-                predictions[item.name] = {
-                    'category': 'Unknown',
-                    'predicted_demand': 10.0,  # Default prediction
-                    'current_stock': item.stock,
-                    'restocking_threshold': item.threshold * 0.7,
-                    'restocking_needed': item.stock < item.threshold,
-                    'days_until_stockout': max(0, int((item.stock - item.threshold) / 10)) if item.stock > 0 else 0,
-                    'threshold': item.threshold,
-                    'status': item.status
-                }
+        # Per-category values are computed once and broadcast to the items; the
+        # extra last slot holds the fallback for items without a matching category
+        categories = list(latest_demand)
+        category_codes = {category: code for code, category in enumerate(categories)}
+        unknown = len(categories)
+        category_labels = categories + ['Unknown']
+        category_demand = np.array([latest_demand[category] for category in categories] + [10.0])  # Default prediction
+        category_avg = np.array([data[category].tail(30).mean() for category in categories] + [np.nan])
+        
+        codes = np.array([category_codes.get(self._find_best_category_match(item, inventory_mapping), unknown)
+                          for item in inventory_items], dtype=np.int64)
+        stock = np.array([item.stock for item in inventory_items], dtype=np.float64)
+        threshold = np.array([item.threshold for item in inventory_items], dtype=np.float64)
+        matched = codes != unknown
+        avg_demand = category_avg[codes]
+        
+        # Restocking threshold is 7 days of average demand; unmatched items fall back to their own threshold
+        restocking_threshold = np.where(matched, avg_demand * 7, threshold * 0.7)
+        restocking_needed = np.where(matched, stock < restocking_threshold, stock < threshold)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            days_left = np.where(
+                matched,
+                np.where(avg_demand > 0, (stock - restocking_threshold) / avg_demand, 0),
+                np.where(stock > 0, (stock - threshold) / 10, 0)
+            )
+        days_until_stockout = np.maximum(0, np.trunc(days_left)).astype(np.int64)
+        
+        predictions = {}
+        for item, code, predicted_demand, item_threshold, needed, days in zip(
+                inventory_items, codes.tolist(), category_demand[codes].tolist(),
+                restocking_threshold.tolist(), restocking_needed.tolist(), days_until_stockout.tolist()):
+            predictions[item.name] = {
+                'category': category_labels[code],
+                'predicted_demand': predicted_demand,
+                'current_stock': item.stock,
+                'restocking_threshold': item_threshold,
+                'restocking_needed': needed,
+                'days_until_stockout': days,
+                'threshold': item.threshold,
+                'status': item.status
+            }
         
         return predictions
     
     def _map_inventory_to_categories(self, inventory_items):
         """Map inventory items to medicine categories based on names and categories"""
-        mapping = {}
-        
-        # Medicine category descriptions
-        category_descriptions = {
-            'M01AB': 'anti-inflammatory antirheumatic non-steroids',
-            'M01AE': 'anti-inflammatory antirheumatic acetic acid',
-            'N02BA': 'analgesics anilides paracetamol',
-            'N02BE': 'analgesics pyrazolones salicylic acid',
-            'N05B': 'anxiolytics benzodiazepine',
-            'N05C': 'hypnotics sedatives',
-            'R03': 'obstructive airway diseases',
-            'R06': 'antihistamines systemic'
-        }
-        
-        for item in inventory_items:
-            best_match = None
-            best_score = 0
-            
-            # Check item name against category descriptions
-            item_lower = item.name.lower()
-            
-            for category, description in category_descriptions.items():
-                score = 0
-                desc_words = description.lower().split()
-                
-                for word in desc_words:
-                    if word in item_lower:
-                        score += 1
-                
-                if score > best_score:
-                    best_score = score
-                    best_match = category
-            
-            # Also check item category
-            if item.category:
-                category_lower = item.category.lower()
-                for category, description in category_descriptions.items():
-                    if any(word in category_lower for word in description.split()):
-                        best_match = category
-                        break
-            
-            mapping[item.name] = best_match
-        
-        return mapping
+        return self.sku_category_table.map_items(inventory_items)
     
     def _find_best_category_match(self, item, mapping):
         """Find the best matching category for an inventory item"""
         return mapping.get(item.name)
     
+    def _horizon_design(self, days_ahead, data):
+        """Scaled horizon-model inputs for days 1..days_ahead after the latest data point
+        
+        Returns:
+            List of (categories, model, X_scaled); one entry per category, or a
+            single entry covering all categories for the multi-output model.
+        """
+        if not 1 <= days_ahead <= self.max_horizon:
+            raise ValueError(f"days_ahead must be between 1 and {self.max_horizon}")
+        
+        if data is None:
+            data = self.load_and_preprocess_data()
+        latest_data = data.iloc[-1:]
+        horizons = np.arange(1, days_ahead + 1)
+        origin_dates = np.repeat(latest_data['datum'].values, days_ahead)
+        
+        if self.model_mode == 'multi_output':
+            if self.multi_output_horizon_model is None:
+                return []
+            origin_X = np.repeat(latest_data[self.shared_feature_columns()].values, days_ahead, axis=0)
+            X_pred = self._horizon_features(origin_X, origin_dates, horizons)
+            return [(self.medicine_categories, self.multi_output_horizon_model,
+                     self.multi_output_horizon_scaler.transform(X_pred))]
+        
+        design = []
+        for category in self.medicine_categories:
+            if category not in self.horizon_models:
+                continue
+            feature_cols = self.prepare_features(data, category)
+            origin_X = np.repeat(latest_data[feature_cols].values, days_ahead, axis=0)
+            X_pred = self._horizon_features(origin_X, origin_dates, horizons)
+            design.append(([category], self.horizon_models[category], self.horizon_scalers[category].transform(X_pred)))
+        return design
+    
+    def forecast_demand_curves(self, days_ahead=90, data=None):
+        """Forecast daily demand for days 1..days_ahead after the latest data point
+        
+        All horizons of a category (or of all categories, for the multi-output
+        model) are scored in a single predict call.
+        
+        Returns:
+            Dict mapping each category to an array of days_ahead daily demands.
+        """
+        curves = {}
+        for categories, model, X_pred_scaled in self._horizon_design(days_ahead, data):
+            demand = np.maximum(model.predict(X_pred_scaled), 0.0).reshape(days_ahead, -1)
+            for i, category in enumerate(categories):
+                curves[category] = demand[:, i]
+        return curves
+    
+    def forecast_tree_curves(self, days_ahead=90, data=None):
+        """Forecast daily demand for days 1..days_ahead separately with every tree of the horizon forest
+        
+        Returns:
+            Dict mapping each category to a (days_ahead, n_trees) array.
+        """
+        curves = {}
+        for categories, model, X_pred_scaled in self._horizon_design(days_ahead, data):
+            demand = np.maximum(compact_models.per_tree_predictions(model, X_pred_scaled), 0.0)
+            for i, category in enumerate(categories):
+                curves[category] = demand[:, :, i]
+        return curves
+    
+    def forecast_demand_quantiles(self, days_ahead=90, data=None, quantiles=DEMAND_QUANTILES):
+        """Demand quantiles over the spread of the horizon forest's trees
+        
+        Each tree yields its own demand curve; quantiles are taken across trees
+        per day, and across each tree's summed curve for the whole horizon.
+        
+        Returns:
+            Dict mapping each category to {'daily': {label: array}, 'total': {label: float}},
+            with labels such as 'p90' (see quantile_label).
+        """
+        labels = [quantile_label(q) for q in quantiles]
+        result = {}
+        for category, tree_curves in self.forecast_tree_curves(days_ahead, data).items():
+            daily = np.quantile(tree_curves, quantiles, axis=1)
+            total = np.quantile(tree_curves.sum(axis=0), quantiles)
+            result[category] = {
+                'daily': dict(zip(labels, daily)),
+                'total': dict(zip(labels, total.tolist())),
+            }
+        return result
+    
     def predict_restocking_needs(self, days_ahead=30):
         """Predict restocking needs for the next N days (legacy method)"""
-        if not self.models:
+        if not self.has_models():
             print("No models loaded. Please train or load models first.")
             return None
         
         # Load recent data for prediction
         data = self.load_and_preprocess_data()
         
-        # Get the latest data point
-        latest_data = data.iloc[-1:].copy()
+        demand_curves = self.forecast_demand_curves(days_ahead, data)
+        demand_quantiles = self.forecast_demand_quantiles(days_ahead, data)
+        # One-step predictions are only needed for categories without a horizon model
+        latest_demand = self._predict_latest_demand(data) if len(demand_curves) < len(self.medicine_categories) else {}
         
         predictions = {}
         
         for category in self.medicine_categories:
-            if category not in self.models:
+            curve = demand_curves.get(category)
+            if curve is not None:
+                # Next-day demand from the horizon model
+                prediction = curve[0]
+            elif category in latest_demand:
+                prediction = latest_demand[category]
+            else:
                 continue
             
-            model = self.models[category]
-            scaler = self.scalers[category]
-            
-            # Prepare features for prediction
-            feature_cols = self.prepare_features(data, category)
-            X_pred = latest_data[feature_cols]
-            X_pred_scaled = scaler.transform(X_pred)
-            
-            # Make prediction
-            prediction = model.predict(X_pred_scaled)[0]
-            
             # Calculate restocking threshold (e.g., 7 days of average demand)
             avg_demand = data[category].tail(30).mean()
             restocking_threshold = avg_demand * 7
@@ -320,9 +751,52 @@ class MedicineRestockingPredictor:
                 'restocking_needed': restocking_needed,
                 'days_until_stockout': max(0, int((current_stock - restocking_threshold) / avg_demand)) if avg_demand > 0 else 0
             }
+            
+            if curve is not None:
+                predictions[category]['days_ahead'] = days_ahead
+                predictions[category]['demand_curve'] = curve.tolist()
+                predictions[category]['horizon_demand'] = float(curve.sum())
+                predictions[category]['horizon_demand_quantiles'] = demand_quantiles[category]['total']
+                predictions[category]['demand_curve_quantiles'] = {
+                    label: values.tolist() for label, values in demand_quantiles[category]['daily'].items()
+                }
         
         return predictions
     
+    def get_intraday_profile(self):
+        """Get the hour-of-week demand profile built from the hourly sales CSV"""
+        signature = self.hourly_feature_store.source_signature()
+        if self._intraday_profile is None or signature != self._intraday_signature:
+            print("Loading hourly sales profile...")
+            self._intraday_profile, _ = self.hourly_feature_store.load(hourly_demand.build_intraday_profile)
+            self._intraday_signature = signature
+        return self._intraday_profile
+    
+    def forecast_hourly_demand(self, days_ahead=7):
+        """Forecast hourly demand per category for the days after the latest daily data point
+        
+        Daily totals come from the horizon models and are spread over the hours
+        with the intraday profile. Without horizon models, the profile's own
+        average weekday demand is used.
+        """
+        data = self.load_and_preprocess_data()
+        profile = self.get_intraday_profile()
+        start_date = data['datum'].iloc[-1] + timedelta(days=1)
+        
+        daily_demand = self.forecast_demand_curves(days_ahead, data)
+        if not daily_demand:
+            weekdays = pd.date_range(start_date, periods=days_ahead, freq='D').dayofweek
+            daily_demand = {
+                category: profile[f'{category}_mean'].to_numpy().reshape(7, 24).sum(axis=1)[weekdays]
+                for category in hourly_demand.profile_categories(profile)
+            }
+        
+        return hourly_demand.disaggregate_daily_forecast(profile, start_date, daily_demand)
+    
+    def forecast_shift_demand(self, days_ahead=7, shifts=None):
+        """Forecast demand per pharmacy shift (see hourly_demand.PHARMACY_SHIFTS) and category"""
+        return hourly_demand.aggregate_shifts(self.forecast_hourly_demand(days_ahead), shifts)
+    
     def get_medicine_info(self):
         """Get information about medicine categories"""
         medicine_info = {
@@ -337,6 +811,16 @@ class MedicineRestockingPredictor:
         }
         return medicine_info
     
+    def _format_forecast_lines(self, pred):
+        """Report lines for the horizon forecast of a prediction, if it has one"""
+        if 'horizon_demand' not in pred:
+            return ""
+        lines = f"  - Forecast demand (next {pred['days_ahead']} days): {pred['horizon_demand']:.2f} units\n"
+        if 'horizon_demand_quantiles' in pred:
+            quantiles = " / ".join(f"{label.upper()} {value:.2f}" for label, value in pred['horizon_demand_quantiles'].items())
+            lines += f"  - Forecast demand quantiles: {quantiles} units\n"
+        return lines
+    
     def generate_restocking_report(self, predictions):
         """Generate a comprehensive restocking report"""
         if not predictions:
@@ -369,6 +853,7 @@ class MedicineRestockingPredictor:
                 info = medicine_info.get(pred.get('category', ''), pred.get('category', 'Unknown'))
                 report += f"• {item_name} ({info})\n"
                 report += f"  - Predicted demand: {pred['predicted_demand']:.2f} units\n"
+                report += self._format_forecast_lines(pred)
                 report += f"  - Current stock: {pred['current_stock']:.2f} units\n"
                 report += f"  - Days until stockout: {pred['days_until_stockout']} days\n"
                 report += f"  - Restocking threshold: {pred['restocking_threshold']:.2f} units\n\n"
@@ -381,6 +866,7 @@ class MedicineRestockingPredictor:
                 info = medicine_info.get(pred.get('category', ''), pred.get('category', 'Unknown'))
                 report += f"• {item_name} ({info})\n"
                 report += f"  - Predicted demand: {pred['predicted_demand']:.2f} units\n"
+                report += self._format_forecast_lines(pred)
                 report += f"  - Current stock: {pred['current_stock']:.2f} units\n"
                 report += f"  - Days until stockout: {pred['days_until_stockout']} days\n\n"
         
@@ -392,6 +878,7 @@ class MedicineRestockingPredictor:
                 info = medicine_info.get(pred.get('category', ''), pred.get('category', 'Unknown'))
                 report += f"• {item_name} ({info})\n"
                 report += f"  - Predicted demand: {pred['predicted_demand']:.2f} units\n"
+                report += self._format_forecast_lines(pred)
                 report += f"  - Current stock: {pred['current_stock']:.2f} units\n\n"
         
         # Summary
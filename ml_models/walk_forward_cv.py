@@ -0,0 +1,241 @@
+import numpy as np
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import time
+from datetime import datetime
+from joblib import Parallel, delayed
+from sklearn.ensemble import RandomForestRegressor, HistGradientBoostingRegressor
+from sklearn.preprocessing import StandardScaler
+from sklearn.metrics import mean_absolute_error, mean_squared_error
+
+try:
+    from ml_models.medicine_restocking_predictor import MedicineRestockingPredictor, FEATURE_VERSION
+except ImportError:
+    # Running this file directly puts ml_models/ itself on the path
+    from medicine_restocking_predictor import MedicineRestockingPredictor, FEATURE_VERSION
+
+ESTIMATORS = {
+    'random_forest': RandomForestRegressor,
+    'hist_gradient_boosting': HistGradientBoostingRegressor,
+}
+
+# Search space per estimator; every combination becomes one candidate
+PARAM_GRIDS = {
+    'random_forest': {
+        'n_estimators': [100, 200],
+        'max_depth': [6, 10, None],
+        'min_samples_leaf': [1, 5],
+    },
+    'hist_gradient_boosting': {
+        'learning_rate': [0.03, 0.1],
+        'max_iter': [200],
+        'max_leaf_nodes': [15, 31],
+        'l2_regularization': [0.0, 1.0],
+    },
+}
+
+QUICK_PARAM_GRIDS = {
+    'random_forest': {'n_estimators': [100], 'max_depth': [10], 'min_samples_leaf': [1]},
+    'hist_gradient_boosting': {'learning_rate': [0.1], 'max_iter': [200], 'max_leaf_nodes': [31]},
+}
+
+def rolling_origin_splits(n_rows, n_folds=5, test_size=60, min_train_size=365, max_train_size=None):
+    """Walk-forward splits over chronologically ordered rows
+
+    Each fold trains on rows before its origin and tests on the next
+    test_size rows; origins advance by test_size so test windows never
+    overlap. With max_train_size the training window rolls instead of expanding.
+
+    Returns:
+        List of (train_start, train_end, test_end) row positions.
+    """
+    first_origin = n_rows - n_folds * test_size
+    if first_origin < min_train_size:
+        raise ValueError(f"{n_rows} rows cannot fit {n_folds} folds of {test_size} "
+                         f"after {min_train_size} training rows")
+
+    splits = []
+    for fold in range(n_folds):
+        origin = first_origin + fold * test_size
+        train_start = max(0, origin - max_train_size) if max_train_size else 0
+        splits.append((train_start, origin, origin + test_size))
+    return splits
+
+def expand_candidates(param_grids):
+    """Turn estimator param grids into a list of {'estimator', 'params'} candidates"""
+    candidates = []
+    for estimator, grid in param_grids.items():
+        keys = sorted(grid)
+        for values in itertools.product(*(grid[key] for key in keys)):
+            candidates.append({'estimator': estimator, 'params': dict(zip(keys, values))})
+    return candidates
+
+def candidate_name(candidate):
+    params = ",".join(f"{key}={value}" for key, value in sorted(candidate['params'].items()))
+    return f"{candidate['estimator']}({params})"
+
+class FoldCache:
+    """Scaled per-fold, per-category train/test matrices stored as .npy files
+
+    Matrices are computed once per (data, splits) and opened memory-mapped
+    by every worker, so no candidate rebuilds or rescales features.
+    """
+
+    def __init__(self, cache_root, key):
+        self.directory = os.path.join(cache_root, key)
+
+    def path(self, category, fold, part):
+        return os.path.join(self.directory, f'{category}_fold{fold}_{part}.npy')
+
+    def is_complete(self):
+        return os.path.exists(os.path.join(self.directory, 'complete'))
+
+    def build(self, predictor, data, splits):
+        os.makedirs(self.directory, exist_ok=True)
+        for category in predictor.medicine_categories:
+            feature_cols = predictor.prepare_features(data, category)
+            X = data[feature_cols].to_numpy(dtype=np.float64)
+            y = data[category].to_numpy(dtype=np.float64)
+            for fold, (train_start, train_end, test_end) in enumerate(splits):
+                # Scaler statistics come from the training window only
+                scaler = StandardScaler().fit(X[train_start:train_end])
+                np.save(self.path(category, fold, 'X_train'), scaler.transform(X[train_start:train_end]))
+                np.save(self.path(category, fold, 'X_test'), scaler.transform(X[train_end:test_end]))
+                np.save(self.path(category, fold, 'y_train'), y[train_start:train_end])
+                np.save(self.path(category, fold, 'y_test'), y[train_end:test_end])
+        open(os.path.join(self.directory, 'complete'), 'w').close()
+
+    def load(self, category, fold):
+        return tuple(np.load(self.path(category, fold, part), mmap_mode='r')
+                     for part in ('X_train', 'X_test', 'y_train', 'y_test'))
+
+def _evaluate(cache, candidate, category, fold):
+    """Fit one candidate on one category's fold (runs in a worker process)"""
+    X_train, X_test, y_train, y_test = cache.load(category, fold)
+    params = dict(candidate['params'])
+    if candidate['estimator'] == 'random_forest':
+        # Parallelism comes from the process pool, not from each forest
+        params['n_jobs'] = 1
+    model = ESTIMATORS[candidate['estimator']](random_state=42, **params)
+
+    start = time.perf_counter()
+    model.fit(X_train, y_train)
+    fit_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    y_pred = model.predict(X_test)
+    predict_seconds = time.perf_counter() - start
+
+    return {
+        'candidate': candidate_name(candidate),
+        'category': category,
+        'fold': fold,
+        'mae': mean_absolute_error(y_test, y_pred),
+        'rmse': float(np.sqrt(mean_squared_error(y_test, y_pred))),
+        'fit_seconds': fit_seconds,
+        'predict_seconds': predict_seconds,
+    }
+
+def build_leaderboard(fold_results, candidates):
+    """Aggregate fold results into one row per candidate, best mean MAE first"""
+    leaderboard = []
+    for candidate in candidates:
+        name = candidate_name(candidate)
+        rows = [row for row in fold_results if row['candidate'] == name]
+        category_mae = {}
+        for row in rows:
+            category_mae.setdefault(row['category'], []).append(row['mae'])
+        leaderboard.append({
+            'candidate': name,
+            'estimator': candidate['estimator'],
+            'params': candidate['params'],
+            'mean_mae': float(np.mean([row['mae'] for row in rows])),
+            'mean_rmse': float(np.mean([row['rmse'] for row in rows])),
+            'total_fit_seconds': sum(row['fit_seconds'] for row in rows),
+            'total_predict_seconds': sum(row['predict_seconds'] for row in rows),
+            'category_mae': {category: float(np.mean(maes)) for category, maes in category_mae.items()},
+        })
+    leaderboard.sort(key=lambda row: row['mean_mae'])
+    return leaderboard
+
+def run_search(param_grids=None, n_folds=5, test_size=60, min_train_size=365, max_train_size=None,
+               n_jobs=-1, cache_root='ml_models/cv_cache/', predictor=None):
+    """Walk-forward CV of every candidate on every category
+
+    Returns:
+        (leaderboard, fold_results)
+    """
+    predictor = predictor or MedicineRestockingPredictor()
+    data = predictor.load_and_preprocess_data()
+    splits = rolling_origin_splits(len(data), n_folds, test_size, min_train_size, max_train_size)
+    candidates = expand_candidates(param_grids or PARAM_GRIDS)
+
+    # The cache key covers the source data, the feature version and the split layout
+    manifest = predictor.feature_store._read_manifest() or {}
+    key_source = json.dumps([manifest.get('sha256'), manifest.get('version'), splits,
+                             predictor.medicine_categories])
+    cache = FoldCache(cache_root, hashlib.sha256(key_source.encode()).hexdigest()[:16])
+    if not cache.is_complete():
+        print(f"Caching fold matrices for {len(splits)} folds...")
+        cache.build(predictor, data, splits)
+
+    tasks = [(candidate, category, fold)
+             for candidate in candidates
+             for category in predictor.medicine_categories
+             for fold in range(len(splits))]
+    print(f"Evaluating {len(candidates)} candidates x {len(predictor.medicine_categories)} categories "
+          f"x {len(splits)} folds = {len(tasks)} fits...")
+
+    start = time.perf_counter()
+    fold_results = Parallel(n_jobs=n_jobs, backend='loky')(
+        delayed(_evaluate)(cache, candidate, category, fold) for candidate, category, fold in tasks
+    )
+    print(f"Search finished in {time.perf_counter() - start:.1f}s")
+
+    return build_leaderboard(fold_results, candidates), fold_results
+
+def print_leaderboard(leaderboard, top=10):
+    print("\n=== WALK-FORWARD CV LEADERBOARD ===\n")
+    print(f"{'#':>3}  {'Mean MAE':>9}{'Mean RMSE':>10}{'Fit (s)':>9}{'Predict (s)':>12}  Candidate")
+    for rank, row in enumerate(leaderboard[:top], 1):
+        print(f"{rank:>3}  {row['mean_mae']:>9.3f}{row['mean_rmse']:>10.3f}{row['total_fit_seconds']:>9.2f}"
+              f"{row['total_predict_seconds']:>12.3f}  {row['candidate']}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Walk-forward CV and hyperparameter search for restocking models")
+    parser.add_argument("--folds", type=int, default=5, help="Number of rolling-origin folds")
+    parser.add_argument("--test-size", type=int, default=60, help="Days in each test window")
+    parser.add_argument("--min-train-size", type=int, default=365, help="Minimum days before the first origin")
+    parser.add_argument("--max-train-size", type=int, default=None, help="Use a rolling training window of this many days")
+    parser.add_argument("--n-jobs", type=int, default=-1, help="Worker processes")
+    parser.add_argument("--quick", action="store_true", help="Evaluate one default candidate per estimator")
+    parser.add_argument("--output", default="ml_models/cv_leaderboard.json", help="Where to write the leaderboard")
+    args = parser.parse_args()
+
+    leaderboard, fold_results = run_search(
+        QUICK_PARAM_GRIDS if args.quick else PARAM_GRIDS,
+        n_folds=args.folds,
+        test_size=args.test_size,
+        min_train_size=args.min_train_size,
+        max_train_size=args.max_train_size,
+        n_jobs=args.n_jobs
+    )
+    print_leaderboard(leaderboard)
+
+    with open(args.output, 'w') as f:
+        json.dump({
+            'timestamp': datetime.now().isoformat(),
+            # Training only uses leaderboards computed on the features it trains with
+            'feature_version': FEATURE_VERSION,
+            'folds': args.folds,
+            'test_size': args.test_size,
+            'leaderboard': leaderboard,
+            'fold_results': fold_results,
+        }, f, indent=2)
+    print(f"\nLeaderboard saved to {args.output}")
+
+if __name__ == "__main__":
+    main()
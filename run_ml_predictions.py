@@ -63,9 +63,19 @@ def run_predictions():
                 "predicted_demand": round(pred['predicted_demand'], 2),
                 "current_stock": round(pred['current_stock'], 2),
                 "restocking_threshold": round(pred['restocking_threshold'], 2),
-                "restocking_needed": pred['restocking_needed'],
+                "restocking_needed": bool(pred['restocking_needed']),
                 "days_until_stockout": pred['days_until_stockout']
             }
+            if 'demand_curve' in pred:
+                category_info["horizon_demand"] = round(pred['horizon_demand'], 2)
+                category_info["demand_curve"] = [round(value, 2) for value in pred['demand_curve']]
+                category_info["horizon_demand_quantiles"] = {
+                    label: round(value, 2) for label, value in pred['horizon_demand_quantiles'].items()
+                }
+                category_info["demand_curve_quantiles"] = {
+                    label: [round(value, 2) for value in values]
+                    for label, values in pred['demand_curve_quantiles'].items()
+                }
             
             if pred['restocking_needed']:
                 if pred['days_until_stockout'] <= 7:
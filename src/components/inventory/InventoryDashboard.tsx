@@ -43,7 +43,8 @@ interface Alert {
 
 interface PurchaseOrder {
   order_id: string;
-  item_id: string;
+  item_id: string | null; // null on consolidated orders
+  item_ids: string[];
   item_name: string;
   quantity: number;
   supplier_id: string;
@@ -91,6 +91,43 @@ def test_ml_predictor():
         traceback.print_exc()
         return False
 
+def test_incremental_features():
+    """Test that incremental feature updates match the full-batch pandas computation"""
+    try:
+        import pandas as pd
+        from ml_models.medicine_restocking_predictor import MedicineRestockingPredictor
+        from ml_models.incremental_features import IncrementalFeatureEngine
+        
+        print("\nTesting incremental feature engine...")
+        
+        predictor = MedicineRestockingPredictor()
+        raw_data = pd.read_csv(predictor.data_path)
+        batch = predictor._build_features(predictor.data_path)
+        categories = predictor._categories_from_columns(raw_data.columns)
+        
+        # Replaying every day from scratch must reproduce the batch frame
+        engine = IncrementalFeatureEngine(categories)
+        incremental = engine.append_frame(raw_data)
+        pd.testing.assert_frame_equal(incremental, batch, check_exact=False, rtol=1e-9)
+        print(f"✓ Replayed {len(raw_data)} days, {len(incremental)} feature rows match batch computation")
+        
+        # Seeding from history and appending the remaining days must match as well
+        split = len(raw_data) - 100
+        engine = IncrementalFeatureEngine(categories)
+        engine.seed(raw_data[categories].values[:split])
+        appended = engine.append_frame(raw_data.iloc[split:])
+        pd.testing.assert_frame_equal(appended, batch.tail(100).reset_index(drop=True),
+                                      check_exact=False, rtol=1e-9)
+        print("✓ Seeded engine matches batch computation for the last 100 days")
+        
+        return True
+        
+    except Exception as e:
+        print(f"❌ Error in incremental features: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
 def main():
     """Main test function"""
     print("=== ML Medicine Restocking System Test ===")
@@ -103,6 +140,9 @@ def main():
         # Test 2: ML predictor
         ml_ok = test_ml_predictor()
         
+        # Test 3: Incremental features
+        ml_ok = test_incremental_features() and ml_ok
+        
         if ml_ok:
             print("\n🎉 All tests passed! ML system is working correctly.")
             print("\nNext steps:")
@@ -0,0 +1,14 @@
+import os
+import sys
+
+REPO_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, REPO_ROOT)
+# The inventory services import each other under services., as main.py runs them
+sys.path.append(os.path.join(REPO_ROOT, 'backend'))
+
+# The backend settings require these; tests inject fake clients and never reach AWS
+for name in ("AWS_ACCESS_KEY_ID", "AWS_SECRET_ACCESS_KEY", "AWS_REGION_NAME", "ELEVENLABS_API_KEY",
+             "BEDROCK_MODEL_ID", "BEDROCK_SYNTHESIS_MODEL_ID", "KENDRA_INDEX_ID", "NEPTUNE_ENDPOINT",
+             "S3_BUCKET_NAME", "DYNAMODB_SPEAKERS_TABLE_NAME", "HUGGING_FACE_TOKEN",
+             "DYNAMODB_ANALYTICS_TABLE_NAME", "DYNAMODB_ALERTS_TABLE_NAME", "DYNAMODB_TASKS_TABLE_NAME"):
+    os.environ.setdefault(name, "stub")
@@ -0,0 +1,131 @@
+import io
+import json
+import threading
+import time
+
+import pytest
+
+from backend.services import bedrock_gateway as gateway_module
+from backend.services.bedrock_gateway import BedrockGateway
+
+MODEL_ID = "stub.model"
+BODY = {"max_tokens": 10, "messages": [{"role": "user", "content": [{"type": "text", "text": "hi"}]}]}
+
+
+class FakeClientError(Exception):
+    """Carries an error code in .response like botocore's ClientError"""
+
+    def __init__(self, code):
+        super().__init__(code)
+        self.response = {"Error": {"Code": code}}
+
+
+class FakeBedrockClient:
+    """invoke_model that raises the queued errors first, then echoes the request"""
+
+    def __init__(self, errors=(), release=None):
+        self.errors = list(errors)
+        self.release = release
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def invoke_model(self, body, modelId, contentType, accept):
+        if self.release is not None:
+            self.release.wait(5)
+        with self.lock:
+            self.calls.append(json.loads(body))
+            if self.errors:
+                raise self.errors.pop(0)
+        return {"body": io.BytesIO(json.dumps({"echo": json.loads(body)}).encode("utf-8"))}
+
+
+class RecordingRandom:
+    """Stands in for the random module: records backoff bounds and never sleeps"""
+
+    def __init__(self):
+        self.bounds = []
+
+    def uniform(self, low, high):
+        self.bounds.append((low, high))
+        return 0.0
+
+
+@pytest.fixture
+def backoff(monkeypatch):
+    recorder = RecordingRandom()
+    monkeypatch.setattr(gateway_module, "random", recorder)
+    return recorder
+
+
+def make_gateway(client, **kwargs):
+    kwargs.setdefault("requests_per_second", 1000.0)
+    kwargs.setdefault("burst", 100)
+    return BedrockGateway(client=client, max_workers=4, **kwargs)
+
+
+def test_retries_throttling_with_capped_exponential_backoff(backoff):
+    client = FakeBedrockClient([FakeClientError("ThrottlingException")] * 3)
+    gateway = make_gateway(client, max_retries=5, base_delay=0.25, max_delay=0.6)
+
+    assert gateway.invoke(MODEL_ID, BODY) == {"echo": BODY}
+    assert len(client.calls) == 4
+    assert backoff.bounds == [(0, 0.25), (0, 0.5), (0, 0.6)]
+    stats = gateway.get_statistics()
+    assert stats["retries"] == 3
+    assert stats["calls"] == 4
+    assert stats["failures"] == 0
+
+
+def test_raises_once_retries_are_exhausted(backoff):
+    client = FakeBedrockClient([FakeClientError("ServiceUnavailableException")] * 10)
+    gateway = make_gateway(client, max_retries=2)
+
+    with pytest.raises(FakeClientError):
+        gateway.invoke(MODEL_ID, BODY)
+    assert len(client.calls) == 3
+    assert gateway.get_statistics()["failures"] == 1
+
+
+def test_does_not_retry_non_retryable_errors(backoff):
+    client = FakeBedrockClient([FakeClientError("ValidationException")])
+    gateway = make_gateway(client)
+
+    with pytest.raises(FakeClientError):
+        gateway.invoke(MODEL_ID, BODY)
+    assert len(client.calls) == 1
+    assert backoff.bounds == []
+
+
+def test_coalesces_identical_in_flight_requests():
+    release = threading.Event()
+    client = FakeBedrockClient(release=release)
+    gateway = make_gateway(client)
+
+    first = gateway.submit(MODEL_ID, BODY)
+    # Same request with its keys in another order
+    second = gateway.submit(MODEL_ID, dict(reversed(list(BODY.items()))))
+    other_model = gateway.submit("stub.other-model", BODY)
+    release.set()
+
+    assert second is first
+    assert first.result(timeout=5) == {"echo": BODY}
+    assert other_model.result(timeout=5) == {"echo": BODY}
+    assert len(client.calls) == 2
+    assert gateway.get_statistics()["coalesced"] == 1
+
+
+def test_finished_requests_are_not_coalesced():
+    client = FakeBedrockClient()
+    gateway = make_gateway(client)
+
+    gateway.invoke(MODEL_ID, BODY)
+    # The in-flight entry is released by a done callback, just after the result is delivered
+    deadline = time.monotonic() + 5
+    while gateway.get_statistics()["in_flight"] and time.monotonic() < deadline:
+        time.sleep(0.001)
+    gateway.invoke(MODEL_ID, BODY)
+
+    assert len(client.calls) == 2
+    stats = gateway.get_statistics()
+    assert stats["coalesced"] == 0
+    assert stats["in_flight"] == 0
@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.preprocessing import StandardScaler
+
+from ml_models.compact_models import (CompactForest, load_compact_models, load_npz_mmap, per_tree_predictions,
+                                      save_compact_models)
+
+
+def make_data(n_outputs, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(300, 6)) * [1.0, 10.0, 0.1, 5.0, 1.0, 100.0]
+    y = np.column_stack([X[:, 0] * 3 + np.sin(X[:, 1]) + rng.normal(scale=0.1, size=300) * (k + 1)
+                         for k in range(n_outputs)])
+    return X, y[:, 0] if n_outputs == 1 else y
+
+
+def fit_forest(n_outputs):
+    X, y = make_data(n_outputs)
+    forest = RandomForestRegressor(n_estimators=12, max_depth=8, random_state=42).fit(X, y)
+    return forest, make_data(n_outputs, seed=1)[0]
+
+
+@pytest.mark.parametrize("n_outputs", [1, 3])
+def test_compact_forest_matches_sklearn(n_outputs):
+    forest, X_test = fit_forest(n_outputs)
+    compact = CompactForest.from_sklearn(forest)
+
+    assert np.allclose(compact.predict(X_test), forest.predict(X_test))
+    assert np.allclose(per_tree_predictions(compact, X_test), per_tree_predictions(forest, X_test))
+
+
+@pytest.mark.parametrize("n_outputs", [1, 3])
+def test_memory_mapped_round_trip_matches_sklearn(tmp_path, n_outputs):
+    forest, X_test = fit_forest(n_outputs)
+    scaler = StandardScaler().fit(make_data(n_outputs)[0])
+    save_compact_models(str(tmp_path), {"model": forest}, {"model": scaler}, {"categories": ["A"]})
+
+    arrays = load_npz_mmap(str(tmp_path / "models.npz"))
+    assert all(isinstance(array, np.memmap) for array in arrays.values())
+
+    manifest, forests, scalers = load_compact_models(str(tmp_path))
+    assert manifest["categories"] == ["A"]
+    assert manifest["forests"]["model"]["n_trees"] == 12
+    assert np.allclose(forests["model"].predict(X_test), forest.predict(X_test))
+    assert np.array_equal(scalers["model"].transform(X_test), scaler.transform(X_test))
+
+
+def test_compressed_archives_are_rejected(tmp_path):
+    path = str(tmp_path / "models.npz")
+    np.savez_compressed(path, values=np.arange(10))
+
+    with pytest.raises(ValueError, match="compressed"):
+        load_npz_mmap(path)
+
+
+def test_missing_models_load_as_none(tmp_path):
+    assert load_compact_models(str(tmp_path)) is None
@@ -0,0 +1,94 @@
+import pytest
+
+from backend.services.json_stream import IncrementalJSONObjectParser, extract_json_object, iter_json_members
+
+
+def feed_in_chunks(text, size):
+    """All members the parser completes when text arrives size characters at a time"""
+    parser = IncrementalJSONObjectParser()
+    members = []
+    for start in range(0, len(text), size):
+        members.extend(parser.feed(text[start:start + size]))
+    return parser, members
+
+
+def test_preamble_and_code_fence_are_skipped():
+    text = 'Here is the analysis:\n```json\n{"summary": "Took the morning pills", "importance_score": 0.8}\n```'
+
+    assert extract_json_object(text) == {"summary": "Took the morning pills", "importance_score": 0.8}
+
+
+def test_braces_and_escaped_quotes_inside_strings():
+    text = '{"summary": "Jane said \\"see you {tomorrow}\\", then left }", "mood": "calm, [mostly]"}'
+
+    assert extract_json_object(text) == {"summary": 'Jane said "see you {tomorrow}", then left }',
+                                         "mood": "calm, [mostly]"}
+
+
+@pytest.mark.parametrize("size", [1, 3, 7, 1000])
+def test_members_complete_as_their_values_close(size):
+    text = '{"entities": [{"name": "Jane", "tags": ["daughter"]}], "summary": "Visit", "meta": {"a": {"b": 1}}}'
+
+    parser, members = feed_in_chunks(text, size)
+
+    assert members == [
+        ("entities", [{"name": "Jane", "tags": ["daughter"]}]),
+        ("summary", "Visit"),
+        ("meta", {"a": {"b": 1}}),
+    ]
+    assert parser.close() == dict(members)
+
+
+def test_nested_member_is_returned_before_the_next_comma():
+    parser = IncrementalJSONObjectParser()
+
+    assert parser.feed('{"entities": [{"name": "Jane"}]') == [("entities", [{"name": "Jane"}])]
+    assert parser.feed(', "summary": "Vis') == []
+    assert parser.feed('it"}') == [("summary", "Visit")]
+
+
+def test_text_after_the_object_is_ignored():
+    parser = IncrementalJSONObjectParser()
+
+    assert parser.feed('{"a": 1} and {"b": 2}') == [("a", 1)]
+    assert parser.feed('{"c": 3}') == []
+    assert parser.close() == {"a": 1}
+
+
+def test_iter_json_members_stops_at_the_end_of_the_object():
+    chunks = iter(['{"a": 1,', ' "b": 2}', "trailing"])
+
+    assert list(iter_json_members(chunks)) == [("a", 1), ("b", 2)]
+    assert next(chunks) == "trailing"
+
+
+def test_validate_converts_each_value():
+    def validate(key, value):
+        return float(value) if key == "importance_score" else value
+
+    assert extract_json_object('{"importance_score": "0.5", "summary": "x"}', validate) == {
+        "importance_score": 0.5, "summary": "x"}
+
+
+@pytest.mark.parametrize("text, message", [
+    ("No JSON here", "Could not find"),
+    ('{"summary": "Took the morn', "ended before"),
+    ('{"entities": [{"name": "Jane"}], "summary"', "ended before"),
+])
+def test_missing_or_truncated_objects_raise(text, message):
+    with pytest.raises(ValueError, match=message):
+        extract_json_object(text)
+
+
+def test_truncated_stream_raises_after_the_completed_members():
+    members = []
+    with pytest.raises(ValueError, match="ended before"):
+        for member in iter_json_members(['{"a": 1, "b": [2', ", 3"]):
+            members.append(member)
+
+    assert members == [("a", 1)]
+
+
+def test_malformed_member_raises():
+    with pytest.raises(ValueError, match="Malformed JSON member"):
+        extract_json_object('{"a": nope}')
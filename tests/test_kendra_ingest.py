@@ -0,0 +1,172 @@
+import json
+import os
+import threading
+import time
+
+import pytest
+
+from backend.services.kendra_ingest import DocumentIngestError, KendraIngestQueue
+
+
+def make_document(i):
+    return {"Id": f"memory-{i}", "Title": f"Memory {i}", "Blob": f"Transcript {i}".encode("utf-8"),
+            "ContentType": "PLAIN_TEXT"}
+
+
+class FakeKendraClient:
+    """
+    batch_put_document that records the IDs of each call. failures maps a document ID
+    to the error codes it gets on its next calls; down is a number of calls that raise.
+    """
+
+    def __init__(self, failures=None, down=0, latency=0.0, release=None):
+        self.failures = {doc_id: list(codes) for doc_id, codes in (failures or {}).items()}
+        self.down = down
+        self.latency = latency
+        self.release = release
+        self.calls = []
+        self.blobs = {}
+        self.lock = threading.Lock()
+
+    def batch_put_document(self, IndexId, Documents):
+        if self.release is not None:
+            self.release.wait(5)
+        time.sleep(self.latency)
+        with self.lock:
+            self.calls.append([document["Id"] for document in Documents])
+            if self.down:
+                self.down -= 1
+                raise ConnectionError("Kendra unreachable")
+            failed = []
+            for document in Documents:
+                codes = self.failures.get(document["Id"])
+                if codes:
+                    failed.append({"Id": document["Id"], "ErrorCode": codes.pop(0), "ErrorMessage": "Rejected"})
+                else:
+                    self.blobs[document["Id"]] = document["Blob"]
+        return {"FailedDocuments": failed}
+
+
+def make_queue(client, **kwargs):
+    kwargs.setdefault("flush_interval", 0.05)
+    kwargs.setdefault("retry_delay", 0.01)
+    return KendraIngestQueue(client=client, index_id="stub", **kwargs)
+
+
+def outcome(future):
+    error = future.exception(timeout=5)
+    return type(error).__name__ if error else future.result()["status"]
+
+
+def test_documents_are_sent_in_batches_of_ten():
+    client = FakeKendraClient()
+    queue = make_queue(client)
+
+    futures = [queue.put(make_document(i)) for i in range(23)]
+
+    assert [outcome(future) for future in futures] == ["indexed"] * 23
+    assert sorted(len(call) for call in client.calls) == [3, 10, 10]
+    queue.shutdown()
+
+
+def test_only_documents_failed_with_transient_errors_are_retried():
+    client = FakeKendraClient(failures={"memory-1": ["InternalError"], "memory-2": ["InvalidRequest"]})
+    queue = make_queue(client)
+
+    futures = [queue.put(make_document(i)) for i in range(4)]
+
+    assert [outcome(future) for future in futures] == ["indexed", "indexed", "DocumentIngestError", "indexed"]
+    assert client.calls == [["memory-0", "memory-1", "memory-2", "memory-3"], ["memory-1"]]
+    stats = queue.get_statistics()
+    assert stats["indexed"] == 3
+    assert stats["failed"] == 1
+    assert stats["retried"] == 1
+    queue.shutdown()
+
+
+def test_failed_calls_retry_the_whole_batch_until_max_retries():
+    client = FakeKendraClient(down=1)
+    queue = make_queue(client)
+
+    futures = [queue.put(make_document(i)) for i in range(3)]
+    assert [outcome(future) for future in futures] == ["indexed"] * 3
+    assert client.calls == [["memory-0", "memory-1", "memory-2"]] * 2
+
+    client.down = 10
+    future = queue.put(make_document(3))
+    with pytest.raises(DocumentIngestError):
+        future.result(timeout=5)
+    assert len(client.calls) == 2 + 1 + queue.max_retries
+    queue.shutdown()
+
+
+def test_worker_survives_an_unexpected_error():
+    class BrokenOnceClient(FakeKendraClient):
+        def batch_put_document(self, IndexId, Documents):
+            if not self.calls:
+                self.calls.append([document["Id"] for document in Documents])
+                return None
+            return super().batch_put_document(IndexId, Documents)
+
+    queue = make_queue(BrokenOnceClient())
+
+    assert outcome(queue.put(make_document(0))) == "DocumentIngestError"
+    assert outcome(queue.put(make_document(1))) == "indexed"
+    queue.shutdown()
+
+
+def test_unsent_documents_are_spilled_and_restored(tmp_path):
+    spill_path = str(tmp_path / "spill.json")
+    queue = make_queue(FakeKendraClient(down=100), spill_path=spill_path, retry_delay=60.0)
+    futures = [queue.put(make_document(i)) for i in range(3)]
+    queue.shutdown(flush_timeout=0.2)
+
+    assert [outcome(future) for future in futures] == ["spilled"] * 3
+    with open(spill_path) as f:
+        assert [entry["document"]["Id"] for entry in json.load(f)] == ["memory-0", "memory-1", "memory-2"]
+    with pytest.raises(RuntimeError):
+        queue.put(make_document(3))
+
+    client = FakeKendraClient()
+    restored = make_queue(client, spill_path=spill_path)
+    assert restored.flush(timeout=5)
+    assert client.blobs == {f"memory-{i}": f"Transcript {i}".encode("utf-8") for i in range(3)}
+    assert restored.get_statistics()["restored"] == 3
+    assert os.listdir(tmp_path) == []
+    restored.shutdown()
+
+
+def test_retries_of_a_batch_in_flight_at_shutdown_are_spilled(tmp_path):
+    spill_path = str(tmp_path / "spill.json")
+    release = threading.Event()
+    client = FakeKendraClient(failures={"memory-0": ["InternalError"]}, release=release)
+    queue = make_queue(client, spill_path=spill_path, flush_interval=0.0)
+
+    in_flight = queue.put(make_document(0))
+    while not queue.get_statistics()["in_flight"]:
+        time.sleep(0.001)
+    queued = queue.put(make_document(1))
+    threading.Timer(0.2, release.set).start()
+    queue.shutdown(flush_timeout=0.1)
+
+    assert outcome(in_flight) == "spilled"
+    assert outcome(queued) == "spilled"
+    with open(spill_path) as f:
+        assert sorted(entry["document"]["Id"] for entry in json.load(f)) == ["memory-0", "memory-1"]
+
+
+def test_only_one_queue_restores_a_shared_spill(tmp_path):
+    spill_path = str(tmp_path / "spill.json")
+    queue = make_queue(FakeKendraClient(down=100), spill_path=spill_path, retry_delay=60.0)
+    queue.put(make_document(0))
+    queue.shutdown(flush_timeout=0.1)
+
+    first_client, second_client = FakeKendraClient(), FakeKendraClient()
+    first = make_queue(first_client, spill_path=spill_path)
+    second = make_queue(second_client, spill_path=spill_path)
+    assert first.flush(timeout=5) and second.flush(timeout=5)
+
+    assert first_client.calls == [["memory-0"]]
+    assert second_client.calls == []
+    first.shutdown()
+    second.shutdown()
@@ -0,0 +1,151 @@
+import pytest
+
+from services.rfid_ingest import RFIDPresenceEventType, RFIDReadIngestor
+
+ENTER = RFIDPresenceEventType.ENTER
+EXIT = RFIDPresenceEventType.EXIT
+
+
+class FakeClock:
+    """Epoch seconds that only move when the test advances them"""
+
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+class FakeRegistry:
+    """Known tags plus a record of every record_last_seen batch"""
+
+    def __init__(self, tags=("tag-a", "tag-b")):
+        self.tags = {tag_id: None for tag_id in tags}
+        self.last_seen_batches = []
+
+    def record_last_seen(self, updates):
+        self.last_seen_batches.append(dict(updates))
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def registry():
+    return FakeRegistry()
+
+
+@pytest.fixture
+def ingestor(registry, clock):
+    return RFIDReadIngestor(registry, dedup_window=1.0, exit_timeout=10.0, clock=clock)
+
+
+def events(batch):
+    return [(event.tag_id, event.event_type, event.timestamp) for event in batch]
+
+
+def test_reads_inside_the_dedup_window_are_dropped(ingestor):
+    accepted = ingestor.ingest(["tag-a"] * 4, [1000.0, 1000.2, 1000.5, 1000.99], reader_id="door")
+
+    assert accepted == 1
+    stats = ingestor.get_statistics()
+    assert stats["raw_reads"] == 4
+    assert stats["duplicate_reads"] == 3
+
+
+def test_reads_outside_the_dedup_window_are_accepted(ingestor, registry):
+    # The window runs from the last accepted read, not from the last raw read
+    accepted = ingestor.ingest(["tag-a"] * 4, [1000.0, 1000.6, 1001.0, 1001.5])
+
+    assert accepted == 2
+    ingestor.flush()
+    assert registry.last_seen_batches == [{"tag-a": 1001.0}]
+
+
+def test_unknown_tags_are_counted_but_not_tracked(ingestor):
+    assert ingestor.ingest(["stray"], [1000.0]) == 0
+    assert ingestor.present_tags() == []
+    assert ingestor.get_statistics()["unknown_tag_reads"] == 1
+
+
+def test_tag_exits_once_quiet_for_exit_timeout(ingestor, clock):
+    ingestor.ingest(["tag-a", "tag-b"], [1000.0, 1004.0], reader_id="door")
+    assert events(ingestor.flush()) == [("tag-a", ENTER, 1000.0), ("tag-b", ENTER, 1004.0)]
+
+    clock.advance(9.9)
+    assert ingestor.sweep() == 0
+
+    clock.advance(0.1)
+    assert ingestor.sweep() == 1
+    batch = ingestor.flush()
+    assert events(batch) == [("tag-a", EXIT, 1010.0)]
+    assert batch[0].reader_id == "door"
+    assert ingestor.present_tags() == ["tag-b"]
+
+
+def test_a_later_read_postpones_the_exit(ingestor, clock):
+    ingestor.ingest(["tag-a"], [1000.0])
+    ingestor.ingest(["tag-a"], [1006.0])
+
+    clock.advance(10.0)
+    assert ingestor.sweep() == 0
+    clock.advance(6.0)
+    assert ingestor.sweep() == 1
+    assert events(ingestor.flush())[-1] == ("tag-a", EXIT, 1016.0)
+
+
+def test_tag_re_enters_after_exiting(ingestor, clock):
+    ingestor.ingest(["tag-a"], [1000.0])
+    clock.advance(10.0)
+    ingestor.sweep()
+    ingestor.ingest(["tag-a"], [1012.0])
+
+    assert events(ingestor.flush()) == [("tag-a", ENTER, 1000.0), ("tag-a", EXIT, 1010.0),
+                                        ("tag-a", ENTER, 1012.0)]
+    stats = ingestor.get_statistics()
+    assert stats["enter_events"] == 2
+    assert stats["exit_events"] == 1
+
+
+def test_ingest_lines_use_the_clock_for_reads_without_a_timestamp(ingestor, clock):
+    clock.advance(5.0)
+    ingestor.ingest_lines(["tag-a", "tag-b,1002.0,shelf"], default_reader_id="door")
+
+    batch = ingestor.flush()
+    assert sorted((event.tag_id, event.timestamp, event.reader_id) for event in batch) == [
+        ("tag-a", 1005.0, "door"), ("tag-b", 1002.0, "shelf")]
+
+
+def test_last_seen_updates_are_flushed_in_one_batch(ingestor, registry, clock):
+    ingestor.ingest(["tag-a", "tag-b"], [1000.0, 1000.5])
+    ingestor.ingest(["tag-a", "tag-b"], [1001.0, 1001.2])
+    assert registry.last_seen_batches == []
+
+    ingestor.flush()
+    assert registry.last_seen_batches == [{"tag-a": 1001.0, "tag-b": 1000.5}]
+
+    # Nothing new: no registry write
+    ingestor.flush()
+    assert len(registry.last_seen_batches) == 1
+
+
+def test_sweep_and_flush_delivers_exits_to_listeners(ingestor, registry, clock):
+    delivered = []
+    ingestor.add_listener(delivered.append)
+    ingestor.ingest(["tag-a"], [1000.0])
+
+    clock.advance(10.0)
+    ingestor.sweep_and_flush()
+
+    assert [events(batch) for batch in delivered] == [[("tag-a", ENTER, 1000.0), ("tag-a", EXIT, 1010.0)]]
+    assert registry.last_seen_batches == [{"tag-a": 1000.0}]
+
+
+def test_exit_timeout_must_cover_the_dedup_window(registry):
+    with pytest.raises(ValueError):
+        RFIDReadIngestor(registry, dedup_window=5.0, exit_timeout=1.0)